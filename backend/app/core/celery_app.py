@@ -0,0 +1,23 @@
+from celery import Celery
+from core.config import settings
+
+broker_url = settings.CELERY_BROKER_URL or settings.REDIS_URL or "redis://localhost:6379/0"
+
+celery_app = Celery(
+    "chatbot_inventory",
+    broker=broker_url,
+    backend=settings.CELERY_RESULT_BACKEND or broker_url,
+    include=[
+        "utils.ollama_tasks",
+        "modules.documents.services.ingestion_tasks",
+    ],
+)
+
+celery_app.conf.update(
+    task_serializer="json",
+    result_serializer="json",
+    accept_content=["json"],
+    # ingestion jobs can run for minutes; hand out one at a time and ack only once done
+    worker_prefetch_multiplier=1,
+    task_acks_late=True,
+)
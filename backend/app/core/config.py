@@ -1,5 +1,5 @@
 from pydantic_settings import BaseSettings
-from typing import List
+from typing import Dict, List, Optional
 from pydantic import field_validator
 
 class Settings(BaseSettings):
@@ -15,6 +15,96 @@ class Settings(BaseSettings):
 
     API_PREFIX: str = "/api"
     DEBUG: bool =False
+
+    # Per-process cache of resolved chatbot config used by the chat hot path
+    CHATBOT_RUNTIME_TTL_SECONDS: int = 300
+
+    # LRU of opened Chroma/FAISS handles, bounded by count and estimated size
+    VECTORSTORE_CACHE_MAX_HANDLES: int = 32
+    VECTORSTORE_CACHE_MAX_MB: int = 1024
+
+    # Shared Ollama clients; None falls back to OLLAMA_HOST / localhost:11434
+    OLLAMA_BASE_URL: Optional[str] = None
+    OLLAMA_MAX_CONNECTIONS: int = 20
+    OLLAMA_MAX_KEEPALIVE_CONNECTIONS: int = 10
+    OLLAMA_KEEPALIVE_EXPIRY_SECONDS: float = 60.0
+
+    # Multi-turn prompt budgeting (history_planner)
+    HISTORY_TOKENIZER_ENCODING: str = "cl100k_base"
+    HISTORY_MAX_MESSAGES: int = 50
+    HISTORY_SAFETY_MARGIN_TOKENS: int = 64
+
+    # Rolling conversation summaries (refreshed in the background)
+    SUMMARY_EVERY_N_TURNS: int = 5
+    SUMMARY_KEEP_RECENT_MESSAGES: int = 10
+    SUMMARY_MAX_FOLD_MESSAGES: int = 40
+    SUMMARY_MAX_WORDS: int = 250
+
+    # Semantic answer cache; empty SEMANTIC_CACHE_CHATBOT_IDS means every chatbot
+    SEMANTIC_CACHE_ENABLED: bool = False
+    SEMANTIC_CACHE_CHATBOT_IDS: List[int] = []
+    SEMANTIC_CACHE_THRESHOLD: float = 0.95
+    SEMANTIC_CACHE_TTL_SECONDS: int = 3600
+    SEMANTIC_CACHE_MAX_ENTRIES: int = 500
+
+    # Exact-match cache for stateless /ask answers; Redis tier is used when REDIS_URL is set
+    REDIS_URL: Optional[str] = None
+    RESPONSE_CACHE_ENABLED: bool = True
+    RESPONSE_CACHE_TTL_SECONDS: int = 300
+    RESPONSE_CACHE_MAX_ENTRIES: int = 2048
+    RESPONSE_CACHE_REDIS_TIMEOUT_SECONDS: float = 0.25
+
+    # Query embedding cache; set QUERY_EMBEDDING_CACHE_PATH (a SQLite file) to persist vectors across restarts
+    QUERY_EMBEDDING_CACHE_MAX_ENTRIES: int = 10000
+    QUERY_EMBEDDING_CACHE_PATH: Optional[str] = None
+    QUERY_EMBEDDING_CACHE_MAX_MB: int = 256
+
+    # Persistent (model, sha256(chunk)) -> vector cache used when indexing documents; None disables it
+    CHUNK_EMBEDDING_CACHE_PATH: Optional[str] = "uploads/embedding_cache.sqlite3"
+    CHUNK_EMBEDDING_CACHE_MAX_MB: int = 1024
+
+    # Document ingestion: chunks are embedded in batches, this many batches at once per process
+    INGEST_EMBED_BATCH_SIZE: int = 64
+    INGEST_EMBED_CONCURRENCY: int = 4
+    INGEST_EMBED_MAX_RETRIES: int = 3
+
+    # Ingestion jobs run on Celery when enabled (broker falls back to REDIS_URL), else on a local thread pool
+    INGESTION_USE_CELERY: bool = False
+    INGESTION_THREAD_WORKERS: int = 2
+    CELERY_BROKER_URL: Optional[str] = None
+    CELERY_RESULT_BACKEND: Optional[str] = None
+
+    # Seconds a worker may keep trusting a cached API key; revocations through this worker apply at once
+    API_KEY_CACHE_TTL_SECONDS: int = 30
+    API_KEY_CACHE_MAX_ENTRIES: int = 10000
+
+    # Signed (ck1.) API keys; the secret falls back to SECRET_KEY, bumping the version retires old keys
+    API_KEY_SIGNING_SECRET: Optional[str] = None
+    API_KEY_SIGNING_VERSION: int = 1
+    API_KEY_REVOCATION_REFRESH_SECONDS: int = 5
+
+    # Write-behind for chat messages: batched multi-row INSERTs from a background thread
+    MESSAGE_WRITE_BEHIND_ENABLED: bool = False
+    MESSAGE_WRITE_BEHIND_QUEUE_SIZE: int = 10000
+    MESSAGE_WRITE_BEHIND_BATCH_SIZE: int = 500
+    MESSAGE_WRITE_BEHIND_FLUSH_INTERVAL_MS: int = 200
+    MESSAGE_WRITE_BEHIND_MAX_RETRIES: int = 3
+
+    # Concurrent identical /ask questions share one retrieval and generation
+    ASK_COALESCING_ENABLED: bool = True
+
+    # Admission control for Ollama generations (ollama_scheduler); per-model limits override the default
+    OLLAMA_MAX_CONCURRENCY_PER_MODEL: int = 2
+    OLLAMA_MODEL_CONCURRENCY: Dict[str, int] = {}
+    OLLAMA_MAX_QUEUE_PER_MODEL: int = 100
+    OLLAMA_QUEUE_TIMEOUT_SECONDS: float = 30.0
+    # vendor_id -> fair-share weight among waiting requests of the same priority (default 1)
+    OLLAMA_VENDOR_WEIGHTS: Dict[int, float] = {}
+
+    # Micro-batching of query embeddings across concurrent requests; a 0 ms window disables it
+    EMBEDDING_BATCH_WINDOW_MS: int = 5
+    EMBEDDING_BATCH_MAX_ITEMS: int = 32
+    EMBEDDING_BATCH_WORKERS: int = 4
     
     
     class Config:
@@ -29,6 +29,12 @@ class DocumentStatus(str, enum.Enum):
     embedded = "embedded"
     processing_failed = "processing_failed"
 
+class IngestionJobStatus(str, enum.Enum):
+    queued = "queued"
+    running = "running"
+    succeeded = "succeeded"
+    failed = "failed"
+
 class APIKeyStatus(str, enum.Enum):
     active = "active"
     inactive = "inactive"
@@ -1,4 +1,5 @@
 from sqlalchemy import create_engine
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
 from sqlalchemy.orm import sessionmaker, declarative_base
 from core.config import settings
 
@@ -12,6 +13,18 @@ engine = create_engine(
 )
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+# Async engine for the chat path (psycopg 3 async driver); separate pool from `engine`
+ASYNC_DATABASE_URL = f"postgresql+psycopg://{settings.DB_USER}:{settings.DB_PASSWORD}@{settings.DB_HOST}:{settings.DB_PORT}/{settings.DB_NAME}"
+
+async_engine = create_async_engine(
+    ASYNC_DATABASE_URL,
+    pool_size=10,
+    max_overflow=20,
+    pool_pre_ping=True,
+)
+# expire_on_commit=False: attributes stay readable after commit without an implicit (sync) reload
+AsyncSessionLocal = async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
+
 Base = declarative_base()
 
 def get_db():
@@ -24,6 +37,11 @@ def get_db():
         db.close()
 
 
+async def get_async_db():
+    async with AsyncSessionLocal() as db:
+        yield db
+
+
 def create_tables():
     Base.metadata.create_all(bind=engine)
 
@@ -0,0 +1,62 @@
+from sqlalchemy import text
+
+# Base.metadata.create_all only creates missing tables; it never changes a table
+# that already exists. Columns and indexes added to existing tables are listed
+# here and applied at startup, after create_all. Every statement is idempotent,
+# so the list only grows: add an entry whenever a model gains a column or index
+# on a table that deployed databases already have.
+
+# pg_advisory_xact_lock namespace serialising concurrent upgrades from several
+# workers; document_service uses 7301 and 7302
+SCHEMA_LOCK_NAMESPACE = 7303
+
+# (table, column or index name, statement)
+UPGRADES = [
+    ("conversations", "summary", "ALTER TABLE conversations ADD COLUMN IF NOT EXISTS summary TEXT"),
+    (
+        "conversations", "summary_until_message_id",
+        "ALTER TABLE conversations ADD COLUMN IF NOT EXISTS summary_until_message_id INTEGER"
+    ),
+    ("conversations", "summary_updated_at", "ALTER TABLE conversations ADD COLUMN IF NOT EXISTS summary_updated_at TIMESTAMP"),
+    (
+        "api_keys", "updated_at",
+        "ALTER TABLE api_keys ADD COLUMN IF NOT EXISTS updated_at TIMESTAMP WITH TIME ZONE DEFAULT now()"
+    ),
+    ("api_keys", "ix_api_keys_updated_at", "CREATE INDEX IF NOT EXISTS ix_api_keys_updated_at ON api_keys (updated_at)"),
+    ("documents", "content_hash", "ALTER TABLE documents ADD COLUMN IF NOT EXISTS content_hash VARCHAR(64)"),
+    ("documents", "chunk_count", "ALTER TABLE documents ADD COLUMN IF NOT EXISTS chunk_count INTEGER NOT NULL DEFAULT 0"),
+    (
+        "documents", "ingestion_job_id",
+        "ALTER TABLE documents ADD COLUMN IF NOT EXISTS ingestion_job_id VARCHAR(32) "
+        "REFERENCES ingestion_jobs (id) ON DELETE SET NULL"
+    ),
+    (
+        "documents", "ix_documents_ingestion_job_id",
+        "CREATE INDEX IF NOT EXISTS ix_documents_ingestion_job_id ON documents (ingestion_job_id)"
+    ),
+    ("documents", "ingestion_stage", "ALTER TABLE documents ADD COLUMN IF NOT EXISTS ingestion_stage VARCHAR"),
+    (
+        "documents", "ingestion_progress",
+        "ALTER TABLE documents ADD COLUMN IF NOT EXISTS ingestion_progress INTEGER NOT NULL DEFAULT 0"
+    ),
+    ("ingestion_jobs", "worker_lock", "ALTER TABLE ingestion_jobs ADD COLUMN IF NOT EXISTS worker_lock INTEGER"),
+    (
+        "messages", "ix_messages_conversation_created",
+        "CREATE INDEX IF NOT EXISTS ix_messages_conversation_created ON messages (conversation_id, created_at)"
+    ),
+    (
+        "vector_dbs", "ix_vector_dbs_chatbot_active_updated",
+        "CREATE INDEX IF NOT EXISTS ix_vector_dbs_chatbot_active_updated "
+        "ON vector_dbs (chatbot_id, is_active, updated_at DESC NULLS LAST)"
+    ),
+]
+
+
+def upgrade_schema(engine) -> None:
+    """Apply UPGRADES in one transaction. Postgres only; other databases get their schema from create_all."""
+    if engine.dialect.name != "postgresql":
+        return
+    with engine.begin() as conn:
+        conn.execute(text("SELECT pg_advisory_xact_lock(:namespace, 0)"), {"namespace": SCHEMA_LOCK_NAMESPACE})
+        for _, _, statement in UPGRADES:
+            conn.execute(text(statement))
@@ -1,10 +1,12 @@
-from fastapi import FastAPI
+from fastapi import FastAPI, HTTPException, WebSocket, WebSocketDisconnect, status
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
-from fastapi.responses import FileResponse
+from fastapi.responses import FileResponse, PlainTextResponse
+from starlette.concurrency import run_in_threadpool
 from pathlib import Path
 from core.config import settings
-from db.database import engine, Base
+from db.database import engine, async_engine, Base, SessionLocal
+from db.upgrades import upgrade_schema
 from modules.vendors.routers import vendor_router
 from modules.users.routers import user_router
 from modules.api_keys.routers import api_router
@@ -16,9 +18,16 @@ from modules.embeddings.routers import embedding_router
 from modules.auth.routers import auth_router
 from modules.admins.routers import admin_router
 from modules.vector_dbs.routers import vector_db_router
+from modules.messages.services import message_writer
+from modules.documents.services import ingestion_jobs
+from utils import metrics
+from modules.auth.admins.auth_admin import get_current_admin
+from modules.auth.vendors.auth_vendor import get_current_vendor
+from utils.websocket_broadcaster import register_ws, unregister_ws
 
 
 Base.metadata.create_all(bind=engine)
+upgrade_schema(engine)
 
 app = FastAPI(
     title="chatbot-inventory-FastAPI",
@@ -30,6 +39,15 @@ origins = [
     "http://localhost:5500"
 ]
 
+@app.on_event("startup")
+def fail_orphaned_ingestion_jobs():
+    ingestion_jobs.fail_orphaned_jobs()
+
+@app.on_event("shutdown")
+def flush_pending_messages():
+    message_writer.shutdown()
+
+app.add_middleware(metrics.MetricsMiddleware)
 app.add_middleware(
     CORSMiddleware,
     allow_origins=["*"],
@@ -53,6 +71,51 @@ app.include_router(auth_router.router, prefix="/auth", tags=["auth"])
 app.include_router(admin_router.router, prefix="/admins", tags=["Admins"])
 app.include_router(vector_db_router.router, prefix="/vector_dbs", tags=["VectorDBs"])
 
+metrics.Gauge(
+    "db_pool_checked_out_connections",
+    "Connections currently checked out of the SQLAlchemy pool.",
+    ["pool"],
+    lambda: [(("sync",), engine.pool.checkedout()), (("async",), async_engine.pool.checkedout())]
+)
+
+
+@app.get("/metrics", include_in_schema=False)
+def prometheus_metrics():
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
+
+def _websocket_vendor_id(token: str, role: str):
+    """None for admins (every vendor's updates); raises HTTPException for bad credentials."""
+    db = SessionLocal()
+    try:
+        if role == "admin":
+            get_current_admin(token, db)
+            return None
+        return get_current_vendor(token, db).id
+    finally:
+        db.close()
+
+@app.websocket("/ws")
+async def updates_websocket(ws: WebSocket, token: str = "", role: str = "vendor"):
+    """
+    llm.update and ingestion.update messages for jobs running in this process.
+    Browsers can't set headers on a websocket, so the access token of an admin or
+    vendor (`role`) comes as a query parameter; vendors only get their own chatbots' jobs.
+    """
+    try:
+        vendor_id = await run_in_threadpool(_websocket_vendor_id, token, role)
+    except HTTPException:
+        await ws.close(code=status.WS_1008_POLICY_VIOLATION)
+        return
+
+    await register_ws(ws, vendor_id)
+    try:
+        while True:
+            await ws.receive_text()
+    except WebSocketDisconnect:
+        pass
+    finally:
+        unregister_ws(ws)
+
 # Serve static folder
 app.mount("/static", StaticFiles(directory=FRONTEND_DIR), name="static")
 
@@ -14,6 +14,13 @@ class APIKey(Base):
     vendor_domain = Column(String(255), nullable=False)
     status = Column(Enum(APIKeyStatus), default=APIKeyStatus.active)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
+    # drives the incremental revocation refresh in signed_keys
+    updated_at = Column(
+        DateTime(timezone=True),
+        server_default=func.now(),
+        onupdate=func.now(),
+        index=True
+    )
 
     vendor = relationship("Vendor", back_populates="api_keys")
     chatbot = relationship("Chatbot", back_populates="api_keys")
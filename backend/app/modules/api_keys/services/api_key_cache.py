@@ -0,0 +1,108 @@
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Optional, Tuple
+from fastapi import HTTPException
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from core.config import settings
+from core.enums import APIKeyStatus
+from modules.api_keys.models.api_model import APIKey
+from modules.api_keys.services import signed_keys
+from utils import metrics
+
+
+@dataclass(frozen=True)
+class ResolvedAPIKey:
+    """Detached view of an API key, enough to authorize and route a chat request."""
+    id: int
+    chatbot_id: int
+    vendor_id: int
+    status: APIKeyStatus
+
+
+# token_hash -> (key or None for unknown tokens, loaded_at); one copy per worker process
+_keys: "OrderedDict[str, Tuple[Optional[ResolvedAPIKey], float]]" = OrderedDict()
+_lock = threading.Lock()
+
+
+def _cached_key(token_hash: str) -> Tuple[bool, Optional[ResolvedAPIKey]]:
+    with _lock:
+        cached = _keys.get(token_hash)
+        if cached is None:
+            return False, None
+        if time.monotonic() - cached[1] >= settings.API_KEY_CACHE_TTL_SECONDS:
+            del _keys[token_hash]
+            return False, None
+        _keys.move_to_end(token_hash)
+        return True, cached[0]
+
+
+def _store_key(token_hash: str, key: Optional[ResolvedAPIKey]) -> None:
+    with _lock:
+        _keys[token_hash] = (key, time.monotonic())
+        _keys.move_to_end(token_hash)
+        while len(_keys) > settings.API_KEY_CACHE_MAX_ENTRIES:
+            _keys.popitem(last=False)
+
+
+async def aresolve_api_key(db: AsyncSession, token_hash: str, endpoint: str) -> ResolvedAPIKey:
+    """
+    Resolve the token from a chat URL to its active API key, or raise 401.
+
+    Signed ck1. keys are checked against their HMAC and the revocation set, so
+    forged keys never reach the database. Older keys are looked up by hash;
+    unknown tokens are cached too, so repeated bad tokens don't reach the database.
+    Entries expire after API_KEY_CACHE_TTL_SECONDS, which bounds how long other
+    worker processes keep accepting a key revoked through this one.
+    `endpoint` ("chat" or "ask") labels the auth stage timing.
+    """
+    with metrics.CHAT_STAGE_SECONDS.time(endpoint=endpoint, stage="auth"):
+        return await _aresolve_api_key(db, token_hash)
+
+
+async def _aresolve_api_key(db: AsyncSession, token_hash: str) -> ResolvedAPIKey:
+    if signed_keys.is_signed_token(token_hash):
+        return await _aresolve_signed_key(token_hash)
+
+    found, key = _cached_key(token_hash)
+    if not found:
+        row = (await db.execute(
+            select(APIKey.id, APIKey.chatbot_id, APIKey.vendor_id, APIKey.status)
+            .where(APIKey.token_hash == token_hash)
+        )).first()
+        key = ResolvedAPIKey(*row) if row else None
+        _store_key(token_hash, key)
+
+    if key is None or key.status != APIKeyStatus.active:
+        raise HTTPException(status_code=401, detail="Invalid API token")
+    return key
+
+
+async def _aresolve_signed_key(token: str) -> ResolvedAPIKey:
+    claims = signed_keys.verify_api_key(token)
+    if claims is None:
+        raise HTTPException(status_code=401, detail="Invalid API token")
+    await signed_keys.arefresh_revocations()
+    if not signed_keys.is_loaded():
+        # without the revocation set a revoked key would pass; fail closed
+        raise HTTPException(status_code=503, detail="API key revocations are unavailable")
+    if signed_keys.is_revoked(claims.key_id):
+        raise HTTPException(status_code=401, detail="Invalid API token")
+    return ResolvedAPIKey(
+        id=claims.key_id,
+        chatbot_id=claims.chatbot_id,
+        vendor_id=claims.vendor_id,
+        status=APIKeyStatus.active
+    )
+
+
+def invalidate_api_key(token_hash: str) -> None:
+    with _lock:
+        _keys.pop(token_hash, None)
+
+
+def clear_api_keys() -> None:
+    with _lock:
+        _keys.clear()
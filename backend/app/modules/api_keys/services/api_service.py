@@ -1,9 +1,9 @@
-import hashlib
-import base64
 import secrets
 from sqlalchemy.orm import Session
 from fastapi import HTTPException
 from modules.api_keys.models.api_model import APIKey
+from modules.api_keys.services.api_key_cache import invalidate_api_key
+from modules.api_keys.services.signed_keys import sign_api_key, note_status
 from modules.api_keys.schemas.api_schema import (
     APIKeyCreate,
     APIKeyUpdate,
@@ -11,34 +11,26 @@ from modules.api_keys.schemas.api_schema import (
 )
 from core.enums import APIKeyStatus
 
-def _generate_token(vendor_domain: str, chatbot_id: int):
-    secret = secrets.token_urlsafe(32)
-    raw = f"{vendor_domain}:{chatbot_id}:{secret}"
-    encoded = base64.urlsafe_b64encode(raw.encode()).decode()
-    token = f"vd_{encoded}"
-    token_hash = hashlib.sha256(token.encode()).hexdigest()
-    return token, token_hash
-
 def create_api_key(
     db: Session,
     api_key_data: APIKeyCreate,
     vendor_id: int
 ) -> APIKeyCreateResponse:
 
-    token, token_hash = _generate_token(
-        api_key_data.vendor_domain,
-        api_key_data.chatbot_id
-    )
-
     new_key = APIKey(
         vendor_id=vendor_id,
         chatbot_id=api_key_data.chatbot_id,
         vendor_domain=api_key_data.vendor_domain,
-        token_hash=token_hash,
+        # placeholder until the id is known; the signed token embeds it
+        token_hash=secrets.token_urlsafe(32),
         status=APIKeyStatus.active
     )
 
     db.add(new_key)
+    db.flush()
+    # signed keys are what the chat URLs carry, so token_hash holds the token itself
+    token = sign_api_key(new_key.id, new_key.chatbot_id, new_key.vendor_id)
+    new_key.token_hash = token
     db.commit()
     db.refresh(new_key)
 
@@ -77,6 +69,8 @@ def update_api_key(
     for field, value in api_key_data.dict(exclude_unset=True).items():
         setattr(key, field, value)
     db.commit()
+    invalidate_api_key(key.token_hash)
+    note_status(key.id, key.status)
     db.refresh(key)
     return key
 
@@ -87,5 +81,7 @@ def delete_api_key(db: Session, key_id: int, vendor_id: int):
     ).first()
     if not key:
         raise HTTPException(status_code=404, detail="API key not found")
-    key.status = APIKeyStatus.revoked
+    key.status = APIKeyStatus.inactive
     db.commit()
+    invalidate_api_key(key.token_hash)
+    note_status(key.id, key.status)
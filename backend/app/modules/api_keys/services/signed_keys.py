@@ -0,0 +1,143 @@
+import asyncio
+import base64
+import hashlib
+import hmac
+import threading
+import time
+from dataclasses import dataclass
+from datetime import timedelta
+from typing import Optional, Set
+from sqlalchemy import func, select
+from core.config import settings
+from core.enums import APIKeyStatus
+from db.database import AsyncSessionLocal
+from modules.api_keys.models.api_model import APIKey
+
+TOKEN_PREFIX = "ck1"
+
+# re-read changes this far behind the watermark, so rows committed late by a
+# long transaction (updated_at = its start time) are still picked up
+_REFRESH_OVERLAP = timedelta(seconds=60)
+
+
+@dataclass(frozen=True)
+class SignedKeyClaims:
+    key_id: int
+    chatbot_id: int
+    vendor_id: int
+    version: int
+
+
+def _secret() -> bytes:
+    return (settings.API_KEY_SIGNING_SECRET or settings.SECRET_KEY).encode()
+
+
+def _signature(body: str) -> str:
+    digest = hmac.new(_secret(), body.encode(), hashlib.sha256).digest()
+    return base64.urlsafe_b64encode(digest).decode().rstrip("=")
+
+
+def sign_api_key(key_id: int, chatbot_id: int, vendor_id: int) -> str:
+    """ck1.<version>.<key id>.<chatbot id>.<vendor id>.<HMAC-SHA256>"""
+    body = f"{TOKEN_PREFIX}.{settings.API_KEY_SIGNING_VERSION}.{key_id}.{chatbot_id}.{vendor_id}"
+    return f"{body}.{_signature(body)}"
+
+
+def is_signed_token(token: str) -> bool:
+    return token.startswith(TOKEN_PREFIX + ".")
+
+
+def verify_api_key(token: str) -> Optional[SignedKeyClaims]:
+    """
+    Check the signature and return the embedded claims, or None for forged or
+    malformed tokens. Tokens signed under another API_KEY_SIGNING_VERSION are
+    rejected, so bumping the version retires every key issued before it.
+    """
+    parts = token.split(".")
+    if len(parts) != 6 or parts[0] != TOKEN_PREFIX:
+        return None
+    if not hmac.compare_digest(parts[5], _signature(".".join(parts[:5]))):
+        return None
+    try:
+        version, key_id, chatbot_id, vendor_id = (int(p) for p in parts[1:5])
+    except ValueError:
+        return None
+    if version != settings.API_KEY_SIGNING_VERSION:
+        return None
+    return SignedKeyClaims(key_id=key_id, chatbot_id=chatbot_id, vendor_id=vendor_id, version=version)
+
+
+# ids of keys that are no longer active; one copy per worker process
+_revoked: Set[int] = set()
+_watermark = None  # newest api_keys.updated_at seen so far
+_loaded = False  # a load succeeded; until then nothing is known to be revoked
+_refreshed_at = 0.0
+_refresh: Optional[asyncio.Task] = None  # the load in flight, shared by every caller meanwhile
+_lock = threading.Lock()
+
+
+def is_loaded() -> bool:
+    return _loaded
+
+
+def is_revoked(key_id: int) -> bool:
+    return key_id in _revoked
+
+
+def note_status(key_id: int, status: APIKeyStatus) -> None:
+    """Apply a status change made through this process without waiting for the next refresh."""
+    with _lock:
+        if status == APIKeyStatus.active:
+            _revoked.discard(key_id)
+        else:
+            _revoked.add(key_id)
+
+
+async def arefresh_revocations(force: bool = False) -> None:
+    """
+    Bring the revocation set up to date at most every API_KEY_REVOCATION_REFRESH_SECONDS.
+    The first load reads every inactive key; later ones only read rows whose updated_at
+    moved past the watermark. Concurrent callers wait for the same load. On a database
+    error the current set is kept and the next call tries again; check is_loaded()
+    before trusting is_revoked().
+    """
+    global _refresh
+    if not force and _loaded and time.monotonic() - _refreshed_at < settings.API_KEY_REVOCATION_REFRESH_SECONDS:
+        return
+    if _refresh is None or _refresh.done():
+        _refresh = asyncio.ensure_future(_aload_revocations())
+    # a cancelled request must not cancel the load other requests wait for
+    await asyncio.shield(_refresh)
+
+
+async def _aload_revocations() -> None:
+    """Runs on a short session of its own, so a failed query never touches the request's session."""
+    global _watermark, _loaded, _refreshed_at
+    started = time.monotonic()
+    try:
+        async with AsyncSessionLocal() as db:
+            if _watermark is None:
+                watermark = (await db.execute(select(func.max(APIKey.updated_at)))).scalar()
+                rows = (await db.execute(
+                    select(APIKey.id, APIKey.status).where(APIKey.status != APIKeyStatus.active)
+                )).all()
+            else:
+                rows = (await db.execute(
+                    select(APIKey.id, APIKey.status, APIKey.updated_at)
+                    .where(APIKey.updated_at >= _watermark - _REFRESH_OVERLAP)
+                )).all()
+                watermark = max([row.updated_at for row in rows], default=_watermark)
+    except Exception as e:
+        print(f"[API KEY REVOCATION REFRESH ERROR] {e}")
+        return
+
+    with _lock:
+        for row in rows:
+            if row.status == APIKeyStatus.active:
+                _revoked.discard(row.id)
+            else:
+                _revoked.add(row.id)
+        if watermark is not None:
+            _watermark = max(watermark, _watermark) if _watermark is not None else watermark
+        _loaded = True
+        _refreshed_at = started
@@ -1,26 +1,40 @@
-from fastapi import APIRouter, Depends, HTTPException,UploadFile, File, Form
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException,UploadFile, File, Form, Request, Response
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 from typing import List, Optional
 from uuid import uuid4
-from db.database import get_db
-from modules.chatbots.schemas.chatbot_schema import ChatbotCreate, ChatbotRead, ChatbotUpdate, ChatbotVendorRead
+from db.database import get_db, get_async_db
+from modules.chatbots.schemas.chatbot_schema import ChatbotCreate, ChatbotRead, ChatbotUpdate, ChatbotVendorRead, ChatbotIngestionRead
 from modules.chatbots.services import chatbot_service
+from modules.documents.schemas.document_schema import IngestionJobRead
 from modules.chatbots.models.chatmodel import ChatRequest, ChatResponse
 from modules.vendors.models.vendor_model import Vendor
 from modules.admins.models.admin_model import Admin
 from modules.users.models.user_model import User
 from modules.chatbots.models.chatbot_model import Chatbot
 from modules.api_keys.models.api_model import APIKey
+from modules.api_keys.services.api_key_cache import aresolve_api_key
 from core.enums import VectorStoreType, UserRole
 from modules.auth.vendors.auth_vendor import get_current_vendor
 from modules.auth.admins.auth_admin import get_current_admin
 from modules.auth.users.auth_user import get_current_user, get_current_user_optional
+from utils.streaming import StreamFormat, stream_chat_response
+from core.config import settings
 
 
 router = APIRouter(tags=["Chatbots"])
 
-@router.post("/create", response_model=ChatbotRead)
+def _with_ingestion_job(chatbot: Chatbot, job, response: Response) -> ChatbotIngestionRead:
+    # 202 while uploaded files are still being indexed; poll GET /documents/jobs/{id}
+    result = ChatbotIngestionRead.model_validate(chatbot)
+    if job is not None:
+        response.status_code = 202
+        result.ingestion_job = IngestionJobRead.model_validate(job)
+    return result
+
+@router.post("/create", response_model=ChatbotIngestionRead)
 def create_chatbot_endpoint(
+    response: Response,
     name: str = Form(...),
     vendor_id: int = Form(...),
     description: Optional[str] = Form(None),
@@ -33,7 +47,7 @@ def create_chatbot_endpoint(
     db: Session = Depends(get_db),
     current_admin: Admin = Depends(get_current_admin)
 ):
-    chatbot = chatbot_service.create_chatbot_with_documents(
+    chatbot, job = chatbot_service.create_chatbot_with_documents(
         db=db,
         vendor_id=vendor_id,
         name=name,
@@ -45,7 +59,7 @@ def create_chatbot_endpoint(
         is_active=is_active,
         files=files
     )
-    return chatbot
+    return _with_ingestion_job(chatbot, job, response)
 
 @router.get("/", response_model=List[ChatbotRead])
 def get_vendor_chatbots(db: Session = Depends(get_db),  current_vendor: Vendor = Depends(get_current_vendor)):
@@ -81,9 +95,10 @@ def role_based_stats(chatbot_id: int, user_role: UserRole, db: Session = Depends
     else:
         raise HTTPException(status_code=403, detail="User role not allowed")
 
-@router.put("/{chatbot_id}", response_model=ChatbotRead)
+@router.put("/{chatbot_id}", response_model=ChatbotIngestionRead)
 async def update_chatbot_endpoint(
     chatbot_id: int,
+    response: Response,
     vendor_id: int = Form(...),
     name: str = Form(...),
     description: Optional[str] = Form(None),
@@ -107,7 +122,7 @@ async def update_chatbot_endpoint(
         is_active=is_active
     )
 
-    chatbot = chatbot_service.update_chatbot_with_documents(
+    chatbot, job = chatbot_service.update_chatbot_with_documents(
         db=db,
         chatbot_id=chatbot_id,
         chatbot_data=chatbot_data,
@@ -117,7 +132,7 @@ async def update_chatbot_endpoint(
     if not chatbot:
         raise HTTPException(status_code=404, detail="Chatbot not found")
 
-    return chatbot
+    return _with_ingestion_job(chatbot, job, response)
 
 @router.delete("/{chatbot_id}")
 def delete_chatbot(chatbot_id: int, db: Session = Depends(get_db), current_admin: Admin = Depends(get_current_admin)):
@@ -126,55 +141,60 @@ def delete_chatbot(chatbot_id: int, db: Session = Depends(get_db), current_admin
         raise HTTPException(status_code=404, detail="Chatbot not found")
     return {"detail": "Chatbot deleted successfully"}
 
+def _use_response_cache(http_request: Request, no_cache: bool) -> bool:
+    # clients can skip the answer cache with ?no_cache=true or Cache-Control: no-cache
+    cache_control = http_request.headers.get("cache-control", "").lower()
+    return not no_cache and "no-cache" not in cache_control and "no-store" not in cache_control
+
+
+def _cache_headers(cache_status: str) -> dict:
+    if cache_status == "BYPASS":
+        return {"X-Cache": cache_status, "Cache-Control": "no-store"}
+    return {"X-Cache": cache_status, "Cache-Control": f"private, max-age={settings.RESPONSE_CACHE_TTL_SECONDS}"}
+
+
 @router.post("/{token}/ask", response_model=ChatResponse)
-def chatbot_interaction_user_singleturn(
+async def chatbot_interaction_user_singleturn(
     token: str,
     request: ChatRequest,
-    db: Session = Depends(get_db),
+    http_request: Request,
+    response: Response,
+    no_cache: bool = False,
+    db: AsyncSession = Depends(get_async_db),
 ):
-    api_key = db.query(APIKey).filter(APIKey.token_hash == token, APIKey.status == "active").first()
-    if not api_key:
-        raise HTTPException(status_code=401, detail="Invalid API token")
-    
-    chatbot = db.query(Chatbot).filter(Chatbot.id == api_key.chatbot_id).first()
-    if not chatbot:
-        raise HTTPException(status_code=404, detail="Chatbot not found")
+    api_key = await aresolve_api_key(db, token, "ask")
 
-    ai_reply = chatbot_service.handle_conversation_singleturn(
+    ai_reply, cache_status = await chatbot_service.handle_conversation_singleturn(
         db=db,
         question=request.question,
-        chatbot_id=chatbot.id,
-        token=token
+        api_key=api_key,
+        use_cache=_use_response_cache(http_request, no_cache)
     )
+    response.headers.update(_cache_headers(cache_status))
     return ChatResponse(
     answer=ai_reply.content if hasattr(ai_reply, "content") else str(ai_reply),
     session_id=None
     )
 
 @router.post("/{token}/chat", response_model=ChatResponse)
-def chatbot_interaction_multiturn(
+async def chatbot_interaction_multiturn(
     token: str,
     request: ChatRequest,
-    db: Session = Depends(get_db),
+    background_tasks: BackgroundTasks,
+    db: AsyncSession = Depends(get_async_db),
     current_user: User | None = Depends(get_current_user_optional), 
 ):
-    api_key = db.query(APIKey).filter(APIKey.token_hash == token, APIKey.status == "active").first()
-    if not api_key:
-        raise HTTPException(status_code=401, detail="Invalid API token")
-    
-    chatbot = db.query(Chatbot).filter(Chatbot.id == api_key.chatbot_id).first()
-    if not chatbot:
-        raise HTTPException(status_code=404, detail="Chatbot not found")
+    api_key = await aresolve_api_key(db, token, "chat")
 
     session_id = request.session_id or str(uuid4())
 
-    ai_text = chatbot_service.handle_conversation_multiturn(
+    ai_text = await chatbot_service.handle_conversation_multiturn(
         db=db,
         question=request.question,
-        chatbot_id=chatbot.id,
+        api_key=api_key,
         session_id=session_id,
         user=current_user, 
-        token=token 
+        background_tasks=background_tasks
     )
 
     return ChatResponse(
@@ -182,6 +202,49 @@ def chatbot_interaction_multiturn(
         session_id=session_id
     )
 
+@router.post("/{token}/ask/stream")
+async def chatbot_interaction_user_singleturn_stream(
+    token: str,
+    request: ChatRequest,
+    http_request: Request,
+    format: StreamFormat = StreamFormat.sse,
+    no_cache: bool = False,
+    db: AsyncSession = Depends(get_async_db),
+):
+    api_key = await aresolve_api_key(db, token, "ask")
+
+    chunks, cache_status = await chatbot_service.stream_conversation_singleturn(
+        db=db,
+        question=request.question,
+        api_key=api_key,
+        use_cache=_use_response_cache(http_request, no_cache)
+    )
+    # the event stream itself is never HTTP-cacheable; only report the status
+    return stream_chat_response(chunks, format, headers={"X-Cache": cache_status})
+
+@router.post("/{token}/chat/stream")
+async def chatbot_interaction_multiturn_stream(
+    token: str,
+    request: ChatRequest,
+    background_tasks: BackgroundTasks,
+    format: StreamFormat = StreamFormat.sse,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: User | None = Depends(get_current_user_optional),
+):
+    api_key = await aresolve_api_key(db, token, "chat")
+
+    session_id = request.session_id or str(uuid4())
+
+    chunks = await chatbot_service.stream_conversation_multiturn(
+        db=db,
+        question=request.question,
+        api_key=api_key,
+        session_id=session_id,
+        user=current_user,
+        background_tasks=background_tasks
+    )
+    return stream_chat_response(chunks, format, session_id)
+
 @router.post("/test/{chatbot_id}/chat", response_model=ChatResponse)
 def test_chatbot_interaction_multiturn(
     chatbot_id: int,
@@ -4,6 +4,7 @@ from datetime import datetime
 from core.enums import VectorStoreType
 from modules.vendors.schemas.vendor_schema import VendorRead
 from modules.llms.schemas.llm_schema import LLMRead
+from modules.documents.schemas.document_schema import IngestionJobRead
 
 class ChatbotBase(BaseModel):
     vendor_id: int
@@ -36,6 +37,10 @@ class ChatbotRead(ChatbotBase):
 
     model_config = ConfigDict(from_attributes=True)
 
+class ChatbotIngestionRead(ChatbotRead):
+    # set when uploaded files are being indexed in the background
+    ingestion_job: Optional[IngestionJobRead] = None
+
 class ChatbotVendorRead(BaseModel):
     id: int
     name: str
@@ -0,0 +1,155 @@
+import threading
+import time
+from dataclasses import dataclass
+from typing import Dict, Optional, Tuple
+from fastapi import HTTPException
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session, aliased
+from core.config import settings
+from core.enums import VectorStoreType
+from modules.chatbots.models.chatbot_model import Chatbot
+from modules.embeddings.models.embedding_model import Embedding
+from modules.llms.models.llm_model import LLM
+from modules.vector_dbs.models.vector_db_model import VectorDB
+
+
+@dataclass(frozen=True)
+class ChatbotRuntime:
+    """
+    Detached snapshot of everything a chat turn needs to know about a chatbot.
+    Safe to share between requests and threads (no ORM state attached).
+    """
+    chatbot_id: int
+    vendor_id: int
+    system_prompt: Optional[str]
+    llm_id: int
+    llm_path: str
+    def_token_limit: int
+    def_context_limit: int
+    embedding_id: Optional[int]
+    embedding_model_name: Optional[str]
+    vector_store_type: VectorStoreType
+    vector_db_id: Optional[int]
+    vector_db_path: Optional[str]
+    # changes on every indexing pass (the VectorDB row is reused); answer caches key on it
+    vector_db_version: Optional[str] = None
+
+
+# chatbot_id -> (runtime, loaded_at); one copy per worker process
+_runtimes: Dict[int, Tuple[ChatbotRuntime, float]] = {}
+_lock = threading.Lock()
+
+
+def latest_vector_db_id_subquery():
+    """Correlated scalar subquery: id of the newest active vector DB of the outer Chatbot row."""
+    vdb = aliased(VectorDB)
+    return (
+        select(vdb.id)
+        .where(vdb.chatbot_id == Chatbot.id, vdb.is_active == True)
+        .order_by(vdb.updated_at.desc().nullslast(), vdb.created_at.desc())
+        .limit(1)
+        .correlate(Chatbot)
+        .scalar_subquery()
+    )
+
+
+def load_chatbot_runtime(db: Session, chatbot_id: int) -> ChatbotRuntime:
+    """Load everything a chat turn needs in a single statement."""
+    row = (
+        db.query(Chatbot, LLM, Embedding, VectorDB)
+        .outerjoin(LLM, LLM.id == Chatbot.llm_id)
+        .outerjoin(Embedding, Embedding.id == LLM.embedding_id)
+        .outerjoin(VectorDB, VectorDB.id == latest_vector_db_id_subquery())
+        .filter(Chatbot.id == chatbot_id, Chatbot.is_active == True)
+        .first()
+    )
+    if not row:
+        raise HTTPException(status_code=404, detail="Chatbot not found or inactive")
+    chatbot, llm_obj, embedd_obj, vector_db_obj = row
+
+    if not llm_obj:
+        raise HTTPException(status_code=404, detail="LLM not found for this chatbot")
+
+    if not chatbot.llm_path or not chatbot.llm_path.strip():
+        raise HTTPException(status_code=400, detail="Chatbot LLM path not configured")
+
+    return ChatbotRuntime(
+        chatbot_id=chatbot.id,
+        vendor_id=chatbot.vendor_id,
+        system_prompt=chatbot.system_prompt,
+        llm_id=llm_obj.id,
+        llm_path=chatbot.llm_path.strip(),
+        def_token_limit=llm_obj.def_token_limit,
+        def_context_limit=llm_obj.def_context_limit,
+        embedding_id=embedd_obj.id if embedd_obj else None,
+        embedding_model_name=embedd_obj.model_name if embedd_obj else None,
+        vector_store_type=chatbot.vector_store_type,
+        vector_db_id=vector_db_obj.id if vector_db_obj else None,
+        vector_db_path=vector_db_obj.db_path if vector_db_obj else None,
+        vector_db_version=_vector_db_version(vector_db_obj),
+    )
+
+
+def _vector_db_version(vector_db_obj: Optional[VectorDB]) -> Optional[str]:
+    if vector_db_obj is None:
+        return None
+    updated_at = vector_db_obj.updated_at or vector_db_obj.created_at
+    return f"{vector_db_obj.id}@{updated_at.isoformat() if updated_at else ''}"
+
+
+def _cached_runtime(chatbot_id: int) -> Optional[ChatbotRuntime]:
+    with _lock:
+        cached = _runtimes.get(chatbot_id)
+    if cached and time.monotonic() - cached[1] < settings.CHATBOT_RUNTIME_TTL_SECONDS:
+        return cached[0]
+    return None
+
+
+def _store_runtime(runtime: ChatbotRuntime) -> None:
+    with _lock:
+        _runtimes[runtime.chatbot_id] = (runtime, time.monotonic())
+
+
+def get_chatbot_runtime(db: Session, chatbot_id: int) -> ChatbotRuntime:
+    """
+    Return the cached runtime for a chatbot, loading it on a miss.
+    Entries expire after CHATBOT_RUNTIME_TTL_SECONDS so that other worker
+    processes eventually see changes made through this one.
+    """
+    runtime = _cached_runtime(chatbot_id)
+    if runtime is None:
+        runtime = load_chatbot_runtime(db, chatbot_id)
+        _store_runtime(runtime)
+    return runtime
+
+
+async def aget_chatbot_runtime(db: AsyncSession, chatbot_id: int) -> ChatbotRuntime:
+    """Async counterpart of get_chatbot_runtime; the loader runs through AsyncSession.run_sync."""
+    runtime = _cached_runtime(chatbot_id)
+    if runtime is None:
+        runtime = await db.run_sync(load_chatbot_runtime, chatbot_id)
+        _store_runtime(runtime)
+    return runtime
+
+
+def invalidate_chatbot_runtime(chatbot_id: int) -> None:
+    with _lock:
+        _runtimes.pop(chatbot_id, None)
+
+
+def invalidate_runtimes_for_llm(llm_id: int) -> None:
+    with _lock:
+        for chatbot_id in [cid for cid, (rt, _) in _runtimes.items() if rt.llm_id == llm_id]:
+            del _runtimes[chatbot_id]
+
+
+def invalidate_runtimes_for_embedding(embedding_id: int) -> None:
+    with _lock:
+        for chatbot_id in [cid for cid, (rt, _) in _runtimes.items() if rt.embedding_id == embedding_id]:
+            del _runtimes[chatbot_id]
+
+
+def clear_chatbot_runtimes() -> None:
+    with _lock:
+        _runtimes.clear()
@@ -1,26 +1,44 @@
-from fastapi import UploadFile, HTTPException
-from sqlalchemy.orm import Session, joinedload
+import asyncio
+import time
+from fastapi import UploadFile, HTTPException, BackgroundTasks
+from sqlalchemy.orm import Session, joinedload, object_session
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.exc import IntegrityError
-from sqlalchemy import func
-from langchain_ollama import ChatOllama, OllamaEmbeddings
+from sqlalchemy import func, select
 from langchain.messages import HumanMessage, AIMessage, SystemMessage
-from typing import List, Optional
+from dataclasses import dataclass
+from typing import Any, List, Optional, Tuple
+from core.config import settings
 from uuid import uuid4
-from core.enums import SenderType, VectorStoreType, DocumentStatus
+from core.enums import SenderType, VectorStoreType
 from modules.api_keys.models.api_model import APIKey
 from modules.chatbots.models.chatbot_model import Chatbot
 from modules.conversations.models.conversation_model import Conversation
 from modules.embeddings.models.embedding_model import Embedding
 from modules.vendors.models.vendor_model import Vendor
 from modules.messages.models.messages_model import Message
-from modules.messages.services import mesasges_service
+from modules.messages.services import mesasges_service, history_planner, message_writer
 from modules.vector_dbs.models.vector_db_model import VectorDB
 from modules.chatbots.schemas.chatbot_schema import ChatbotUpdate
-from modules.rag.services import rag_service
+from modules.rag.services import rag_service, query_embedding_cache
 from modules.users.models.user_model import User
 from modules.api_keys.models.api_model import APIKey
 from modules.chatbots.services import chatbot_service
-from modules.documents.services.document_service import create_documents_bulk, embed_document
+from modules.api_keys.services.api_key_cache import ResolvedAPIKey
+from modules.chatbots.services.chatbot_runtime import (
+    ChatbotRuntime,
+    aget_chatbot_runtime,
+    invalidate_chatbot_runtime,
+    load_chatbot_runtime
+)
+from modules.chatbots.services import semantic_cache, response_cache
+from modules.conversations.services import conversation_summary_service
+from modules.documents.services.document_service import create_documents_bulk
+from modules.documents.services import ingestion_jobs
+from modules.documents.models.ingestion_job_model import IngestionJob
+from utils import metrics, ollama_clients, ollama_scheduler, single_flight
+from utils.ollama_scheduler import Priority
+from utils.stage_timer import StageTimer
 
 
 def create_chatbot_with_documents(
@@ -34,7 +52,8 @@ def create_chatbot_with_documents(
     vector_store_type: VectorStoreType,
     is_active: bool = True,
     files: list[UploadFile] | None = None
-):
+) -> Tuple[Chatbot, Optional[IngestionJob]]:
+    """Returns the chatbot and the background job indexing `files`, if any were given."""
     # 1️⃣ Create Chatbot
     chatbot = Chatbot(
         vendor_id=vendor_id,
@@ -50,20 +69,12 @@ def create_chatbot_with_documents(
     db.commit()
     db.refresh(chatbot)
 
-    saved_docs = []
+    job = None
     if files:
         saved_docs = create_documents_bulk(db, chatbot.id, files)
+        job = ingestion_jobs.start_job(db, chatbot.id, saved_docs)
 
-    if saved_docs:
-        try:
-            embed_document(db, saved_docs[0].id)
-        except Exception as e:
-            for doc in saved_docs:
-                doc.status = DocumentStatus.processing_failed  
-            db.commit()
-            raise e
-
-    return chatbot
+    return chatbot, job
 
 
 def get_chatbots(db: Session) -> List[Chatbot]:
@@ -125,10 +136,11 @@ def update_chatbot_with_documents(
     chatbot_id: int,
     chatbot_data: ChatbotUpdate,
     files: list[UploadFile] | None = None
-) -> Chatbot:
+) -> Tuple[Optional[Chatbot], Optional[IngestionJob]]:
+    """Returns the chatbot (None if missing) and the background job indexing `files`, if any."""
     chatbot = db.query(Chatbot).get(chatbot_id)
     if not chatbot:
-        return None
+        return None, None
 
     # Update chatbot fields
     chatbot.name = chatbot_data.name or chatbot.name
@@ -143,19 +155,14 @@ def update_chatbot_with_documents(
     db.add(chatbot)
     db.commit()
     db.refresh(chatbot)
+    invalidate_chatbot_runtime(chatbot.id)
 
+    job = None
     if files:
-        saved_docs = create_documents_bulk(db, chatbot.vendor_id, chatbot.id, files)
-        if saved_docs:
-            try:
-                embed_document(db, saved_docs[0].id)
-            except Exception as e:
-                for doc in saved_docs:
-                    doc.status = DocumentStatus.processing_failed
-                db.commit()
-                raise e
+        saved_docs = create_documents_bulk(db, chatbot.id, files)
+        job = ingestion_jobs.start_job(db, chatbot.id, saved_docs)
 
-    return chatbot
+    return chatbot, job
 
 
 def delete_chatbot(db: Session, chatbot_id: int) -> bool:
@@ -164,121 +171,279 @@ def delete_chatbot(db: Session, chatbot_id: int) -> bool:
         return False
     db.delete(chatbot)
     db.commit()
+    invalidate_chatbot_runtime(chatbot_id)
+    semantic_cache.invalidate_chatbot(chatbot_id)
     return True
 
 def get_latest_vector_db(chatbot: Chatbot) -> Optional[VectorDB]:
-    active_vdbs = [vdb for vdb in chatbot.vector_dbs if vdb.is_active]
-    if not active_vdbs:
-        return None
+    # query for the one row instead of loading the whole vector_dbs relationship
+    return (
+        object_session(chatbot).query(VectorDB)
+        .filter(VectorDB.chatbot_id == chatbot.id, VectorDB.is_active == True)
+        .order_by(VectorDB.updated_at.desc().nullslast(), VectorDB.created_at.desc())
+        .first()
+    )
+
+FAREWELLS = ("bye", "goodbye", "see you")
+FAREWELL_REPLY = "It was nice chatting with you. Goodbye!"
+
 
-    return max(
-        active_vdbs,
-        key=lambda v: (v.updated_at or v.created_at)
+def _build_final_question(question: str, context: str | None) -> str:
+    return (
+        f"Context:\n{context}\n\nQuestion:\n{question}"
+        if context else question
     )
 
-def handle_conversation_singleturn(
-    db: Session,
-    question: str,
-    chatbot_id: int,
-    token: str
-):
-    chatbot = db.query(Chatbot).filter(
-        Chatbot.id == chatbot_id,
-        Chatbot.is_active == True
-    ).first()
 
-    if not chatbot:
-        raise HTTPException(status_code=404, detail="Chatbot not found or inactive")
+@dataclass
+class ChatTurn:
+    """Everything resolved for one chat exchange before the model is called."""
+    runtime: ChatbotRuntime
+    conversation_id: Optional[int] = None
+    model: Any = None
+    messages: Optional[list] = None
+    # the user said goodbye and the conversation has been closed
+    farewell: bool = False
+    # served from the semantic cache; the model is not called
+    cached_answer: Optional[str] = None
+    # question embedding, shared by retrieval and the semantic cache
+    query_vector: Optional[List[float]] = None
+    # the answer depends only on the question (no history), so it may go into the semantic cache
+    history_free: bool = True
+    # exact-match /ask cache: key to store the answer under, and HIT / SEMANTIC / MISS / BYPASS
+    # (/ask also reports COALESCED when it joined an identical in-flight request)
+    response_cache_key: Optional[str] = None
+    cache_status: str = "BYPASS"
+    # older history no longer fits the prompt; the rolling summary should be refreshed
+    needs_summary: bool = False
+    # per-stage wall-clock timings of this turn
+    timer: Optional[StageTimer] = None
+
+
+async def _embed_question(runtime: ChatbotRuntime, question: str) -> Optional[List[float]]:
+    if not runtime.embedding_model_name:
+        return None
+    # only worth a model call when something will use the vector
+    if not runtime.vector_db_path and not semantic_cache.is_enabled(runtime.chatbot_id):
+        return None
+    embeddings = ollama_clients.get_embeddings(runtime.embedding_model_name)
+    return await query_embedding_cache.aembed_query(embeddings, question)
 
-    api_token = db.query(APIKey).filter(APIKey.token_hash==token, APIKey.chatbot_id==chatbot.id).first()
-    if not api_token:
-        raise HTTPException(status_code=404, detail="API Key not found or incorrect")    
 
-    llm_obj = chatbot.llm
-    if not llm_obj:
-        raise HTTPException(status_code=404, detail="LLM not found for this chatbot")
+def _semantic_lookup(runtime: ChatbotRuntime, query_vector) -> Optional[str]:
+    if query_vector is None or not semantic_cache.is_enabled(runtime.chatbot_id):
+        return None
+    return semantic_cache.lookup(runtime, query_vector)
 
-    if not chatbot.llm_path:
-        raise HTTPException(status_code=400, detail="Chatbot does not have an LLM path configured")
 
-    if not chatbot.llm_path or chatbot.llm_path.strip() == "":
-        raise HTTPException(status_code=400, detail="Chatbot llm_path is empty or not configured")
+async def _retrieve_context(runtime, question: str, query_vector=None, timer: Optional[StageTimer] = None) -> str | None:
+    if not runtime.vector_db_path or not runtime.embedding_model_name:
+        return None
+    embeddings = ollama_clients.get_embeddings(runtime.embedding_model_name)
+    vectordb = await rag_service.aload_vectorstore(
+        runtime.vector_store_type,
+        runtime.vector_db_path,
+        embeddings,
+        runtime.vector_db_version
+    )
+    context, _ = await rag_service.aget_rag_context(question, vectordb, embedding=query_vector, timer=timer)
+    return context
 
-    model = ChatOllama(
-        model=chatbot.llm_path.strip(),
-        temperature=0.7,
+
+async def _remember_answer(turn: ChatTurn, question: str, ai_text: str):
+    if turn.cached_answer is not None:
+        return
+    if turn.query_vector is not None and turn.history_free and semantic_cache.is_enabled(turn.runtime.chatbot_id):
+        semantic_cache.store(turn.runtime, question, turn.query_vector, ai_text)
+    if turn.response_cache_key is not None:
+        await response_cache.store(turn.response_cache_key, ai_text)
+
+
+def _count_request(endpoint: str, runtime: ChatbotRuntime) -> None:
+    metrics.CHAT_REQUESTS.inc(
+        endpoint=endpoint,
+        chatbot_id=runtime.chatbot_id,
+        vendor_id=runtime.vendor_id,
+        model=runtime.llm_path
     )
 
-    vector_db_obj = chatbot_service.get_latest_vector_db(chatbot)
 
-    embedd_obj = db.query(Embedding).filter(
-        Embedding.id == llm_obj.embedding_id
-    ).first()
+async def _generate(turn: ChatTurn) -> str:
+    async with ollama_scheduler.aadmit(turn.runtime.llm_path, Priority.production, turn.runtime.vendor_id):
+        with metrics.LLM_GENERATION_SECONDS.time(model=turn.runtime.llm_path):
+            response = await turn.model.ainvoke(turn.messages)
+    return response.content
+
+
+async def _generate_stream(turn: ChatTurn):
+    async with ollama_scheduler.aadmit(turn.runtime.llm_path, Priority.production, turn.runtime.vendor_id):
+        started = time.perf_counter()
+        first = True
+        async for chunk in turn.model.astream(turn.messages):
+            if chunk.content:
+                if first:
+                    metrics.LLM_FIRST_TOKEN_SECONDS.observe(time.perf_counter() - started, model=turn.runtime.llm_path)
+                    first = False
+                yield chunk.content
+        metrics.LLM_GENERATION_SECONDS.observe(time.perf_counter() - started, model=turn.runtime.llm_path)
+
 
-    if not embedd_obj:
+async def prepare_singleturn(
+    db: AsyncSession,
+    question: str,
+    api_key: ResolvedAPIKey,
+    use_cache: bool = True
+) -> ChatTurn:
+    """Resolve config and RAG context for a stateless question."""
+    timer = StageTimer("ask", metrics.CHAT_STAGE_SECONDS)
+    runtime = await timer.run("config", aget_chatbot_runtime(db, api_key.chatbot_id))
+    _count_request("ask", runtime)
+    return await _prepare_singleturn_for_runtime(runtime, question, use_cache, timer)
+
+
+async def _prepare_singleturn_for_runtime(
+    runtime: ChatbotRuntime,
+    question: str,
+    use_cache: bool,
+    timer: StageTimer
+) -> ChatTurn:
+    if not runtime.embedding_model_name:
         raise HTTPException(status_code=404, detail="Embedding not found for this LLM")
 
-    embeddings = OllamaEmbeddings(model=embedd_obj.model_name)
+    if not use_cache or not settings.RESPONSE_CACHE_ENABLED:
+        return await _prepare_singleturn_model(runtime, question, None, timer)
 
-    if vector_db_obj:
-        vectordb = rag_service.load_vectorstore(
-            chatbot.vector_store_type,
-            vector_db_obj.db_path,
-            embeddings
+    response_cache_key = response_cache.cache_key(runtime, question)
+    cached = await response_cache.get(response_cache_key)
+    if cached is not None:
+        return ChatTurn(runtime=runtime, cached_answer=cached, cache_status="HIT", timer=timer)
+
+    return await _prepare_singleturn_model(runtime, question, response_cache_key, timer)
+
+
+async def _prepare_singleturn_model(
+    runtime: ChatbotRuntime,
+    question: str,
+    response_cache_key: Optional[str],
+    timer: StageTimer
+) -> ChatTurn:
+    cache_status = "MISS" if response_cache_key else "BYPASS"
+
+    query_vector = await timer.run("embed", _embed_question(runtime, question))
+    cached = _semantic_lookup(runtime, query_vector)
+    if cached is not None:
+        return ChatTurn(
+            runtime=runtime,
+            cached_answer=cached,
+            query_vector=query_vector,
+            cache_status="SEMANTIC",
+            timer=timer
         )
-        context, _ = rag_service.get_rag_context(question, vectordb)
-    else:
-        context = None
-    
-    system_msg = SystemMessage(
-        content=chatbot.system_prompt or "You are a helpful assistant."
+
+    model = ollama_clients.get_chat_model(
+        runtime.llm_path,
+        temperature=0.7,
+        num_ctx=runtime.def_context_limit,
+        num_predict=runtime.def_token_limit
     )
+    context = await timer.run("retrieve", _retrieve_context(runtime, question, query_vector, timer))
 
-    final_question = (
-        f"Context:\n{context}\n\nQuestion:\n{question}"
-        if context else question
+    system_prompt = runtime.system_prompt or "You are a helpful assistant."
+    plan = history_planner.plan_history(
+        system_prompt, question, context, [], runtime.def_context_limit, runtime.def_token_limit
     )
+    metrics.CHAT_PROMPT_TOKENS.observe(plan.prompt_tokens, model=runtime.llm_path)
 
-    human_msg = HumanMessage(content=final_question)
-    response = model.invoke([system_msg, human_msg])
-    return response.content
+    messages = [
+        SystemMessage(content=system_prompt),
+        HumanMessage(content=_build_final_question(question, plan.context)),
+    ]
+    return ChatTurn(
+        runtime=runtime,
+        model=model,
+        messages=messages,
+        query_vector=query_vector,
+        response_cache_key=response_cache_key,
+        cache_status=cache_status,
+        timer=timer
+    )
 
-def handle_conversation_multiturn(
-    db: Session,
+
+async def handle_conversation_singleturn(
+    db: AsyncSession,
     question: str,
-    chatbot_id: int,
+    api_key: ResolvedAPIKey,
+    use_cache: bool = True
+):
+    """
+    Returns (answer, cache_status). Concurrent identical questions to the same
+    chatbot configuration share one retrieval and generation (COALESCED).
+    """
+    timer = StageTimer("ask", metrics.CHAT_STAGE_SECONDS)
+    runtime = await timer.run("config", aget_chatbot_runtime(db, api_key.chatbot_id))
+    _count_request("ask", runtime)
+    # nothing is written for /ask, give the pooled connection back before generating
+    await db.commit()
+
+    async def answer():
+        turn = await _prepare_singleturn_for_runtime(runtime, question, use_cache, timer)
+        if turn.cached_answer is not None:
+            return turn.cached_answer, turn.cache_status
+
+        with timer.stage("generate"):
+            ai_text = await _generate(turn)
+        await _remember_answer(turn, question, ai_text)
+        return ai_text, turn.cache_status
+
+    if not settings.ASK_COALESCING_ENABLED:
+        return await answer()
+
+    # a no-cache request must not pick up an answer another caller got from the cache
+    key = f"{response_cache.cache_key(runtime, question)}:{int(use_cache)}"
+    (ai_text, cache_status), shared = await single_flight.run(key, answer)
+    if shared and cache_status in ("MISS", "BYPASS"):
+        cache_status = "COALESCED"
+    return ai_text, cache_status
+
+
+async def stream_conversation_singleturn(
+    db: AsyncSession,
+    question: str,
+    api_key: ResolvedAPIKey,
+    use_cache: bool = True
+):
+    """
+    Same as handle_conversation_singleturn but returns (async iterator of text chunks, cache_status).
+    Config errors are raised before the first chunk so the router can still answer 4xx.
+    """
+    turn = await prepare_singleturn(db, question, api_key, use_cache)
+    await db.commit()
+
+    async def chunks():
+        if turn.cached_answer is not None:
+            yield turn.cached_answer
+            return
+        parts = []
+        with turn.timer.stage("generate"):
+            async for chunk in _generate_stream(turn):
+                parts.append(chunk)
+                yield chunk
+        await _remember_answer(turn, question, "".join(parts))
+
+    return chunks(), turn.cache_status
+
+
+async def _get_or_create_conversation(
+    db: AsyncSession,
     session_id: str,
-    token: str,
+    chatbot_id: int,
     user: User | None = None
-):
-
-    chatbot = db.query(Chatbot).filter(
-        Chatbot.id == chatbot_id,
-        Chatbot.is_active == True
-    ).first()
-    if not chatbot:
-        raise HTTPException(status_code=404, detail="Chatbot not found or inactive")
-    
-    api_token = db.query(APIKey).filter(APIKey.token_hash==token, APIKey.chatbot_id==chatbot.id).first()
-    if not api_token:
-        raise HTTPException(status_code=404, detail="API Key not found or incorrect")
-
-    llm_obj = chatbot.llm
-    if not llm_obj:
-        raise HTTPException(status_code=404, detail="LLM not found for this chatbot")
-
-    if not chatbot.llm_path or not chatbot.llm_path.strip():
-        raise HTTPException(status_code=400, detail="Chatbot LLM path not configured")
-
-    # --- Fetch or create conversation ---
-    conversation = (
-        db.query(Conversation)
-        .filter(
-            Conversation.session_id == session_id,
-            Conversation.chatbot_id == chatbot_id
-        )
-        .first()
+) -> Conversation:
+    query = select(Conversation).where(
+        Conversation.session_id == session_id,
+        Conversation.chatbot_id == chatbot_id
     )
+    conversation = (await db.execute(query)).scalars().first()
 
     if conversation is None:
         conversation = Conversation(
@@ -289,97 +454,257 @@ def handle_conversation_multiturn(
         )
         db.add(conversation)
         try:
-            db.commit()
-            db.refresh(conversation)
+            await db.commit()
         except IntegrityError:
-            db.rollback()
-            conversation = (
-                db.query(Conversation)
-                .filter(
-                    Conversation.session_id == session_id,
-                    Conversation.chatbot_id == chatbot_id
-                )
-                .first()
-            )
+            await db.rollback()
+            conversation = (await db.execute(query)).scalars().first()
             if conversation is None:
                 raise HTTPException(
                     status_code=500,
                     detail="Failed to create or fetch conversation"
                 )
-            db.refresh(conversation)
 
-    # --- Check for "bye" message ---
-    if question.strip().lower() in ("bye", "goodbye", "see you"):
-        conversation.is_active = False
-        db.commit()
-        return "It was nice chatting with you. Goodbye!"
+    return conversation
 
-    # --- Fetch conversation history only if active ---
-    history = []
-    if conversation.is_active:
-        history = (
-            db.query(Message)
-            .filter(Message.conversation_id == conversation.id)
-            .order_by(Message.created_at.asc())
-            .all()
+
+async def prepare_multiturn(
+    db: AsyncSession,
+    question: str,
+    api_key: ResolvedAPIKey,
+    session_id: str,
+    user: User | None = None
+) -> ChatTurn:
+    """
+    Resolve config, conversation, history and RAG context for one chat turn.
+    Question embedding + retrieval run concurrently with the conversation and
+    history queries, so the turn waits for the slower of the two, not both.
+    """
+    timer = StageTimer("chat", metrics.CHAT_STAGE_SECONDS)
+    runtime = await timer.run("config", aget_chatbot_runtime(db, api_key.chatbot_id))
+    _count_request("chat", runtime)
+
+    # retrieval uses neither the conversation nor the DB session, so it starts right away
+    retrieval = asyncio.create_task(_embed_and_retrieve(runtime, question, timer))
+    try:
+        # --- Fetch or create conversation ---
+        conversation = await timer.run(
+            "conversation", _get_or_create_conversation(db, session_id, runtime.chatbot_id, user)
         )
 
-    messages = [
-        SystemMessage(content=chatbot.system_prompt or "You are a helpful assistant.")
-    ]
+        # --- Check for "bye" message ---
+        if question.strip().lower() in FAREWELLS:
+            conversation.is_active = False
+            await db.commit()
+            return ChatTurn(runtime=runtime, conversation_id=conversation.id, farewell=True, timer=timer)
+
+        history, summary = await timer.run("history", _load_history(db, conversation))
+        query_vector, context = await retrieval
+    finally:
+        _discard(retrieval)
+
+    # --- Opening questions don't depend on history, so they may be answered from cache ---
+    if not history and not summary:
+        cached = _semantic_lookup(runtime, query_vector)
+        if cached is not None:
+            return ChatTurn(
+                runtime=runtime,
+                conversation_id=conversation.id,
+                cached_answer=cached,
+                query_vector=query_vector,
+                timer=timer
+            )
 
-    for msg in history:
+    system_prompt = runtime.system_prompt or "You are a helpful assistant."
+    plan = history_planner.plan_history(
+        system_prompt,
+        question,
+        context,
+        history,
+        runtime.def_context_limit,
+        runtime.def_token_limit,
+        summary=summary
+    )
+    metrics.CHAT_PROMPT_TOKENS.observe(plan.prompt_tokens, model=runtime.llm_path)
+
+    if summary:
+        system_prompt = f"{system_prompt}\n\nSummary of the earlier conversation:\n{summary}"
+    messages = [SystemMessage(content=system_prompt)]
+
+    for msg in plan.history:
         if msg.sender_type in (SenderType.external, SenderType.vendor, SenderType.admin):
             messages.append(HumanMessage(content=msg.content))
         else:  # chatbot messages
             messages.append(AIMessage(content=msg.content))
 
-    # --- Prepare embeddings and context if RAG is used ---
-    embedd_obj = db.query(Embedding).filter(Embedding.id == llm_obj.embedding_id).first()
-    embeddings = OllamaEmbeddings(model=embedd_obj.model_name) if embedd_obj else None
+    messages.append(HumanMessage(content=_build_final_question(question, plan.context)))
 
-    vector_db_obj = chatbot_service.get_latest_vector_db(chatbot)
-    if vector_db_obj and embeddings:
-        vectordb = rag_service.load_vectorstore(
-            chatbot.vector_store_type,
-            vector_db_obj.db_path,
-            embeddings
+    model = ollama_clients.get_chat_model(
+        runtime.llm_path,
+        temperature=0.6,
+        num_ctx=runtime.def_context_limit,
+        num_predict=runtime.def_token_limit
+    )
+    return ChatTurn(
+        runtime=runtime,
+        conversation_id=conversation.id,
+        model=model,
+        messages=messages,
+        query_vector=query_vector,
+        history_free=not history and not summary,
+        needs_summary=plan.truncated or len(history) >= settings.HISTORY_MAX_MESSAGES,
+        timer=timer
+    )
+
+
+async def _load_history(db: AsyncSession, conversation: Conversation):
+    """Unsummarized tail of the history (oldest first) and the rolling summary; empty if inactive."""
+    if not conversation.is_active:
+        return [], None
+
+    summary = None
+    # taken before the query: a row flushed in between shows up in both and is dropped below
+    pending = message_writer.pending_messages(conversation.id)
+    query = select(Message).where(Message.conversation_id == conversation.id)
+    if conversation.summary_until_message_id:
+        query = query.where(Message.id > conversation.summary_until_message_id)
+        summary = conversation.summary
+    history = (await db.execute(
+        query
+        .order_by(Message.created_at.desc(), Message.id.desc())
+        .limit(settings.HISTORY_MAX_MESSAGES)
+    )).scalars().all()[::-1]
+    if pending:
+        stored = {(m.sender_type, m.content, m.created_at) for m in history}
+        history += [m for m in pending if (m.sender_type, m.content, m.created_at) not in stored]
+        history = history[-settings.HISTORY_MAX_MESSAGES:]
+    return history, summary
+
+
+async def _embed_and_retrieve(runtime: ChatbotRuntime, question: str, timer: StageTimer):
+    query_vector = await timer.run("embed", _embed_question(runtime, question))
+    context = await timer.run("retrieve", _retrieve_context(runtime, question, query_vector, timer))
+    return query_vector, context
+
+
+def _discard(task: asyncio.Task) -> None:
+    """Cancel a helper task that is no longer needed without leaving its error unretrieved."""
+    if not task.done():
+        task.cancel()
+    elif not task.cancelled():
+        task.exception()
+
+
+def _schedule_summary(turn: ChatTurn, background_tasks: BackgroundTasks | None):
+    if turn.needs_summary and background_tasks is not None:
+        background_tasks.add_task(
+            conversation_summary_service.refresh_conversation_summary,
+            turn.conversation_id,
+            turn.runtime.llm_path
         )
-        context, _ = rag_service.get_rag_context(question, vectordb)
-    else:
-        context = None
 
-    final_question = (
-        f"Context:\n{context}\n\nQuestion:\n{question}"
-        if context else question
-    )
-    messages.append(HumanMessage(content=final_question))
 
-    # --- Call the LLM ---
-    model = ChatOllama(model=chatbot.llm_path.strip(), temperature=0.6)
-    response = model.invoke(messages)
-    ai_text = response.content
+async def save_conversation_turn(
+    db: AsyncSession,
+    conversation_id: int,
+    question: str,
+    ai_text: str,
+    user: User | None = None
+):
+    rows = [
+        # --- User message ---
+        dict(
+            conversation_id=conversation_id,
+            sender_type=SenderType.external if not user else SenderType(user.role.value),
+            content=question,
+            token_count=history_planner.count_tokens(question)
+        ),
+        # --- Bot message ---
+        dict(
+            conversation_id=conversation_id,
+            sender_type=SenderType.chatbot,
+            content=ai_text,
+            token_count=history_planner.count_tokens(ai_text)
+        ),
+    ]
+    # with write-behind on, the rows are inserted in a later batch instead of committed here
+    if message_writer.enqueue(rows):
+        return
 
-    # --- Save user message ---
-    db.add(Message(
-        conversation_id=conversation.id,
-        sender_type=SenderType.external if not user else SenderType(user.role.value),
-        content=question,
-        token_count=len(question.split())
-    ))
+    db.add_all([Message(**row) for row in rows])
+    await db.commit()
 
-    # --- Save bot message ---
-    db.add(Message(
-        conversation_id=conversation.id,
-        sender_type=SenderType.chatbot,
-        content=ai_text,
-        token_count=len(ai_text.split())
-    ))
 
-    db.commit()
+async def handle_conversation_multiturn(
+    db: AsyncSession,
+    question: str,
+    api_key: ResolvedAPIKey,
+    session_id: str,
+    user: User | None = None,
+    background_tasks: BackgroundTasks | None = None
+):
+    turn = await prepare_multiturn(db, question, api_key, session_id, user)
+    if turn.farewell:
+        return FAREWELL_REPLY
+
+    if turn.cached_answer is not None:
+        ai_text = turn.cached_answer
+    else:
+        # end the read transaction so no pooled connection is held while the model generates
+        await db.commit()
+
+        # --- Call the LLM ---
+        with turn.timer.stage("generate"):
+            ai_text = await _generate(turn)
+        await _remember_answer(turn, question, ai_text)
+
+    with turn.timer.stage("persist"):
+        await save_conversation_turn(db, turn.conversation_id, question, ai_text, user)
+    _schedule_summary(turn, background_tasks)
 
     return ai_text
 
+
+async def stream_conversation_multiturn(
+    db: AsyncSession,
+    question: str,
+    api_key: ResolvedAPIKey,
+    session_id: str,
+    user: User | None = None,
+    background_tasks: BackgroundTasks | None = None
+):
+    """
+    Streaming variant of handle_conversation_multiturn. Returns an async iterator of
+    text chunks; the assembled answer is persisted once the model finishes. If the
+    client disconnects mid-stream nothing is saved for the turn.
+    """
+    turn = await prepare_multiturn(db, question, api_key, session_id, user)
+
+    if turn.farewell:
+        async def farewell():
+            yield FAREWELL_REPLY
+        return farewell()
+
+    await db.commit()
+    # background tasks run after the streamed body completes
+    _schedule_summary(turn, background_tasks)
+
+    async def chunks():
+        if turn.cached_answer is not None:
+            ai_text = turn.cached_answer
+            yield ai_text
+        else:
+            parts = []
+            with turn.timer.stage("generate"):
+                async for chunk in _generate_stream(turn):
+                    parts.append(chunk)
+                    yield chunk
+            ai_text = "".join(parts)
+            await _remember_answer(turn, question, ai_text)
+        with turn.timer.stage("persist"):
+            await save_conversation_turn(db, turn.conversation_id, question, ai_text, user)
+
+    return chunks()
+
 def test_handle_conversation_multiturn(
     db: Session,
     question: str,
@@ -388,19 +713,8 @@ def test_handle_conversation_multiturn(
     user: User | None = None
 ):
 
-    chatbot = db.query(Chatbot).filter(
-        Chatbot.id == chatbot_id,
-        Chatbot.is_active == True
-    ).first()
-    if not chatbot:
-        raise HTTPException(status_code=404, detail="Chatbot not found or inactive")
-
-    llm_obj = chatbot.llm
-    if not llm_obj:
-        raise HTTPException(status_code=404, detail="LLM not found for this chatbot")
-
-    if not chatbot.llm_path or not chatbot.llm_path.strip():
-        raise HTTPException(status_code=400, detail="Chatbot LLM path not configured")
+    # uncached on purpose: vendors test right after editing the chatbot
+    runtime = load_chatbot_runtime(db, chatbot_id)
 
     # --- Fetch or create conversation ---
     conversation = (
@@ -457,7 +771,7 @@ def test_handle_conversation_multiturn(
         )
 
     messages = [
-        SystemMessage(content=chatbot.system_prompt or "You are a helpful assistant.")
+        SystemMessage(content=runtime.system_prompt or "You are a helpful assistant.")
     ]
 
     for msg in history:
@@ -467,15 +781,17 @@ def test_handle_conversation_multiturn(
             messages.append(AIMessage(content=msg.content))
 
     # --- Prepare embeddings and context if RAG is used ---
-    embedd_obj = db.query(Embedding).filter(Embedding.id == llm_obj.embedding_id).first()
-    embeddings = OllamaEmbeddings(model=embedd_obj.model_name) if embedd_obj else None
+    embeddings = (
+        ollama_clients.get_embeddings(runtime.embedding_model_name)
+        if runtime.embedding_model_name else None
+    )
 
-    vector_db_obj = chatbot_service.get_latest_vector_db(chatbot)
-    if vector_db_obj and embeddings:
+    if runtime.vector_db_path and embeddings:
         vectordb = rag_service.load_vectorstore(
-            chatbot.vector_store_type,
-            vector_db_obj.db_path,
-            embeddings
+            runtime.vector_store_type,
+            runtime.vector_db_path,
+            embeddings,
+            runtime.vector_db_version
         )
         context, _ = rag_service.get_rag_context(question, vectordb)
     else:
@@ -488,8 +804,9 @@ def test_handle_conversation_multiturn(
     messages.append(HumanMessage(content=final_question))
 
     # --- Call the LLM ---
-    model = ChatOllama(model=chatbot.llm_path.strip(), temperature=0.6)
-    response = model.invoke(messages)
+    model = ollama_clients.get_chat_model(runtime.llm_path, temperature=0.6)
+    with ollama_scheduler.admit(runtime.llm_path, Priority.test, runtime.vendor_id):
+        response = model.invoke(messages)
     ai_text = response.content
 
     # --- Save user message ---
@@ -0,0 +1,102 @@
+import hashlib
+import re
+import threading
+import time
+from collections import OrderedDict
+from typing import Optional, Tuple
+import redis.asyncio as aioredis
+from core.config import settings
+from modules.chatbots.services.chatbot_runtime import ChatbotRuntime
+
+KEY_PREFIX = "askcache:v1:"
+
+# key -> (answer, expires_at); first tier, per process
+_local: "OrderedDict[str, Tuple[str, float]]" = OrderedDict()
+_lock = threading.Lock()
+_redis: Optional[aioredis.Redis] = None
+
+
+def _redis_client() -> Optional[aioredis.Redis]:
+    global _redis
+    if not settings.REDIS_URL:
+        return None
+    if _redis is None:
+        _redis = aioredis.from_url(settings.REDIS_URL, socket_timeout=settings.RESPONSE_CACHE_REDIS_TIMEOUT_SECONDS)
+    return _redis
+
+
+def normalize_question(question: str) -> str:
+    """Case, surrounding punctuation and whitespace runs don't change the question."""
+    text = re.sub(r"\s+", " ", question.strip().lower())
+    return text.strip(" ?!.")
+
+
+def cache_key(runtime: ChatbotRuntime, question: str) -> str:
+    prompt_hash = hashlib.sha256((runtime.system_prompt or "").encode()).hexdigest()
+    raw = "\x00".join([
+        str(runtime.chatbot_id),
+        prompt_hash,
+        runtime.llm_path,
+        str(runtime.vector_db_version),
+        normalize_question(question),
+    ])
+    return KEY_PREFIX + hashlib.sha256(raw.encode()).hexdigest()
+
+
+def _get_local(key: str) -> Optional[str]:
+    with _lock:
+        cached = _local.get(key)
+        if cached is None:
+            return None
+        if cached[1] < time.monotonic():
+            del _local[key]
+            return None
+        _local.move_to_end(key)
+        return cached[0]
+
+
+def _set_local(key: str, answer: str) -> None:
+    with _lock:
+        _local[key] = (answer, time.monotonic() + settings.RESPONSE_CACHE_TTL_SECONDS)
+        _local.move_to_end(key)
+        while len(_local) > settings.RESPONSE_CACHE_MAX_ENTRIES:
+            _local.popitem(last=False)
+
+
+async def get(key: str) -> Optional[str]:
+    """Look the key up in the process LRU, then in Redis (shared by all workers)."""
+    answer = _get_local(key)
+    if answer is not None:
+        return answer
+
+    client = _redis_client()
+    if client is None:
+        return None
+    try:
+        value = await client.get(key)
+    except Exception:
+        # the second tier is best effort; a Redis outage must not fail chat requests
+        return None
+    if value is None:
+        return None
+    answer = value.decode() if isinstance(value, bytes) else value
+    _set_local(key, answer)
+    return answer
+
+
+async def store(key: str, answer: str) -> None:
+    if not answer:
+        return
+    _set_local(key, answer)
+    client = _redis_client()
+    if client is None:
+        return
+    try:
+        await client.set(key, answer, ex=settings.RESPONSE_CACHE_TTL_SECONDS)
+    except Exception:
+        pass
+
+
+def clear_local() -> None:
+    with _lock:
+        _local.clear()
@@ -0,0 +1,117 @@
+import hashlib
+import threading
+import time
+from collections import defaultdict
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Sequence
+import numpy as np
+from core.config import settings
+from modules.chatbots.services.chatbot_runtime import ChatbotRuntime
+from utils import metrics
+
+
+@dataclass
+class _Entry:
+    vector: np.ndarray  # L2-normalised question embedding
+    question: str
+    answer: str
+    # index version the answer was produced against (ChatbotRuntime.vector_db_version)
+    vector_db_version: Optional[str]
+    config_key: str
+    created_at: float
+
+
+# chatbot_id -> entries, oldest first
+_entries: Dict[int, List[_Entry]] = defaultdict(list)
+_lock = threading.Lock()
+
+LOOKUPS = metrics.Counter(
+    "semantic_cache_lookups_total",
+    "Semantic answer cache lookups by chatbot and result (hit or miss).",
+    ["chatbot_id", "result"]
+)
+
+
+def is_enabled(chatbot_id: int) -> bool:
+    if not settings.SEMANTIC_CACHE_ENABLED:
+        return False
+    return not settings.SEMANTIC_CACHE_CHATBOT_IDS or chatbot_id in settings.SEMANTIC_CACHE_CHATBOT_IDS
+
+
+def config_key(runtime: ChatbotRuntime) -> str:
+    """Answers are only reusable for the same system prompt and model."""
+    raw = f"{runtime.system_prompt or ''}\x00{runtime.llm_path}"
+    return hashlib.sha256(raw.encode()).hexdigest()
+
+
+def _normalise(vector: Sequence[float]) -> np.ndarray:
+    arr = np.asarray(vector, dtype=np.float32)
+    norm = np.linalg.norm(arr)
+    return arr / norm if norm else arr
+
+
+def lookup(runtime: ChatbotRuntime, vector: Sequence[float]) -> Optional[str]:
+    """
+    Return a previous answer whose question is at least SEMANTIC_CACHE_THRESHOLD
+    cosine-similar to `vector`, produced against the chatbot's current vector DB
+    and configuration, or None.
+    """
+    query = _normalise(vector)
+    key = config_key(runtime)
+    cutoff = time.time() - settings.SEMANTIC_CACHE_TTL_SECONDS
+
+    with _lock:
+        entries = _entries.get(runtime.chatbot_id, [])
+        # expired entries are always the oldest ones
+        while entries and entries[0].created_at < cutoff:
+            entries.pop(0)
+
+        candidates = [
+            e for e in entries
+            if e.vector_db_version == runtime.vector_db_version and e.config_key == key
+            and e.vector.shape == query.shape
+        ]
+        if candidates:
+            scores = np.stack([e.vector for e in candidates]) @ query
+            best = int(np.argmax(scores))
+            if scores[best] >= settings.SEMANTIC_CACHE_THRESHOLD:
+                LOOKUPS.inc(chatbot_id=runtime.chatbot_id, result="hit")
+                return candidates[best].answer
+        LOOKUPS.inc(chatbot_id=runtime.chatbot_id, result="miss")
+        return None
+
+
+def store(runtime: ChatbotRuntime, question: str, vector: Sequence[float], answer: str) -> None:
+    if not answer:
+        return
+    entry = _Entry(
+        vector=_normalise(vector),
+        question=question,
+        answer=answer,
+        vector_db_version=runtime.vector_db_version,
+        config_key=config_key(runtime),
+        created_at=time.time(),
+    )
+    with _lock:
+        entries = _entries[runtime.chatbot_id]
+        entries.append(entry)
+        if len(entries) > settings.SEMANTIC_CACHE_MAX_ENTRIES:
+            del entries[:len(entries) - settings.SEMANTIC_CACHE_MAX_ENTRIES]
+
+
+def invalidate_chatbot(chatbot_id: int) -> None:
+    with _lock:
+        _entries.pop(chatbot_id, None)
+
+
+def _entry_counts():
+    with _lock:
+        return [((chatbot_id,), len(entries)) for chatbot_id, entries in _entries.items()]
+
+
+metrics.Gauge(
+    "semantic_cache_entries",
+    "Answers held in the semantic cache per chatbot.",
+    ["chatbot_id"],
+    _entry_counts
+)
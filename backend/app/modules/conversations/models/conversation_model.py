@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, ForeignKey, DateTime, Boolean, UniqueConstraint
+from sqlalchemy import Column, Integer, String, Text, ForeignKey, DateTime, Boolean, UniqueConstraint
 from sqlalchemy.orm import relationship
 from datetime import datetime
 from db.database import Base
@@ -14,6 +14,11 @@ class Conversation(Base):
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     is_active = Column(Boolean, default=True, nullable=False)  # <-- new field
 
+    # rolling summary of messages up to and including summary_until_message_id
+    summary = Column(Text, nullable=True)
+    summary_until_message_id = Column(Integer, nullable=True)
+    summary_updated_at = Column(DateTime, nullable=True)
+
     messages = relationship(
         "Message",
         back_populates="conversation",
@@ -0,0 +1,105 @@
+import threading
+from datetime import datetime
+from typing import Set
+from langchain.messages import HumanMessage, SystemMessage
+from sqlalchemy import select, update
+from core.config import settings
+from core.enums import SenderType
+from db.database import AsyncSessionLocal
+from modules.conversations.models.conversation_model import Conversation
+from modules.messages.models.messages_model import Message
+from utils import ollama_clients, ollama_scheduler
+from utils.ollama_scheduler import Priority
+
+SUMMARY_SYSTEM_PROMPT = (
+    "You maintain a running summary of a conversation between a user and an assistant. "
+    "Merge the existing summary with the new messages into one updated summary. "
+    "Keep facts, names, numbers, decisions, open questions and user preferences; "
+    "drop greetings and small talk. Write at most {max_words} words of plain prose."
+)
+
+# conversations with a refresh already running in this process
+_in_flight: Set[int] = set()
+_lock = threading.Lock()
+
+
+def _transcript(messages) -> str:
+    lines = []
+    for msg in messages:
+        speaker = "Assistant" if msg.sender_type == SenderType.chatbot else "User"
+        lines.append(f"{speaker}: {msg.content}")
+    return "\n".join(lines)
+
+
+async def refresh_conversation_summary(conversation_id: int, llm_path: str) -> None:
+    """
+    Fold older unsummarized messages of a conversation into its rolling summary.
+
+    Runs after the response has been sent (FastAPI BackgroundTasks). The newest
+    SUMMARY_KEEP_RECENT_MESSAGES stay verbatim; nothing happens until at least
+    SUMMARY_EVERY_N_TURNS turns are waiting to be folded, so the summary is
+    rewritten once every N turns rather than on every message.
+    """
+    with _lock:
+        if conversation_id in _in_flight:
+            return
+        _in_flight.add(conversation_id)
+
+    try:
+        # the session (and its pooled connection) is only held to read and to write;
+        # waiting for admission and generating can take many seconds
+        async with AsyncSessionLocal() as db:
+            conversation = await db.get(Conversation, conversation_id)
+            if conversation is None:
+                return
+            previous_summary = conversation.summary
+            previous_until = conversation.summary_until_message_id
+
+            query = select(Message).where(Message.conversation_id == conversation_id)
+            if previous_until:
+                query = query.where(Message.id > previous_until)
+            pending = (await db.execute(
+                query.order_by(Message.id.asc()).limit(
+                    settings.SUMMARY_MAX_FOLD_MESSAGES + settings.SUMMARY_KEEP_RECENT_MESSAGES
+                )
+            )).scalars().all()
+
+            to_fold = pending[:max(0, len(pending) - settings.SUMMARY_KEEP_RECENT_MESSAGES)]
+            to_fold = to_fold[:settings.SUMMARY_MAX_FOLD_MESSAGES]
+            if len(to_fold) < 2 * settings.SUMMARY_EVERY_N_TURNS:
+                return
+            transcript = _transcript(to_fold)
+            fold_until = to_fold[-1].id
+
+        model = ollama_clients.get_chat_model(llm_path, temperature=0.0)
+        async with ollama_scheduler.aadmit(llm_path, Priority.background):
+            response = await model.ainvoke([
+                SystemMessage(content=SUMMARY_SYSTEM_PROMPT.format(max_words=settings.SUMMARY_MAX_WORDS)),
+                HumanMessage(content=(
+                    f"Existing summary:\n{previous_summary or '(none)'}\n\n"
+                    f"New messages:\n{transcript}"
+                )),
+            ])
+
+        async with AsyncSessionLocal() as db:
+            # skipped if another worker folded these messages in the meantime
+            await db.execute(
+                update(Conversation)
+                .where(
+                    Conversation.id == conversation_id,
+                    Conversation.summary_until_message_id.is_(None) if previous_until is None
+                    else Conversation.summary_until_message_id == previous_until
+                )
+                .values(
+                    summary=response.content.strip(),
+                    summary_until_message_id=fold_until,
+                    summary_updated_at=datetime.utcnow()
+                )
+            )
+            await db.commit()
+    except Exception as e:
+        # best effort: the next overflowing turn schedules another attempt
+        print(f"[SUMMARY REFRESH ERROR] conversation={conversation_id}: {e}")
+    finally:
+        with _lock:
+            _in_flight.discard(conversation_id)
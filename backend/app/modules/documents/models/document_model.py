@@ -3,6 +3,8 @@ from sqlalchemy.orm import relationship
 from datetime import datetime
 from db.database import Base
 from core.enums import DocumentStatus
+# registers IngestionJob wherever Document is mapped
+from modules.documents.models.ingestion_job_model import IngestionJob
 
 class Document(Base):
     __tablename__ = "documents"
@@ -12,9 +14,17 @@ class Document(Base):
     title = Column(String, nullable=False)
     file_path = Column(String, nullable=False)
     status = Column(Enum(DocumentStatus), default=DocumentStatus.processing)
+    # sha256 of the file as last indexed, and how many chunks it has in the vector store
+    content_hash = Column(String(64), nullable=True)
+    chunk_count = Column(Integer, nullable=False, default=0)
+    # last ingestion job that picked the document up, and where that job is with it
+    ingestion_job_id = Column(String(32), ForeignKey("ingestion_jobs.id", ondelete="SET NULL"), nullable=True, index=True)
+    ingestion_stage = Column(String, nullable=True)
+    ingestion_progress = Column(Integer, nullable=False, default=0)
     created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
 
     chatbot = relationship("Chatbot", back_populates="documents")
+    ingestion_job = relationship("IngestionJob", back_populates="documents")
 
 
 
@@ -0,0 +1,26 @@
+from sqlalchemy import Column, Integer, String, Text, ForeignKey, Enum, DateTime
+from sqlalchemy.orm import relationship
+from datetime import datetime
+from db.database import Base
+from core.enums import IngestionJobStatus
+
+class IngestionJob(Base):
+    __tablename__ = "ingestion_jobs"
+
+    id = Column(String(32), primary_key=True, index=True)
+    chatbot_id = Column(Integer, ForeignKey("chatbots.id", ondelete="CASCADE"), nullable=False, index=True)
+    status = Column(Enum(IngestionJobStatus), default=IngestionJobStatus.queued, nullable=False)
+    # current step (queued, extracting, embedding, saving, done) and overall progress in percent
+    stage = Column(String, default="queued", nullable=False)
+    progress = Column(Integer, default=0, nullable=False)
+    total_documents = Column(Integer, default=0, nullable=False)
+    processed_documents = Column(Integer, default=0, nullable=False)
+    failed_documents = Column(Integer, default=0, nullable=False)
+    error = Column(Text, nullable=True)
+    # advisory lock key held by the API process whose thread pool runs the job; None on Celery
+    worker_lock = Column(Integer, nullable=True)
+    created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+    started_at = Column(DateTime, nullable=True)
+    finished_at = Column(DateTime, nullable=True)
+
+    documents = relationship("Document", back_populates="ingestion_job")
@@ -2,8 +2,8 @@ from fastapi import APIRouter, UploadFile, File, Form, Depends, HTTPException
 from sqlalchemy.orm import Session
 from typing import List
 from db.database import get_db
-from modules.documents.schemas.document_schema import DocumentCreate, DocumentRead
-from modules.documents.services import document_service
+from modules.documents.schemas.document_schema import DocumentCreate, DocumentRead, IngestionJobRead
+from modules.documents.services import document_service, ingestion_jobs
 from modules.vendors.models.vendor_model import Vendor
 from modules.admins.models.admin_model import Admin
 from modules.auth.vendors.auth_vendor import get_current_vendor
@@ -11,23 +11,22 @@ from modules.auth.admins.auth_admin import get_current_admin
 
 router = APIRouter(tags=["Documents"])
 
-@router.post("/chatbots/{chatbot_id}/documents", response_model=List[DocumentRead])
+@router.post("/chatbots/{chatbot_id}/documents", response_model=IngestionJobRead, status_code=202)
 def upload_documents(
     chatbot_id: int,
     files: List[UploadFile] = File(...),
     db: Session = Depends(get_db),
 ):
     saved_docs = document_service.create_documents_bulk(db, chatbot_id, files)
+    # extraction and embedding run in the background; poll GET /documents/jobs/{id}
+    return ingestion_jobs.start_job(db, chatbot_id, saved_docs)
 
-    for doc in saved_docs:
-        try:
-            vector_db = document_service.embed_document(db, doc.id)
-            doc.status = "embedded"
-        except Exception as e:
-            doc.status = "processing_failed"
-
-    db.commit()
-    return saved_docs
+@router.get("/jobs/{job_id}", response_model=IngestionJobRead)
+def get_ingestion_job(job_id: str, db: Session = Depends(get_db)):
+    job = ingestion_jobs.get_job(db, job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Ingestion job not found")
+    return job
 
 @router.get("/", response_model=List[DocumentRead])
 def get_documents(db: Session = Depends(get_db), current_vendor: Vendor = Depends(get_current_vendor)):
@@ -1,7 +1,7 @@
 from pydantic import BaseModel, ConfigDict
-from typing import Optional
+from typing import List, Optional
 from datetime import datetime
-from core.enums import DocumentStatus
+from core.enums import DocumentStatus, IngestionJobStatus
 
 class DocumentBase(BaseModel):
     chatbot_id: int
@@ -20,10 +20,30 @@ class DocumentUpdate(BaseModel):
 
 class DocumentRead(DocumentBase):
     id: int
+    ingestion_job_id: Optional[str] = None
+    ingestion_stage: Optional[str] = None
+    ingestion_progress: int = 0
     created_at: datetime
 
     model_config = ConfigDict(from_attributes=True)
 
+class IngestionJobRead(BaseModel):
+    id: str
+    chatbot_id: int
+    status: IngestionJobStatus
+    stage: str
+    progress: int
+    total_documents: int
+    processed_documents: int
+    failed_documents: int
+    error: Optional[str] = None
+    created_at: datetime
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+    documents: List[DocumentRead] = []
+
+    model_config = ConfigDict(from_attributes=True)
+
 # from pydantic import BaseModel, ConfigDict
 # from typing import Optional
 # from core.enums import DocumentStatus
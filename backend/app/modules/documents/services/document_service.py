@@ -1,17 +1,23 @@
+from sqlalchemy import func, select
 from sqlalchemy.orm import Session
 from fastapi import HTTPException, UploadFile
 from datetime import datetime
 from typing import List, Optional
 from pathlib import Path
-import uuid, shutil
+import os, uuid, shutil, threading
+from collections import defaultdict
+from contextlib import contextmanager
 from core.enums import DocumentStatus
 from modules.documents.models.document_model import Document
 from modules.documents.schemas.document_schema import DocumentCreate
-from modules.rag.services import rag_service
+from modules.rag.services import rag_service, vectorstore_cache
 from modules.chatbots.models.chatbot_model import Chatbot
 from modules.llms.models.llm_model import LLM
 from modules.embeddings.models.embedding_model import Embedding
 from modules.vector_dbs.models.vector_db_model import VectorDB
+from modules.chatbots.services.chatbot_runtime import invalidate_chatbot_runtime
+from modules.chatbots.services import semantic_cache
+from utils import ollama_clients
 # from utils.ai_summarizer import summarize_documents_generate_tags
 
 UPLOAD_DIR = Path("temp_uploads")
@@ -20,6 +26,15 @@ UPLOAD_DIR.mkdir(exist_ok=True, parents=True)
 PERMANENT_UPLOAD_DIR = Path("uploads/documents")
 PERMANENT_UPLOAD_DIR.mkdir(parents=True, exist_ok=True)
 
+# one indexing pass per chatbot at a time: a thread lock in this process and, on
+# Postgres, an advisory lock (INDEX_LOCK_NAMESPACE, chatbot id) across processes
+INDEX_LOCK_NAMESPACE = 7301
+# held by each API process for its lifetime, see ingestion_jobs.fail_orphaned_jobs
+WORKER_LOCK_NAMESPACE = 7302
+_index_locks = defaultdict(threading.Lock)
+_index_locks_guard = threading.Lock()
+
+
 def create_documents_bulk(
     db: Session,
     chatbot_id: int,
@@ -85,66 +100,182 @@ def delete_document(db: Session, document_id: int) -> bool:
     document = db.query(Document).filter(Document.id == document_id).first()
     if not document:
         return False
+    chatbot_id = document.chatbot_id
     db.delete(document)
     db.commit()
+    _remove_from_index(db, chatbot_id, document_id)
     return True
 
 
-def embed_document(db: Session, document_id: int) -> VectorDB:
+def _remove_from_index(db: Session, chatbot_id: int, document_id: int):
+    """Drop a deleted document's chunks from the chatbot's vector store; failures only leave stale chunks."""
     try:
-        document_obj = db.query(Document).filter(Document.id == document_id).first()
-        if not document_obj:
-            raise HTTPException(status_code=404, detail="Document not found")
-
-        chatbot = db.query(Chatbot).filter(
-            Chatbot.id == document_obj.chatbot_id,
-            Chatbot.is_active == True
-        ).first()
-        if not chatbot:
-            raise HTTPException(status_code=404, detail="Associated chatbot not found or inactive")
+        with chatbot_index_lock(db, chatbot_id):
+            chatbot = db.query(Chatbot).filter(Chatbot.id == chatbot_id).first()
+            latest = _latest_vector_db(db, chatbot_id)
+            if chatbot is None or latest is None:
+                return
+            embeddings = ollama_clients.get_embeddings(_chatbot_embedding(db, chatbot).model_name)
+            rag_service.delete_document_chunks(chatbot.vector_store_type, latest.db_path, embeddings, [document_id])
+            # new index version, so cached answers built on the removed chunks stop matching
+            latest.updated_at = func.now()
+            db.commit()
+            invalidate_chatbot_runtime(chatbot_id)
+            vectorstore_cache.invalidate_path(latest.db_path)
+            semantic_cache.invalidate_chatbot(chatbot_id)
+    except Exception as e:
+        print(f"[INDEXING ERROR] removing chunks of chatbot {chatbot_id}: {e}")
 
-        llm_obj = db.query(LLM).filter(LLM.id == chatbot.llm_id).first()
-        if not llm_obj:
-            raise HTTPException(status_code=404, detail="LLM not found for this chatbot")
 
-        embedd_obj = db.query(Embedding).filter(Embedding.id == llm_obj.embedding_id).first()
-        if not embedd_obj:
-            raise HTTPException(status_code=404, detail="Embedding not found for this LLM")
+def embed_document(db: Session, document_id: int) -> VectorDB:
+    """Index the document's chatbot; only new or changed documents are embedded."""
+    document_obj = db.query(Document).filter(Document.id == document_id).first()
+    if not document_obj:
+        raise HTTPException(status_code=404, detail="Document not found")
+    return index_chatbot_documents(db, document_obj.chatbot_id)
+
+
+def _chatbot_embedding(db: Session, chatbot: Chatbot) -> Embedding:
+    llm_obj = db.query(LLM).filter(LLM.id == chatbot.llm_id).first()
+    if not llm_obj:
+        raise HTTPException(status_code=404, detail="LLM not found for this chatbot")
+
+    embedd_obj = db.query(Embedding).filter(Embedding.id == llm_obj.embedding_id).first()
+    if not embedd_obj:
+        raise HTTPException(status_code=404, detail="Embedding not found for this LLM")
+    return embedd_obj
+
+
+def _latest_vector_db(db: Session, chatbot_id: int) -> Optional[VectorDB]:
+    return (
+        db.query(VectorDB)
+        .filter(VectorDB.chatbot_id == chatbot_id, VectorDB.is_active == True)
+        .order_by(VectorDB.updated_at.desc().nullslast(), VectorDB.created_at.desc())
+        .first()
+    )
+
+
+def index_chatbot_documents(db: Session, chatbot_id: int, progress=None) -> Optional[VectorDB]:
+    """
+    Bring the chatbot's vector store up to date with its documents in one pass.
+    Documents that are new or whose file changed (by sha256) are chunked, embedded
+    and upserted; unchanged ones are not touched. The store is rebuilt from all
+    documents when it doesn't exist yet, the vector store type changed, or it was
+    built before chunks had stable ids.
+    `progress` receives per-document stages, see ingestion_jobs.JobProgress.
+    """
+    with chatbot_index_lock(db, chatbot_id):
+        return _index_chatbot_documents(db, chatbot_id, progress)
+
+
+@contextmanager
+def chatbot_index_lock(db: Session, chatbot_id: int):
+    """
+    Held while a chatbot's vector store is written. The advisory lock is session-level
+    on a connection of its own, since the pass commits along the way; Postgres drops
+    it if the process dies.
+    """
+    with _index_locks_guard:
+        lock = _index_locks[chatbot_id]
+    with lock:
+        bind = db.get_bind()
+        if bind.dialect.name != "postgresql":
+            yield
+            return
+        with bind.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+            conn.execute(select(func.pg_advisory_lock(INDEX_LOCK_NAMESPACE, chatbot_id)))
+            try:
+                yield
+            finally:
+                conn.execute(select(func.pg_advisory_unlock(INDEX_LOCK_NAMESPACE, chatbot_id)))
+
+
+def _index_chatbot_documents(db: Session, chatbot_id: int, progress=None) -> Optional[VectorDB]:
+    chatbot = db.query(Chatbot).filter(
+        Chatbot.id == chatbot_id,
+        Chatbot.is_active == True
+    ).first()
+    if not chatbot:
+        raise HTTPException(status_code=404, detail="Associated chatbot not found or inactive")
+
+    embedd_obj = _chatbot_embedding(db, chatbot)
+
+    document_list = db.query(Document).filter(Document.chatbot_id == chatbot.id).all()
+    if not document_list:
+        raise HTTPException(status_code=404, detail="No documents found for this chatbot")
+
+    latest = _latest_vector_db(db, chatbot.id)
+    persist_path = rag_service.vector_store_path(chatbot.vector_store_type, chatbot.id)
+    rebuild = (
+        latest is None
+        or latest.db_path != persist_path
+        or not os.path.isdir(persist_path)
+        or any(doc.status == DocumentStatus.embedded and doc.content_hash is None for doc in document_list)
+    )
+
+    hashes = {}
+    pending = []
+    for doc in document_list:
+        try:
+            hashes[doc.id] = rag_service.file_sha256(doc.file_path)
+        except OSError as e:
+            print(f"[INDEXING ERROR] document {doc.id}: {e}")
+            doc.status = DocumentStatus.processing_failed
+            if progress is not None:
+                progress.document(doc.id, "failed")
+            continue
+        if rebuild or doc.status != DocumentStatus.embedded or doc.content_hash != hashes[doc.id]:
+            pending.append(doc)
+
+    # nothing of this session stays uncommitted (and row-locked) while progress is written elsewhere
+    db.commit()
+    if not pending:
+        return latest
 
-        document_list = db.query(Document).filter(Document.chatbot_id == chatbot.id).all()
-        if not document_list:
-            raise HTTPException(status_code=404, detail="No documents found for this chatbot")
+    try:
+        _, persist_path, chunk_counts = rag_service.embedd_document(
+            chatbot, embedd_obj, pending, rebuild=rebuild, progress=progress
+        )
+    except Exception as e:
+        db.rollback()
+        for doc in pending:
+            doc.status = DocumentStatus.processing_failed
+        db.commit()
+        raise e
 
+    for doc in pending:
+        if doc.id in chunk_counts:
+            doc.status = DocumentStatus.embedded
+            doc.content_hash = hashes[doc.id]
+            doc.chunk_count = chunk_counts[doc.id]
+        else:
+            # chunks of its earlier version were removed before extraction failed
+            doc.status = DocumentStatus.processing_failed
+            doc.content_hash = None
+            doc.chunk_count = 0
+
+    if progress is not None:
+        progress.stage("saving")
+    if latest is not None and latest.db_path == persist_path:
+        vector_db = latest
+        vector_db.updated_at = func.now()
+    else:
         existing_count = db.query(VectorDB).filter(VectorDB.chatbot_id == chatbot.id).count()
-        vector_db_name = f"{chatbot.name}_vdb_{existing_count + 1}"
-
-        vectordb_obj = rag_service.embedd_document(db, chatbot.id, embedd_obj, document_list)
-        persist_path = vectordb_obj._persist_directory
-
-
         vector_db = VectorDB(
             chatbot_id=chatbot.id,
-            name=vector_db_name,
-            db_path=persist_path, 
+            name=f"{chatbot.name}_vdb_{existing_count + 1}",
+            db_path=persist_path,
             is_active=True
         )
         db.add(vector_db)
 
-        for doc in document_list:
-            doc.status = DocumentStatus.embedded
-
-        db.commit()
-        db.refresh(vector_db)
-
-        return vector_db
+    db.commit()
+    db.refresh(vector_db)
+    invalidate_chatbot_runtime(chatbot.id)
+    vectorstore_cache.invalidate_path(persist_path)
+    semantic_cache.invalidate_chatbot(chatbot.id)
 
-    except Exception as e:
-        db.rollback()
-        if 'document_list' in locals():
-            for doc in document_list:
-                doc.status = DocumentStatus.processing_failed
-            db.commit()
-        raise e
+    return vector_db
 
 
 
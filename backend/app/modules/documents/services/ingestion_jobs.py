@@ -0,0 +1,292 @@
+import random
+import threading
+import time
+import uuid
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional
+from sqlalchemy import func, select
+from sqlalchemy.orm import Session, selectinload
+from core.config import settings
+from core.enums import DocumentStatus, IngestionJobStatus
+from db.database import SessionLocal
+from modules.chatbots.models.chatbot_model import Chatbot
+from modules.documents.models.document_model import Document
+from modules.documents.models.ingestion_job_model import IngestionJob
+from modules.documents.services import document_service
+from modules.documents.services.document_service import WORKER_LOCK_NAMESPACE
+from utils.websocket_broadcaster import broadcast_ingestion_update
+
+# Text extraction, chunking and embedding of uploaded documents run as a job outside
+# the HTTP request: on Celery when INGESTION_USE_CELERY is set, otherwise on a small
+# thread pool in this process. Progress lives on the job and document rows (polled via
+# GET /documents/jobs/{id}) and is pushed to the websocket clients of the process
+# running the job.
+#
+# A job on the thread pool records the key of an advisory lock (WORKER_LOCK_NAMESPACE,
+# key) that its process holds for as long as it lives, on Postgres. Postgres releases
+# it when the process dies, which is how fail_orphaned_jobs tells its jobs apart from
+# those of live processes.
+
+_executor = ThreadPoolExecutor(max_workers=max(1, settings.INGESTION_THREAD_WORKERS), thread_name_prefix="ingestion-job")
+
+# progress (percent) of a document at each stage; "embedding" fills the range up to
+# "indexed" as its chunks are written. The job's progress is the documents' average
+# until the database is updated ("saving").
+_STAGE_PROGRESS = {"queued": 0, "extracting": 5, "embedding": 10, "indexed": 90, "saving": 90, "done": 100, "failed": 100}
+_STAGE_ORDER = ["queued", "extracting", "embedding", "saving", "done"]
+_FLUSH_INTERVAL_SECONDS = 0.5
+
+_worker_lock_key: Optional[int] = None
+_worker_lock_conn = None
+_worker_lock_guard = threading.Lock()
+
+
+def start_job(db: Session, chatbot_id: int, documents: List[Document]) -> IngestionJob:
+    """Record a job for the freshly saved `documents` and hand it to a worker."""
+    job = IngestionJob(
+        id=uuid.uuid4().hex,
+        chatbot_id=chatbot_id,
+        total_documents=len(documents),
+        worker_lock=None if settings.INGESTION_USE_CELERY else _worker_lock(db)
+    )
+    db.add(job)
+    for doc in documents:
+        doc.ingestion_job = job
+        doc.ingestion_stage = "queued"
+        doc.ingestion_progress = 0
+    db.commit()
+
+    try:
+        if settings.INGESTION_USE_CELERY:
+            from modules.documents.services.ingestion_tasks import run_ingestion_job
+            run_ingestion_job.delay(job.id)
+        else:
+            _executor.submit(run_job, job.id)
+    except Exception as e:
+        print(f"[INGESTION JOB ERROR] could not queue {job.id}: {e}")
+        _finish(db, job.id, f"Could not queue ingestion job: {e}")
+
+    db.refresh(job)
+    return job
+
+
+def get_job(db: Session, job_id: str) -> Optional[IngestionJob]:
+    return (
+        db.query(IngestionJob)
+        .options(selectinload(IngestionJob.documents))
+        .filter(IngestionJob.id == job_id)
+        .first()
+    )
+
+
+def fail_orphaned_jobs() -> int:
+    """
+    Mark thread-pool jobs whose process is gone (a restart or crash left them queued or
+    running) as failed, so their documents don't wait forever; called at startup.
+    Celery jobs are left to the broker, which redelivers them. Returns how many failed.
+    """
+    db = SessionLocal()
+    try:
+        jobs = (
+            db.query(IngestionJob.id, IngestionJob.worker_lock)
+            .filter(
+                IngestionJob.status.in_([IngestionJobStatus.queued, IngestionJobStatus.running]),
+                IngestionJob.worker_lock.isnot(None)
+            )
+            .all()
+        )
+        orphaned = [job_id for job_id, key in jobs if not _worker_alive(db, key)]
+        for job_id in orphaned:
+            _finish(db, job_id, "Interrupted: the server running this job stopped")
+        if orphaned:
+            print(f"[INGESTION] marked {len(orphaned)} orphaned job(s) as failed")
+        return len(orphaned)
+    except Exception as e:
+        db.rollback()
+        print(f"[INGESTION JOB ERROR] failing orphaned jobs: {e}")
+        return 0
+    finally:
+        db.close()
+
+
+def _worker_lock(db: Session) -> int:
+    """Key of the advisory lock this process holds while it lives, taken on first use."""
+    global _worker_lock_key, _worker_lock_conn
+    with _worker_lock_guard:
+        if _worker_lock_key is None:
+            key = random.getrandbits(31)
+            bind = db.get_bind()
+            if bind.dialect.name == "postgresql":
+                # outside a transaction, so the connection isn't left idle in one
+                conn = bind.connect().execution_options(isolation_level="AUTOCOMMIT")
+                conn.execute(select(func.pg_advisory_lock(WORKER_LOCK_NAMESPACE, key)))
+                _worker_lock_conn = conn
+            _worker_lock_key = key
+        return _worker_lock_key
+
+
+def _worker_alive(db: Session, key: int) -> bool:
+    if key == _worker_lock_key:
+        return True
+    if db.get_bind().dialect.name != "postgresql":
+        # no cross-process locks; only this process could have run it
+        return False
+    free = db.execute(select(func.pg_try_advisory_lock(WORKER_LOCK_NAMESPACE, key))).scalar()
+    if free:
+        db.execute(select(func.pg_advisory_unlock(WORKER_LOCK_NAMESPACE, key)))
+    return not free
+
+
+def run_job(job_id: str) -> None:
+    """Index the job's chatbot and record how each of the job's documents fared. Never raises."""
+    db = SessionLocal()
+    try:
+        job = db.get(IngestionJob, job_id)
+        if job is None:
+            print(f"[INGESTION JOB ERROR] {job_id} not found")
+            return
+        if job.status in (IngestionJobStatus.succeeded, IngestionJobStatus.failed):
+            # redelivered after it already ran
+            return
+        job.status = IngestionJobStatus.running
+        job.started_at = datetime.utcnow()
+        chatbot_id = job.chatbot_id
+        document_ids = [doc.id for doc in job.documents]
+        db.commit()
+
+        progress = JobProgress(job_id, document_ids, _vendor_id(db, chatbot_id))
+        progress.stage("extracting")
+        error = None
+        try:
+            document_service.index_chatbot_documents(db, chatbot_id, progress)
+        except Exception as e:
+            db.rollback()
+            error = str(getattr(e, "detail", None) or e)
+            print(f"[INGESTION JOB ERROR] {job_id}: {error}")
+        progress.close()
+        _finish(db, job_id, error)
+    except Exception as e:
+        db.rollback()
+        print(f"[INGESTION JOB ERROR] {job_id}: {e}")
+    finally:
+        db.close()
+
+
+def _finish(db: Session, job_id: str, error: Optional[str]) -> None:
+    job = db.get(IngestionJob, job_id)
+    if job is None:
+        return
+    processed = failed = 0
+    for doc in job.documents:
+        if error is None and doc.status == DocumentStatus.embedded:
+            doc.ingestion_stage = "done"
+            processed += 1
+        else:
+            doc.ingestion_stage = "failed"
+            if doc.status == DocumentStatus.processing:
+                doc.status = DocumentStatus.processing_failed
+            failed += 1
+        doc.ingestion_progress = 100
+
+    job.processed_documents = processed
+    job.failed_documents = failed
+    job.error = error
+    job.status = IngestionJobStatus.failed if error or (failed and not processed) else IngestionJobStatus.succeeded
+    job.stage = "failed" if job.status == IngestionJobStatus.failed else "done"
+    job.progress = 100
+    job.finished_at = datetime.utcnow()
+    db.commit()
+    broadcast_ingestion_update(
+        job, _vendor_id(db, job.chatbot_id), [(doc.id, doc.ingestion_stage, 100) for doc in job.documents]
+    )
+
+
+def _vendor_id(db: Session, chatbot_id: int) -> Optional[int]:
+    """Owner of the chatbot; only its websocket clients (and admins) see the job."""
+    return db.query(Chatbot.vendor_id).filter(Chatbot.id == chatbot_id).scalar()
+
+
+class JobProgress:
+    """
+    Progress of one running job, reported by the indexing pass per document.
+    Written with short sessions of its own, at most every _FLUSH_INTERVAL_SECONDS
+    unless the job's stage changes. Documents indexed in the same pass that don't
+    belong to the job are ignored.
+    """
+
+    def __init__(self, job_id: str, document_ids: Iterable[int], vendor_id: Optional[int] = None):
+        self.job_id = job_id
+        self.vendor_id = vendor_id
+        self._stage = "queued"
+        # document id -> (stage, percent)
+        self._documents: Dict[int, tuple] = {doc_id: ("queued", 0) for doc_id in document_ids}
+        self._lock = threading.Lock()
+        self._last_flush = 0.0
+        self._closed = False
+
+    def stage(self, stage: str) -> None:
+        with self._lock:
+            self._advance(stage)
+            self._flush_locked(force=True)
+
+    def document(self, document_id: int, stage: str, fraction: float = 0.0) -> None:
+        """`fraction` of the document's chunks written so far, for the "embedding" stage."""
+        with self._lock:
+            if document_id not in self._documents:
+                return
+            percent = _STAGE_PROGRESS[stage]
+            if stage == "embedding":
+                percent += int((_STAGE_PROGRESS["indexed"] - percent) * min(fraction, 1.0))
+            self._documents[document_id] = (stage, percent)
+            changed = stage in ("embedding", "indexed") and self._advance("embedding")
+            self._flush_locked(force=changed)
+
+    def close(self) -> None:
+        with self._lock:
+            self._closed = True
+
+    def _advance(self, stage: str) -> bool:
+        if _STAGE_ORDER.index(stage) <= _STAGE_ORDER.index(self._stage):
+            return False
+        self._stage = stage
+        return True
+
+    def _progress(self) -> int:
+        if self._stage in ("extracting", "embedding") and self._documents:
+            average = sum(percent for _, percent in self._documents.values()) // len(self._documents)
+            return min(max(average, _STAGE_PROGRESS["extracting"]), _STAGE_PROGRESS["saving"])
+        return _STAGE_PROGRESS[self._stage]
+
+    def _flush_locked(self, force: bool = False) -> None:
+        now = time.monotonic()
+        if self._closed or (not force and now - self._last_flush < _FLUSH_INTERVAL_SECONDS):
+            return
+        self._last_flush = now
+
+        documents = [(doc_id, stage, percent) for doc_id, (stage, percent) in self._documents.items()]
+        by_state = defaultdict(list)
+        for doc_id, stage, progress in documents:
+            by_state[(stage, progress)].append(doc_id)
+
+        db = SessionLocal()
+        try:
+            db.query(IngestionJob).filter(IngestionJob.id == self.job_id).update(
+                {"stage": self._stage, "progress": self._progress()},
+                synchronize_session=False
+            )
+            for (stage, progress), ids in by_state.items():
+                db.query(Document).filter(Document.id.in_(ids)).update(
+                    {"ingestion_stage": stage, "ingestion_progress": progress},
+                    synchronize_session=False
+                )
+            db.commit()
+            job = db.get(IngestionJob, self.job_id)
+            if job is not None:
+                broadcast_ingestion_update(job, self.vendor_id, documents)
+        except Exception as e:
+            db.rollback()
+            print(f"[INGESTION JOB ERROR] progress of {self.job_id}: {e}")
+        finally:
+            db.close()
@@ -0,0 +1,20 @@
+from core.celery_app import celery_app
+from modules.documents.services import ingestion_jobs
+
+# a worker only imports what its tasks import; every mapped class has to be
+# registered before the first query, same as in utils.ollama_tasks
+from modules.llms.models.llm_model import LLM
+from modules.embeddings.models.embedding_model import Embedding
+from modules.chatbots.models.chatbot_model import Chatbot
+from modules.vendors.models.vendor_model import Vendor
+from modules.api_keys.models.api_model import APIKey
+from modules.conversations.models.conversation_model import Conversation
+from modules.messages.models.messages_model import Message
+from modules.documents.models.document_model import Document
+from modules.vector_dbs.models.vector_db_model import VectorDB
+from modules.users.models.user_model import User
+
+
+@celery_app.task
+def run_ingestion_job(job_id: str):
+    ingestion_jobs.run_job(job_id)
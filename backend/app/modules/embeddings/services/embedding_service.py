@@ -3,6 +3,7 @@ import threading, subprocess
 from typing import List
 from modules.embeddings.models.embedding_model import Embedding
 from modules.embeddings.schemas.embedding_schema import EmbeddingCreate
+from modules.chatbots.services.chatbot_runtime import invalidate_runtimes_for_embedding
 
 
 def add_embedding(db: Session, embed_data: EmbeddingCreate) -> Embedding:
@@ -34,6 +35,7 @@ def update_embedding(db: Session, embedding_id: int, embed_data: EmbeddingCreate
         setattr(embed, key, value)
     db.commit()
     db.refresh(embed)
+    invalidate_runtimes_for_embedding(embed.id)
     return embed
 
 def delete_embedding(db: Session, embedding_id: int) -> bool:
@@ -42,4 +44,5 @@ def delete_embedding(db: Session, embedding_id: int) -> bool:
         return False
     db.delete(embed)
     db.commit()
+    invalidate_runtimes_for_embedding(embedding_id)
     return True
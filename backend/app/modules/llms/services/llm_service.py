@@ -3,6 +3,7 @@ import threading, subprocess
 from typing import List, Optional
 from modules.llms.models.llm_model import LLM
 from modules.llms.schemas.llm_schema import LLMCreate, LLMUpdate
+from modules.chatbots.services.chatbot_runtime import invalidate_runtimes_for_llm
 
 
 
@@ -43,6 +44,7 @@ def update_llm(db: Session, llm_id: int, llm_data: LLMUpdate) -> Optional[LLM]:
         setattr(llm, key, value)
     db.commit()
     db.refresh(llm)
+    invalidate_runtimes_for_llm(llm.id)
     return llm
 
 
@@ -52,6 +54,7 @@ def delete_llm(db: Session, llm_id: int) -> bool:
         return False
     db.delete(llm)
     db.commit()
+    invalidate_runtimes_for_llm(llm_id)
     return True
 
 
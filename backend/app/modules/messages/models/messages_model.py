@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, ForeignKey, DateTime, Enum
+from sqlalchemy import Column, Integer, String, ForeignKey, DateTime, Enum, Index
 from sqlalchemy.orm import relationship
 from datetime import datetime
 from db.database import Base
@@ -21,5 +21,10 @@ class Message(Base):
 
     conversation = relationship("Conversation", back_populates="messages")
 
+    # serves the "latest N messages of a conversation" history query
+    __table_args__ = (
+        Index("ix_messages_conversation_created", "conversation_id", "created_at"),
+    )
+
 
 
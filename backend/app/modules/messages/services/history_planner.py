@@ -0,0 +1,95 @@
+from dataclasses import dataclass, field
+from functools import lru_cache
+from typing import List, Optional, Sequence
+import tiktoken
+from core.config import settings
+from modules.messages.models.messages_model import Message
+
+# Fixed per-message cost of chat formatting (role markers, separators)
+MESSAGE_OVERHEAD_TOKENS = 4
+
+
+@lru_cache(maxsize=1)
+def _encoding():
+    try:
+        return tiktoken.get_encoding(settings.HISTORY_TOKENIZER_ENCODING)
+    except Exception:
+        # encoding files are fetched on first use; offline boxes fall back to an estimate
+        return None
+
+
+def count_tokens(text: str) -> int:
+    if not text:
+        return 0
+    encoding = _encoding()
+    if encoding is None:
+        return max(1, len(text) // 4)
+    return len(encoding.encode(text, disallowed_special=()))
+
+
+def truncate_to_tokens(text: str, max_tokens: int) -> str:
+    if max_tokens <= 0:
+        return ""
+    encoding = _encoding()
+    if encoding is None:
+        return text[:max_tokens * 4]
+    tokens = encoding.encode(text, disallowed_special=())
+    if len(tokens) <= max_tokens:
+        return text
+    return encoding.decode(tokens[:max_tokens])
+
+
+@dataclass
+class HistoryPlan:
+    history: List[Message] = field(default_factory=list)
+    context: Optional[str] = None
+    prompt_tokens: int = 0
+    # True when older history had to be left out to fit the budget
+    truncated: bool = False
+
+
+def plan_history(
+    system_prompt: str,
+    question: str,
+    context: Optional[str],
+    history: Sequence[Message],
+    context_limit: int,
+    output_limit: int,
+    summary: Optional[str] = None
+) -> HistoryPlan:
+    """
+    Fit a chat prompt into the model window.
+
+    The system prompt and the question always go in. What is left of
+    `context_limit - output_limit` goes to the retrieved context first
+    (truncated if needed), then to as many of the most recent history
+    messages as fit. `history` must be ordered oldest -> newest. A rolling
+    `summary` of older turns is counted as part of the system prompt.
+    """
+    budget = context_limit - output_limit - settings.HISTORY_SAFETY_MARGIN_TOKENS
+    used = (
+        count_tokens(system_prompt) + count_tokens(summary) + count_tokens(question)
+        + 2 * MESSAGE_OVERHEAD_TOKENS
+    )
+
+    if context:
+        # "Context:\n...\n\nQuestion:\n" wrapper
+        context = truncate_to_tokens(context, budget - used - 8)
+        if context:
+            used += count_tokens(context) + 8
+
+    selected = []
+    for msg in reversed(history):
+        cost = count_tokens(msg.content) + MESSAGE_OVERHEAD_TOKENS
+        if used + cost > budget:
+            break
+        selected.append(msg)
+        used += cost
+    selected.reverse()
+
+    return HistoryPlan(
+        history=selected,
+        context=context or None,
+        prompt_tokens=used,
+        truncated=len(selected) < len(history)
+    )
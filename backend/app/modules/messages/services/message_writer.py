@@ -0,0 +1,177 @@
+import atexit
+import queue
+import threading
+import time
+from collections import defaultdict
+from datetime import datetime
+from typing import Dict, List, Sequence
+from sqlalchemy import insert
+from core.config import settings
+from db.database import engine
+from modules.messages.models.messages_model import Message
+from utils import metrics
+
+# Write-behind for chat messages: rows are queued in memory and inserted in
+# batches by one background thread, so a chat response doesn't wait for a commit.
+
+_queue: "queue.Queue[dict]" = queue.Queue()
+# conversation_id -> rows queued but not committed yet, so history reads can see them
+_pending: Dict[int, List[dict]] = defaultdict(list)
+_pending_lock = threading.Lock()
+_worker: threading.Thread | None = None
+_worker_lock = threading.Lock()
+_stopping = threading.Event()
+
+ROWS = metrics.Counter(
+    "message_write_behind_rows_total",
+    "Chat message rows by outcome: enqueued, rejected (queue full), flushed or failed.",
+    ["result"]
+)
+FLUSH_SECONDS = metrics.Histogram(
+    "message_write_behind_flush_seconds",
+    "Duration of one batched message insert, retries included."
+)
+BATCH_ROWS = metrics.Histogram(
+    "message_write_behind_batch_rows",
+    "Rows per batched message insert.",
+    buckets=(1, 2, 5, 10, 25, 50, 100, 250, 500, 1000)
+)
+
+
+def is_enabled() -> bool:
+    return settings.MESSAGE_WRITE_BEHIND_ENABLED
+
+
+def _ensure_worker() -> None:
+    global _worker
+    with _worker_lock:
+        if _worker is None or not _worker.is_alive():
+            _stopping.clear()
+            _worker = threading.Thread(target=_run, name="message-writer", daemon=True)
+            _worker.start()
+
+
+def enqueue(rows: Sequence[dict]) -> bool:
+    """
+    Queue Message rows (column dicts) for a later batched INSERT.
+    Returns False when write-behind is off or the queue is full; the caller
+    then writes the rows itself.
+    """
+    if not is_enabled() or _stopping.is_set():
+        return False
+    if _queue.qsize() + len(rows) > settings.MESSAGE_WRITE_BEHIND_QUEUE_SIZE:
+        ROWS.inc(len(rows), result="rejected")
+        return False
+
+    _ensure_worker()
+    with _pending_lock:
+        for row in rows:
+            row.setdefault("created_at", datetime.utcnow())
+            _pending[row["conversation_id"]].append(row)
+    for row in rows:
+        _queue.put_nowait(row)
+    ROWS.inc(len(rows), result="enqueued")
+    return True
+
+
+def pending_messages(conversation_id: int) -> List[Message]:
+    """Queued, not yet committed messages of a conversation as transient Message objects."""
+    with _pending_lock:
+        rows = list(_pending.get(conversation_id, ()))
+    return [Message(**row) for row in rows]
+
+
+def _forget(rows: List[dict]) -> None:
+    with _pending_lock:
+        for row in rows:
+            pending = _pending.get(row["conversation_id"])
+            if not pending:
+                continue
+            try:
+                pending.remove(row)
+            except ValueError:
+                pass
+            if not pending:
+                del _pending[row["conversation_id"]]
+
+
+def _take_batch(linger: float) -> List[dict]:
+    """Wait for a first row, then keep collecting for up to `linger` seconds or a full batch."""
+    batch = []
+    try:
+        batch.append(_queue.get(timeout=max(linger, 0.05)))
+    except queue.Empty:
+        return batch
+    deadline = time.monotonic() + linger
+    while len(batch) < settings.MESSAGE_WRITE_BEHIND_BATCH_SIZE:
+        remaining = deadline - time.monotonic()
+        try:
+            batch.append(_queue.get(timeout=remaining) if remaining > 0 else _queue.get_nowait())
+        except queue.Empty:
+            break
+    return batch
+
+
+def _flush(batch: List[dict]) -> None:
+    started = time.perf_counter()
+    for attempt in range(settings.MESSAGE_WRITE_BEHIND_MAX_RETRIES + 1):
+        try:
+            with engine.begin() as conn:
+                # one multi-row INSERT ... VALUES (...), (...) per batch
+                conn.execute(insert(Message).values(batch))
+            break
+        except Exception as e:
+            print(f"[MESSAGE WRITE-BEHIND ERROR] attempt {attempt + 1}, {len(batch)} rows: {e}")
+            time.sleep(min(2 ** attempt * 0.1, 2.0))
+    else:
+        ROWS.inc(len(batch), result="failed")
+        _forget(batch)
+        return
+
+    FLUSH_SECONDS.observe(time.perf_counter() - started)
+    BATCH_ROWS.observe(len(batch))
+    ROWS.inc(len(batch), result="flushed")
+    _forget(batch)
+
+
+def _run() -> None:
+    while not (_stopping.is_set() and _queue.empty()):
+        # stop lingering once shutdown has started
+        linger = 0 if _stopping.is_set() else settings.MESSAGE_WRITE_BEHIND_FLUSH_INTERVAL_MS / 1000
+        batch = _take_batch(linger)
+        if batch:
+            _flush(batch)
+
+
+def flush(timeout: float = 10.0) -> bool:
+    """Block until everything queued so far is committed. Returns False on timeout."""
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        with _pending_lock:
+            if not _pending:
+                return True
+        time.sleep(0.01)
+    return False
+
+
+def shutdown(timeout: float = 10.0) -> None:
+    """Stop accepting rows and drain the queue; called on application shutdown."""
+    _stopping.set()
+    worker = _worker
+    if worker is not None and worker.is_alive():
+        worker.join(timeout)
+    # worker never started or died: write what is left from this thread
+    while not _queue.empty():
+        batch = _take_batch(0)
+        if batch:
+            _flush(batch)
+
+
+metrics.Gauge(
+    "message_write_behind_queue_depth",
+    "Chat messages queued for a batched insert.",
+    [],
+    lambda: [((), _queue.qsize())]
+)
+
+atexit.register(shutdown)
@@ -0,0 +1,62 @@
+from typing import Dict, List, Sequence
+from langchain_core.embeddings import Embeddings
+from modules.rag.services.embedding_store import EmbeddingStore, model_name, text_hash
+from utils import metrics
+
+# Content-addressed store of chunk embeddings: (embedding model, sha256(chunk text))
+# -> float32 vector in a local SQLite file. Re-indexing, rebuilding a store of another
+# type or indexing the same text for another chatbot reuses the stored vectors.
+# Size is bounded by CHUNK_EMBEDDING_CACHE_MAX_MB, least recently used entries go first.
+
+_store = EmbeddingStore("chunk_embeddings", "CHUNK_EMBEDDING_CACHE_PATH", "CHUNK_EMBEDDING_CACHE_MAX_MB")
+
+LOOKUPS = metrics.Counter(
+    "chunk_embedding_cache_lookups_total",
+    "Chunk embedding cache lookups by result (hit or miss), one per distinct chunk text.",
+    ["result"]
+)
+
+
+def is_enabled() -> bool:
+    return _store.is_enabled()
+
+
+def get_many(model: str, hashes: Sequence[str]) -> Dict[str, List[float]]:
+    """Stored vectors for the given text hashes; marks them as recently used."""
+    found = _store.get_many(model, hashes)
+    LOOKUPS.inc(len(found), result="hit")
+    LOOKUPS.inc(len(set(hashes)) - len(found), result="miss")
+    return found
+
+
+def put_many(model: str, vectors: Dict[str, List[float]]) -> None:
+    _store.put_many(model, vectors)
+
+
+class CachedEmbeddings(Embeddings):
+    """Wraps an embedding client so embed_documents only sends texts not in the cache."""
+
+    def __init__(self, embeddings):
+        self.embeddings = embeddings
+        self.model = model_name(embeddings)
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        hashes = [text_hash(text) for text in texts]
+        vectors = get_many(self.model, hashes)
+        missing = {key: text for key, text in zip(hashes, texts) if key not in vectors}
+        if missing:
+            computed = dict(zip(missing, self.embeddings.embed_documents(list(missing.values()))))
+            put_many(self.model, computed)
+            vectors.update(computed)
+        return [vectors[key] for key in hashes]
+
+    def embed_query(self, text: str) -> List[float]:
+        return self.embeddings.embed_query(text)
+
+
+def wrap(embeddings):
+    return CachedEmbeddings(embeddings) if is_enabled() else embeddings
+
+
+def close() -> None:
+    _store.close()
@@ -0,0 +1,155 @@
+import atexit
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+from array import array
+from typing import Dict, List, Optional, Sequence
+from core.config import settings
+from utils import metrics
+
+# Bounded SQLite store of float32 vectors keyed by (embedding model, sha256(text)),
+# shared by the chunk and query embedding caches. Each cache has its own table in
+# its own file, opened in WAL mode so several worker processes can share it. When
+# the table outgrows its limit, least recently used vectors go first.
+
+_stores: List["EmbeddingStore"] = []
+
+EVICTED = metrics.Counter(
+    "embedding_store_evicted_total",
+    "Vectors dropped from an embedding store to stay under its size limit.",
+    ["table"]
+)
+
+
+def text_hash(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def model_name(embeddings) -> str:
+    return getattr(embeddings, "model", None) or type(embeddings).__name__
+
+
+class EmbeddingStore:
+    def __init__(self, table: str, path_setting: str, max_mb_setting: str):
+        """`path_setting` and `max_mb_setting` name the settings holding the file path and size limit."""
+        self.table = table
+        self.path_setting = path_setting
+        self.max_mb_setting = max_mb_setting
+        # bytes stored, kept in step with this process's writes; re-read from the file before evicting
+        self.size = 0
+        self._conn: Optional[sqlite3.Connection] = None
+        self._lock = threading.Lock()
+        _stores.append(self)
+
+    def is_enabled(self) -> bool:
+        return bool(getattr(settings, self.path_setting))
+
+    def _max_bytes(self) -> float:
+        return getattr(settings, self.max_mb_setting) * 1024 * 1024
+
+    def _connection(self) -> sqlite3.Connection:
+        if self._conn is None:
+            path = getattr(settings, self.path_setting)
+            os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+            conn = sqlite3.connect(path, timeout=30, check_same_thread=False, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.executescript(f"""
+                CREATE TABLE IF NOT EXISTS {self.table} (
+                    model TEXT NOT NULL,
+                    text_hash TEXT NOT NULL,
+                    vector BLOB NOT NULL,
+                    size INTEGER NOT NULL,
+                    last_used REAL NOT NULL,
+                    PRIMARY KEY (model, text_hash)
+                );
+                CREATE INDEX IF NOT EXISTS ix_{self.table}_last_used ON {self.table} (last_used);
+            """)
+            self.size = conn.execute(f"SELECT COALESCE(SUM(size), 0) FROM {self.table}").fetchone()[0]
+            self._conn = conn
+            atexit.register(self.close)
+        return self._conn
+
+    def get_many(self, model: str, hashes: Sequence[str]) -> Dict[str, List[float]]:
+        """Stored vectors for the given text hashes; marks them as recently used."""
+        found = {}
+        if not hashes:
+            return found
+        with self._lock:
+            conn = self._connection()
+            unique = list(dict.fromkeys(hashes))
+            # stay below SQLite's bound-parameter limit
+            for start in range(0, len(unique), 500):
+                part = unique[start:start + 500]
+                rows = conn.execute(
+                    f"SELECT text_hash, vector FROM {self.table} WHERE model = ? AND text_hash IN ({','.join('?' * len(part))})",
+                    [model, *part]
+                ).fetchall()
+                for key, blob in rows:
+                    found[key] = array("f", blob).tolist()
+            if found:
+                now = time.time()
+                conn.executemany(
+                    f"UPDATE {self.table} SET last_used = ? WHERE model = ? AND text_hash = ?",
+                    [(now, model, key) for key in found]
+                )
+        return found
+
+    def put_many(self, model: str, vectors: Dict[str, List[float]]) -> None:
+        if not vectors:
+            return
+        now = time.time()
+        rows = []
+        for key, vector in vectors.items():
+            blob = array("f", vector).tobytes()
+            rows.append((model, key, blob, len(blob), now))
+        with self._lock:
+            conn = self._connection()
+            conn.execute("BEGIN")
+            try:
+                conn.executemany(
+                    f"INSERT OR REPLACE INTO {self.table} (model, text_hash, vector, size, last_used) VALUES (?, ?, ?, ?, ?)",
+                    rows
+                )
+                conn.execute("COMMIT")
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+            self.size += sum(row[3] for row in rows)
+            if self.size > self._max_bytes():
+                self._evict_locked(conn)
+
+    def _evict_locked(self, conn: sqlite3.Connection) -> None:
+        """Drop least recently used vectors until the table holds at most 90% of the limit."""
+        self.size = conn.execute(f"SELECT COALESCE(SUM(size), 0) FROM {self.table}").fetchone()[0]
+        target = self._max_bytes() * 0.9
+        while self.size > target:
+            rows = conn.execute(
+                f"SELECT model, text_hash, size FROM {self.table} ORDER BY last_used LIMIT 1000"
+            ).fetchall()
+            if not rows:
+                break
+            drop = []
+            for model, key, size in rows:
+                drop.append((model, key))
+                self.size -= size
+                if self.size <= target:
+                    break
+            conn.executemany(f"DELETE FROM {self.table} WHERE model = ? AND text_hash = ?", drop)
+            EVICTED.inc(len(drop), table=self.table)
+
+    def close(self) -> None:
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+
+metrics.Gauge(
+    "embedding_store_bytes",
+    "Bytes of vectors in an embedding store, as last counted by this process.",
+    ["table"],
+    lambda: [((store.table,), store.size) for store in _stores if store.is_enabled()]
+)
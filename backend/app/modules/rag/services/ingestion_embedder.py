@@ -0,0 +1,89 @@
+import time
+from concurrent.futures import FIRST_EXCEPTION, ThreadPoolExecutor, wait
+from typing import List
+from langchain_core.embeddings import Embeddings
+from core.config import settings
+from modules.rag.services.embedding_store import model_name
+from utils import metrics
+
+# Embedding of document chunks at ingestion time: texts are split into batches of
+# INGEST_EMBED_BATCH_SIZE and sent to the model with at most INGEST_EMBED_CONCURRENCY
+# requests in flight per process. The pool is separate from the query embedding
+# batcher, so a large upload doesn't hold up chat retrieval.
+
+_executor = ThreadPoolExecutor(max_workers=max(1, settings.INGEST_EMBED_CONCURRENCY), thread_name_prefix="ingest-embed")
+
+EMBEDDED_CHUNKS = metrics.Counter(
+    "ingestion_embedded_chunks_total",
+    "Document chunks embedded at ingestion time.",
+    ["model"]
+)
+BATCH_SECONDS = metrics.Histogram(
+    "ingestion_embedding_batch_seconds",
+    "Duration of one ingestion embedding batch, retries included.",
+    ["model"]
+)
+BATCH_RETRIES = metrics.Counter(
+    "ingestion_embedding_batch_retries_total",
+    "Ingestion embedding batches retried after an error.",
+    ["model"]
+)
+FAILED_BATCHES = metrics.Counter(
+    "ingestion_embedding_failed_batches_total",
+    "Ingestion embedding batches that failed once their retries were used up.",
+    ["model"]
+)
+
+
+class ParallelEmbeddings(Embeddings):
+    """Wraps an embedding client so embed_documents runs as parallel, retried batches."""
+
+    def __init__(self, embeddings):
+        self.embeddings = embeddings
+        self.model = model_name(embeddings)
+
+    def _embed_batch(self, texts: List[str]) -> List[List[float]]:
+        with BATCH_SECONDS.time(model=self.model):
+            for attempt in range(settings.INGEST_EMBED_MAX_RETRIES + 1):
+                try:
+                    return self.embeddings.embed_documents(texts)
+                except Exception as e:
+                    if attempt == settings.INGEST_EMBED_MAX_RETRIES:
+                        FAILED_BATCHES.inc(model=self.model)
+                        raise
+                    print(f"[INGESTION EMBEDDING ERROR] attempt {attempt + 1}, {len(texts)} chunks: {e}")
+                    BATCH_RETRIES.inc(model=self.model)
+                    time.sleep(min(2 ** attempt * 0.5, 5.0))
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        if not texts:
+            return []
+        size = max(1, settings.INGEST_EMBED_BATCH_SIZE)
+        batches = [texts[i:i + size] for i in range(0, len(texts), size)]
+        started = time.perf_counter()
+
+        if len(batches) == 1:
+            results = [self._embed_batch(batches[0])]
+        else:
+            futures = [_executor.submit(self._embed_batch, batch) for batch in batches]
+            done, pending = wait(futures, return_when=FIRST_EXCEPTION)
+            error = next((f.exception() for f in futures if f in done and f.exception() is not None), None)
+            if error is not None:
+                # the batches not started yet are dropped; the first failure is what the caller sees
+                for future in pending:
+                    future.cancel()
+                raise error
+            results = [future.result() for future in futures]
+
+        elapsed = time.perf_counter() - started
+        rate = len(texts) / elapsed if elapsed > 0 else 0.0
+        EMBEDDED_CHUNKS.inc(len(texts), model=self.model)
+        print(f"[INGESTION] embedded {len(texts)} chunks in {len(batches)} batches, {elapsed:.2f}s ({rate:.1f} chunks/s)")
+        return [vector for batch in results for vector in batch]
+
+    def embed_query(self, text: str) -> List[float]:
+        return self.embeddings.embed_query(text)
+
+
+def wrap(embeddings) -> ParallelEmbeddings:
+    return ParallelEmbeddings(embeddings)
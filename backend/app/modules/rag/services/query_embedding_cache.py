@@ -0,0 +1,133 @@
+import asyncio
+import re
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Optional, Tuple
+from core.config import settings
+from modules.rag.services.embedding_store import EmbeddingStore, model_name, text_hash
+from utils import embedding_batcher, metrics
+
+# (embedding model, normalised text) -> vector
+_vectors: "OrderedDict[Tuple[str, str], List[float]]" = OrderedDict()
+_lock = threading.Lock()
+
+LOOKUPS = metrics.Counter(
+    "query_embedding_cache_lookups_total",
+    "Query embedding cache lookups by result: hit (memory), disk_hit or miss.",
+    ["result"]
+)
+
+# Optional second tier that survives restarts, enabled by QUERY_EMBEDDING_CACHE_PATH
+# and bounded by QUERY_EMBEDDING_CACHE_MAX_MB (see embedding_store). The async path
+# reads and writes it on _disk_executor, never on the event loop.
+
+_store = EmbeddingStore("query_embeddings", "QUERY_EMBEDDING_CACHE_PATH", "QUERY_EMBEDDING_CACHE_MAX_MB")
+_disk_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="query-embedding-cache")
+
+
+def normalize_text(text: str) -> str:
+    return re.sub(r"\s+", " ", text.strip())
+
+
+def _get_memory(key: Tuple[str, str]) -> Optional[List[float]]:
+    with _lock:
+        vector = _vectors.get(key)
+        if vector is not None:
+            _vectors.move_to_end(key)
+            LOOKUPS.inc(result="hit")
+        return vector
+
+
+def _put_memory(key: Tuple[str, str], vector: List[float]) -> None:
+    with _lock:
+        _vectors[key] = vector
+        _vectors.move_to_end(key)
+        while len(_vectors) > settings.QUERY_EMBEDDING_CACHE_MAX_ENTRIES:
+            _vectors.popitem(last=False)
+
+
+def _get_disk(key: Tuple[str, str]) -> Optional[List[float]]:
+    """Vector from the disk tier, or None; marks it as recently used. Blocking."""
+    digest = text_hash(key[1])
+    try:
+        return _store.get_many(key[0], [digest]).get(digest)
+    except Exception as e:
+        # the disk tier is best effort; a locked or broken file must not fail searches
+        print(f"[QUERY EMBEDDING CACHE ERROR] read: {e}")
+        return None
+
+
+def _put_disk(key: Tuple[str, str], vector: List[float]) -> None:
+    """Blocking; errors are logged, not raised."""
+    try:
+        _store.put_many(key[0], {text_hash(key[1]): vector})
+    except Exception as e:
+        print(f"[QUERY EMBEDDING CACHE ERROR] write: {e}")
+
+
+def _found_on_disk(key: Tuple[str, str], vector: Optional[List[float]]) -> Optional[List[float]]:
+    LOOKUPS.inc(result="disk_hit" if vector is not None else "miss")
+    if vector is not None:
+        _put_memory(key, vector)
+    return vector
+
+
+def _get(key: Tuple[str, str]) -> Optional[List[float]]:
+    vector = _get_memory(key)
+    if vector is not None:
+        return vector
+    return _found_on_disk(key, _get_disk(key) if _store.is_enabled() else None)
+
+
+async def _aget(key: Tuple[str, str]) -> Optional[List[float]]:
+    vector = _get_memory(key)
+    if vector is not None:
+        return vector
+    if _store.is_enabled():
+        vector = await asyncio.get_running_loop().run_in_executor(_disk_executor, _get_disk, key)
+    return _found_on_disk(key, vector)
+
+
+def _put(key: Tuple[str, str], vector: List[float]) -> None:
+    vector = list(vector)
+    _put_memory(key, vector)
+    if _store.is_enabled():
+        # the caller already has the vector; don't make it wait for the write
+        _disk_executor.submit(_put_disk, key, vector)
+
+
+def embed_query(embeddings, text: str) -> List[float]:
+    """Embed a search query through the cache; only misses reach the embedding model."""
+    key = (model_name(embeddings), normalize_text(text))
+    vector = _get(key)
+    if vector is None:
+        vector = embedding_batcher.embed(embeddings, key[1])
+        _put(key, vector)
+    return vector
+
+
+async def aembed_query(embeddings, text: str) -> List[float]:
+    key = (model_name(embeddings), normalize_text(text))
+    vector = await _aget(key)
+    if vector is None:
+        vector = await embedding_batcher.aembed(embeddings, key[1])
+        _put(key, vector)
+    return vector
+
+
+def clear() -> None:
+    with _lock:
+        _vectors.clear()
+
+
+def close() -> None:
+    _store.close()
+
+
+metrics.Gauge(
+    "query_embedding_cache_entries",
+    "Query embeddings held in memory.",
+    [],
+    lambda: [((), len(_vectors))]
+)
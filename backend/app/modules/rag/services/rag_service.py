@@ -1,19 +1,31 @@
 from langchain_core.documents import Document
 from langchain_text_splitters import RecursiveCharacterTextSplitter
-from langchain_ollama import OllamaEmbeddings
 from langchain_community.vectorstores import FAISS, Chroma
+from typing import Callable, Iterable, Iterator, List, Optional, Tuple
 import os
+import asyncio
+import hashlib
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import nullcontext
 from pathlib import Path
+from core.config import settings
 from core.enums import VectorStoreType
-from modules.chatbots.models.chatbot_model import Chatbot
-from utils.convert_to_txt import convert_to_txt
+from modules.rag.services import vectorstore_cache, query_embedding_cache, chunk_embedding_cache, ingestion_embedder
+from utils.convert_to_txt import iter_text
+from utils import ollama_clients
+from utils.stage_timer import StageTimer
+
+def vector_store_path(store_type, chatbot_id) -> str:
+    return f"uploads/vectorstore/{store_type.lower()}/chatbot_{chatbot_id}"
+
 
 def create_vector_store(store_type, chatbot_id, embeddings, chunks):
     """
     Create a vector store (Chroma or FAISS) for a chatbot and return the store.
     Returns: vectordb, persist_path
     """
-    persist_path = f"uploads/vectorstore/{store_type.lower()}/chatbot_{chatbot_id}"
+    persist_path = vector_store_path(store_type, chatbot_id)
     os.makedirs(persist_path, exist_ok=True)
 
     if store_type.lower() == VectorStoreType.chroma:
@@ -35,53 +47,289 @@ def create_vector_store(store_type, chatbot_id, embeddings, chunks):
 
 
 
-def load_vectorstore(store_type, db_path, embeddings):
+def load_vectorstore(store_type, db_path, embeddings, version=None):
     """
     Load a vector store using the path stored in DB.
     db_path should be exactly the path saved in DB, e.g., 'uploads/vectorstore/chroma/chatbot_28'
+    Opened handles are reused across requests through vectorstore_cache, per `version`
+    of the index (ChatbotRuntime.vector_db_version).
     """
     if not os.path.isdir(db_path):
         raise ValueError(f"{store_type.capitalize()} vector store not found at {db_path}")
 
+    return vectorstore_cache.get_or_open(
+        store_type,
+        db_path,
+        getattr(embeddings, "model", None),
+        lambda: _open_vectorstore(store_type, db_path, embeddings),
+        version
+    )
+
+
+async def aload_vectorstore(store_type, db_path, embeddings, version=None):
+    """Async wrapper around load_vectorstore; opening a store from disk runs in a worker thread."""
+    return await asyncio.to_thread(load_vectorstore, store_type, db_path, embeddings, version)
+
+
+def _open_vectorstore(store_type, db_path, embeddings):
     if store_type.lower() == VectorStoreType.chroma:
         return Chroma(persist_directory=db_path, embedding_function=embeddings)
     elif store_type.lower() == VectorStoreType.faiss:
-        return FAISS.load_local(db_path, embeddings)
+        # the index files are written by this service, not uploaded
+        return FAISS.load_local(db_path, embeddings, allow_dangerous_deserialization=True)
     else:
         raise ValueError("Unsupported vector store. Only 'chroma' and 'faiss' are supported.")
 
 
-def embedd_document(db, chatbot_id, embedd_obj, document_objs):
-    chatbot = db.query(Chatbot).filter(
-        Chatbot.id == chatbot_id,
-        Chatbot.is_active
-    ).first()
-    if not chatbot:
-        raise ValueError("Chatbot not found or inactive")
+def file_sha256(file_path) -> str:
+    digest = hashlib.sha256()
+    with open(file_path, "rb") as f:
+        for block in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def document_chunk_id(document_id: int, index: int) -> str:
+    """Stable id of a document's chunk in the vector store, so it can be replaced later."""
+    return f"doc-{document_id}-{index}"
+
+
+# extracted text is split whenever this much is buffered; the last chunk is held back
+# because the next piece of text may continue it
+SPLIT_BUFFER_CHARS = 32 * 1024
+
+
+def iter_document_chunks(document_obj) -> Iterator[Document]:
+    """
+    Yield a document's chunks while its text is still being extracted, so only
+    about SPLIT_BUFFER_CHARS of text (one PDF page or text piece more) is held.
+    """
+    splitter = RecursiveCharacterTextSplitter(chunk_size=400, chunk_overlap=100, add_start_index=True)
+    metadata = {"document_id": document_obj.id, "source": document_obj.title}
+    buffer = ""
+    for piece in iter_text(Path(document_obj.file_path)):
+        buffer += piece
+        if len(buffer) < SPLIT_BUFFER_CHARS:
+            continue
+        chunks = splitter.create_documents([buffer], [metadata])
+        tail = chunks[-1].metadata["start_index"] if len(chunks) > 1 else -1
+        if tail <= 0:
+            continue
+        for chunk in chunks[:-1]:
+            chunk.metadata.pop("start_index", None)
+            yield chunk
+        buffer = buffer[tail:]
+    if buffer:
+        for chunk in splitter.create_documents([buffer], [metadata]):
+            chunk.metadata.pop("start_index", None)
+            yield chunk
+
+
+def split_document(document_obj) -> List[Document]:
+    return list(iter_document_chunks(document_obj))
+
 
-    embeddings = OllamaEmbeddings(model=embedd_obj.model_name)
+def _delete_ids(store_type, vectordb, ids: List[str]) -> bool:
+    """Remove `ids` from an open store; returns whether anything was removed."""
+    if store_type.lower() == VectorStoreType.faiss:
+        existing = set(vectordb.index_to_docstore_id.values())
+        ids = [i for i in ids if i in existing]
+        if ids:
+            vectordb.delete(ids)
+    elif ids:
+        vectordb.delete(ids=ids)
+    return bool(ids)
+
+
+def _stored_chunk_ids(store_type, vectordb, document_ids: Iterable[int]) -> List[str]:
+    """
+    Ids of every chunk the store holds for `document_ids`, looked up in the store
+    rather than derived from Document.chunk_count, which misses chunks written
+    by a pass that failed half way.
+    """
+    document_ids = list(document_ids)
+    if not document_ids:
+        return []
+    if store_type.lower() == VectorStoreType.faiss:
+        prefixes = tuple(f"doc-{document_id}-" for document_id in document_ids)  # see document_chunk_id
+        return [i for i in vectordb.index_to_docstore_id.values() if i.startswith(prefixes)]
+    return vectordb.get(where={"document_id": {"$in": document_ids}}, include=[])["ids"]
 
-    docs = [Document(page_content=convert_to_txt(Path(doc.file_path))) for doc in document_objs]
 
-    splitter = RecursiveCharacterTextSplitter(chunk_size=400, chunk_overlap=100)
-    chunks = splitter.split_documents(docs)
+def upsert_chunks(
+    store_type,
+    chatbot_id,
+    embeddings,
+    batches: Iterable[Tuple[List[Document], List[str]]],
+    stale_documents: Iterable[int] = (),
+    rebuild: bool = False,
+    discarded: List[int] = None,
+    on_written: Optional[Callable[[List[Document]], None]] = None
+) -> Tuple[Optional[object], str]:
+    """
+    Write the (chunks, ids) lists yielded by `batches` into the chatbot's vector
+    store after removing all chunks of `stale_documents`; only the new chunks are
+    embedded. Each list
+    is embedded and written on a writer thread while the next one is produced, so
+    extraction overlaps embedding and at most two lists are held at a time.
+    With `rebuild` everything already in the store is dropped first. Chunks of the
+    document ids put in `discarded` while the batches are produced are removed at the end.
+    `on_written(chunks)` is called (on this thread) after each list is stored.
+    Returns: vectordb (None if there is still nothing to store), persist_path
+    """
+    persist_path = vector_store_path(store_type, chatbot_id)
+    os.makedirs(persist_path, exist_ok=True)
 
-    vectordb, persist_path = create_vector_store(
+    if store_type.lower() == VectorStoreType.chroma:
+        vectordb = Chroma(persist_directory=persist_path, embedding_function=embeddings)
+        remove = vectordb.get(include=[])["ids"] if rebuild else _stored_chunk_ids(store_type, vectordb, stale_documents)
+        if remove:
+            vectordb.delete(ids=remove)
+    elif store_type.lower() == VectorStoreType.faiss:
+        vectordb = None
+        if not rebuild and os.path.exists(os.path.join(persist_path, "index.faiss")):
+            vectordb = _open_vectorstore(store_type, persist_path, embeddings)
+            _delete_ids(store_type, vectordb, _stored_chunk_ids(store_type, vectordb, stale_documents))
+    else:
+        raise ValueError("Unsupported vector store. Only 'chroma' and 'faiss' are supported.")
+
+    def write(vectordb, chunks, ids):
+        if vectordb is None:
+            return FAISS.from_documents(chunks, embeddings, ids=ids)
+        vectordb.add_documents(chunks, ids=ids)
+        return vectordb
+
+    with ThreadPoolExecutor(max_workers=1, thread_name_prefix="ingest-writer") as writer:
+        in_flight = None
+        for chunks, ids in batches:
+            if in_flight is not None:
+                vectordb = in_flight[0].result()
+                if on_written is not None:
+                    on_written(in_flight[1])
+            in_flight = (writer.submit(write, vectordb, chunks, ids), chunks)
+        if in_flight is not None:
+            vectordb = in_flight[0].result()
+            if on_written is not None:
+                on_written(in_flight[1])
+
+    if vectordb is not None and discarded:
+        _delete_ids(store_type, vectordb, _stored_chunk_ids(store_type, vectordb, discarded))
+    if store_type.lower() == VectorStoreType.chroma:
+        vectordb.persist()
+    elif vectordb is not None:
+        vectordb.save_local(persist_path)
+    return vectordb, persist_path
+
+
+def delete_document_chunks(store_type, db_path, embeddings, document_ids: List[int]) -> None:
+    if not document_ids or not os.path.isdir(db_path):
+        return
+    vectordb = _open_vectorstore(store_type, db_path, embeddings)
+    ids = _stored_chunk_ids(store_type, vectordb, document_ids)
+    if _delete_ids(store_type, vectordb, ids) and store_type.lower() == VectorStoreType.faiss:
+        vectordb.save_local(db_path)
+
+
+def embedd_document(chatbot, embedd_obj, document_objs, rebuild: bool = False, progress=None):
+    """
+    Chunk and embed `document_objs` into the chatbot's vector store, replacing
+    the chunks they had from an earlier version. Other documents' chunks are
+    left alone unless `rebuild` is set.
+    Chunks are embedded in windows of INGEST_EMBED_BATCH_SIZE * INGEST_EMBED_CONCURRENCY
+    while extraction goes on, so memory doesn't grow with the size of the upload.
+    Documents whose text can't be extracted are skipped, left out of the counts
+    and lose the chunks of their earlier version.
+    `progress` (optional, see ingestion_jobs.JobProgress) is told about each step.
+    Returns: vectordb, persist_path, {document id: chunk count}
+    """
+    # chunks embedded before (any chatbot, any store type) are served from the local cache;
+    # the rest go to the model in parallel batches
+    embeddings = chunk_embedding_cache.wrap(
+        ingestion_embedder.wrap(ollama_clients.get_embeddings(embedd_obj.model_name))
+    )
+    window = max(1, settings.INGEST_EMBED_BATCH_SIZE * settings.INGEST_EMBED_CONCURRENCY)
+
+    chunk_counts = {}
+    produced = defaultdict(int)
+    written = defaultdict(int)
+    failed = set()
+    discarded = []
+
+    def report(document_id):
+        if progress is None or document_id in failed:
+            return
+        if document_id in chunk_counts and written[document_id] == chunk_counts[document_id]:
+            progress.document(document_id, "indexed")
+        elif produced[document_id]:
+            progress.document(document_id, "embedding", written[document_id] / produced[document_id])
+
+    def on_written(chunks):
+        for document_id in {chunk.metadata["document_id"] for chunk in chunks}:
+            written[document_id] += sum(1 for chunk in chunks if chunk.metadata["document_id"] == document_id)
+            report(document_id)
+
+    def batches():
+        chunks, ids = [], []
+        for doc in document_objs:
+            if progress is not None:
+                progress.document(doc.id, "extracting")
+            try:
+                for chunk in iter_document_chunks(doc):
+                    chunks.append(chunk)
+                    ids.append(document_chunk_id(doc.id, produced[doc.id]))
+                    produced[doc.id] += 1
+                    if len(chunks) >= window:
+                        yield chunks, ids
+                        chunks, ids = [], []
+            except Exception as e:
+                print(f"[INDEXING ERROR] document {doc.id}: {e}")
+                failed.add(doc.id)
+                if progress is not None:
+                    progress.document(doc.id, "failed")
+                # drop what is still buffered; what was already handed over is removed afterwards
+                keep = [i for i, chunk in enumerate(chunks) if chunk.metadata["document_id"] != doc.id]
+                chunks, ids = [chunks[i] for i in keep], [ids[i] for i in keep]
+                discarded.append(doc.id)
+                continue
+            chunk_counts[doc.id] = produced[doc.id]
+            report(doc.id)
+        if chunks:
+            yield chunks, ids
+
+    vectordb, persist_path = upsert_chunks(
         chatbot.vector_store_type,
         chatbot.id,
         embeddings,
-        chunks
+        batches(),
+        stale_documents=[doc.id for doc in document_objs],
+        rebuild=rebuild,
+        discarded=discarded,
+        on_written=on_written
     )
+    return vectordb, persist_path, chunk_counts
 
-    # Save path to DB
-    chatbot.db_path = persist_path
-    db.commit()
 
-    return vectordb
+def get_rag_context(question: str, vectordb, k: int = 3, timer: Optional[StageTimer] = None):
+    embedding = query_embedding_cache.embed_query(vectordb.embeddings, question)
+    with timer.stage("vector_search") if timer else nullcontext():
+        docs_found = vectordb.similarity_search_by_vector(embedding, k=k)
+    if not docs_found:
+        return "", []
 
+    context = "\n\n".join([d.page_content for d in docs_found])
+    metadata_list = [d.metadata for d in docs_found]
+    return context, metadata_list
 
-def get_rag_context(question: str, vectordb, k: int = 3):
-    docs_found = vectordb.similarity_search(question, k=k)
+
+async def aget_rag_context(question: str, vectordb, k: int = 3, embedding=None, timer: Optional[StageTimer] = None):
+    """
+    Pass the question's `embedding` when it is already known to skip the cache lookup,
+    and the request's `timer` to record the search as its "vector_search" stage.
+    """
+    if embedding is None:
+        embedding = await query_embedding_cache.aembed_query(vectordb.embeddings, question)
+    with timer.stage("vector_search") if timer else nullcontext():
+        docs_found = await vectordb.asimilarity_search_by_vector(embedding, k=k)
     if not docs_found:
         return "", []
 
@@ -0,0 +1,114 @@
+import os
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Optional, Tuple
+from core.config import settings
+from utils import metrics
+
+# (store_type, db_path, embedding model, index version) -> (vectordb, estimated size in bytes).
+# The version (VectorDB id and updated_at) changes on every indexing pass, so processes
+# that didn't run the pass stop using their handle once they see the new version.
+_handles: "OrderedDict[Tuple[str, str, Optional[str], Optional[str]], Tuple[Any, int]]" = OrderedDict()
+_total_bytes = 0
+_lock = threading.Lock()
+
+LOOKUPS = metrics.Counter(
+    "vectorstore_cache_lookups_total",
+    "Vector store handle lookups by result (hit or miss).",
+    ["result"]
+)
+
+
+def _estimate_size(db_path: str) -> int:
+    """On-disk size of the persisted store, used as a proxy for its memory footprint."""
+    total = 0
+    for root, _, files in os.walk(db_path):
+        for name in files:
+            try:
+                total += os.path.getsize(os.path.join(root, name))
+            except OSError:
+                pass
+    return total
+
+
+def _evict_over_budget() -> None:
+    global _total_bytes
+    max_bytes = settings.VECTORSTORE_CACHE_MAX_MB * 1024 * 1024
+    # always keep the most recently used handle, even if it alone exceeds the budget
+    while len(_handles) > 1 and (
+        len(_handles) > settings.VECTORSTORE_CACHE_MAX_HANDLES or _total_bytes > max_bytes
+    ):
+        _, (_, size) = _handles.popitem(last=False)
+        _total_bytes -= size
+
+
+def get_or_open(
+    store_type: str,
+    db_path: str,
+    model_name: Optional[str],
+    opener: Callable[[], Any],
+    version: Optional[str] = None
+):
+    """
+    Return a cached vector store handle, calling `opener` on a miss.
+    Opening a `version` drops the handles of other versions of the same store.
+    Handles are evicted least-recently-used first once either the handle count
+    or the estimated memory budget is exceeded.
+    """
+    global _total_bytes
+    key = (str(store_type).lower(), os.path.normpath(db_path), model_name, version)
+
+    with _lock:
+        cached = _handles.get(key)
+        if cached is not None:
+            _handles.move_to_end(key)
+            LOOKUPS.inc(result="hit")
+            return cached[0]
+
+    LOOKUPS.inc(result="miss")
+    vectordb = opener()
+    size = _estimate_size(db_path)
+
+    with _lock:
+        for stale in [k for k in _handles if k[:3] == key[:3]]:
+            _total_bytes -= _handles.pop(stale)[1]
+        _handles[key] = (vectordb, size)
+        _total_bytes += size
+        _evict_over_budget()
+
+    return vectordb
+
+
+def invalidate_path(db_path: str) -> None:
+    """Drop every cached handle opened on `db_path`, whatever the embedding model."""
+    global _total_bytes
+    path = os.path.normpath(db_path)
+    with _lock:
+        for key in [k for k in _handles if k[1] == path]:
+            _total_bytes -= _handles.pop(key)[1]
+
+
+def clear() -> None:
+    global _total_bytes
+    with _lock:
+        _handles.clear()
+        _total_bytes = 0
+
+
+def _sizes():
+    with _lock:
+        return len(_handles), _total_bytes
+
+
+metrics.Gauge(
+    "vectorstore_cache_handles",
+    "Vector store handles held open.",
+    [],
+    lambda: [((), _sizes()[0])]
+)
+metrics.Gauge(
+    "vectorstore_cache_estimated_bytes",
+    "Estimated memory held by the cached vector store handles (their on-disk size).",
+    [],
+    lambda: [((), _sizes()[1])]
+)
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, ForeignKey, Boolean, DateTime
+from sqlalchemy import Column, Integer, String, ForeignKey, Boolean, DateTime, Index
 from sqlalchemy.sql import func
 from sqlalchemy.orm import relationship
 from db.database import Base
@@ -22,3 +22,13 @@ class VectorDB(Base):
     )
 
     chatbot = relationship("Chatbot", back_populates="vector_dbs")
+
+    __table_args__ = (
+        # newest active vector DB per chatbot (chatbot_runtime.latest_vector_db_id_subquery)
+        Index(
+            "ix_vector_dbs_chatbot_active_updated",
+            "chatbot_id",
+            "is_active",
+            updated_at.desc().nullslast()
+        ),
+    )
@@ -2,6 +2,7 @@ from sqlalchemy.orm import Session
 from typing import List
 from modules.vector_dbs.models.vector_db_model import VectorDB
 from modules.vector_dbs.schemas.vector_db_schema import VectorDBCreate
+from modules.chatbots.services.chatbot_runtime import invalidate_chatbot_runtime
 
 
 def add_vector_db(db: Session, vector_db_data: VectorDBCreate) -> VectorDB:
@@ -9,6 +10,7 @@ def add_vector_db(db: Session, vector_db_data: VectorDBCreate) -> VectorDB:
     db.add(new_vector_db)
     db.commit()
     db.refresh(new_vector_db)
+    invalidate_chatbot_runtime(new_vector_db.chatbot_id)
 
     return new_vector_db
 
@@ -22,16 +24,21 @@ def update_vector_db(db: Session, vector_db_id: int, vector_db_data: VectorDBCre
     vector_db = db.query(VectorDB).filter(VectorDB.id == vector_db_id).first()
     if not vector_db:
         return None
+    previous_chatbot_id = vector_db.chatbot_id
     for key, value in vector_db_data.dict().items():
         setattr(vector_db, key, value)
     db.commit()
     db.refresh(vector_db)
+    invalidate_chatbot_runtime(previous_chatbot_id)
+    invalidate_chatbot_runtime(vector_db.chatbot_id)
     return vector_db
 
 def delete_vector_db(db: Session, vector_db_id: int) -> bool:
     vector_db = db.query(VectorDB).filter(VectorDB.id == vector_db_id).first()
     if not vector_db:
         return False
+    chatbot_id = vector_db.chatbot_id
     db.delete(vector_db)
     db.commit()
+    invalidate_chatbot_runtime(chatbot_id)
     return True
@@ -10,6 +10,8 @@ from modules.chatbots.models.chatbot_model import Chatbot
 from modules.conversations.models.conversation_model import Conversation
 from modules.users.models.user_model import User
 from modules.messages.models.messages_model import Message
+from modules.api_keys.services.api_key_cache import clear_api_keys
+from modules.chatbots.services.chatbot_runtime import clear_chatbot_runtimes
 
 def create_vendor(db: Session, vendor_data: VendorCreate) -> Vendor:
     db_vendor = db.query(Vendor).filter(Vendor.email == vendor_data.email).first()
@@ -93,6 +95,9 @@ def delete_vendor(db: Session, vendor_id: int) -> bool:
         return False
     db.delete(vendor)
     db.commit()
+    # the vendor's chatbots and keys went with it (cascade)
+    clear_api_keys()
+    clear_chatbot_runtimes()
     return True
 
 
@@ -0,0 +1,55 @@
+"""Settings and a seeded SQLite schema shared by the tests; import before any app module."""
+import os
+
+for _name, _value in {
+    "SECRET_KEY": "test", "ALGORITHM": "HS256", "ACCESS_TOKEN_EXPIRE_MINUTES": "30",
+    "DB_USER": "test", "DB_PASSWORD": "test", "DB_HOST": "localhost", "DB_PORT": "5432", "DB_NAME": "test",
+}.items():
+    os.environ.setdefault(_name, _value)
+
+from db.database import Base
+from modules.admins.models.admin_model import Admin  # noqa: F401
+from modules.api_keys.models.api_model import APIKey
+from modules.chatbots.models.chatbot_model import Chatbot
+from modules.conversations.models.conversation_model import Conversation  # noqa: F401
+from modules.documents.models.document_model import Document  # noqa: F401
+from modules.embeddings.models.embedding_model import Embedding
+from modules.llms.models.llm_model import LLM
+from modules.messages.models.messages_model import Message  # noqa: F401
+from modules.users.models.user_model import User  # noqa: F401
+from modules.vector_dbs.models.vector_db_model import VectorDB
+from modules.vendors.models.vendor_model import Vendor
+
+
+def create_schema(engine) -> None:
+    # SQLite can't create the NULLS LAST index; no query depends on it
+    table = VectorDB.__table__
+    indexes = set(table.indexes)
+    table.indexes = {ix for ix in indexes if ix.name != "ix_vector_dbs_chatbot_active_updated"}
+    try:
+        Base.metadata.create_all(engine)
+    finally:
+        table.indexes = indexes
+
+
+def seed_chatbot(db) -> int:
+    """A vendor with one chatbot, its LLM and embedding, an API key ("token") and a vector DB."""
+    vendor = Vendor(name="vendor", email="vendor@example.com", hashed_password="x", domain="example.com")
+    db.add(vendor)
+    db.flush()
+    embedding = Embedding(model_name="nomic-embed-text", provider="ollama")
+    db.add(embedding)
+    db.flush()
+    llm = LLM(
+        name="llama", provider="ollama", path="llama3", embedding_id=embedding.id,
+        def_token_limit=512, def_context_limit=4096
+    )
+    db.add(llm)
+    db.flush()
+    chatbot = Chatbot(vendor_id=vendor.id, name="bot", llm_id=llm.id, llm_path="llama3", system_prompt="Be brief.")
+    db.add(chatbot)
+    db.flush()
+    db.add(APIKey(vendor_id=vendor.id, chatbot_id=chatbot.id, token_hash="token", vendor_domain="example.com"))
+    db.add(VectorDB(chatbot_id=chatbot.id, name="docs", db_path="/nonexistent"))
+    db.commit()
+    return chatbot.id
@@ -0,0 +1,108 @@
+"""
+Bounds the number of SQL statements the chat path issues per request, on
+SQLite (sync) and aiosqlite (async) so it runs without Postgres:
+
+    cd backend/app && python -m unittest discover -s tests -t .
+"""
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+from tests.support import create_schema, seed_chatbot
+from sqlalchemy import create_engine, event
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy.orm import sessionmaker
+from modules.api_keys.services import api_key_cache
+from modules.chatbots.services import chatbot_runtime, chatbot_service
+
+# statements per request; raise only with a reason
+LOAD_RUNTIME_LIMIT = 1
+ASK_LIMIT = 2           # api key + runtime
+FIRST_TURN_LIMIT = 5    # api key + runtime + conversation lookup, insert + history
+NEXT_TURN_LIMIT = 2     # conversation + history; api key and runtime are cached
+
+
+class StatementCounter:
+    def __init__(self, engine):
+        self.engine = engine
+        self.statements = []
+        event.listen(engine, "before_cursor_execute", self._record)
+
+    def close(self) -> None:
+        event.remove(self.engine, "before_cursor_execute", self._record)
+
+    def _record(self, conn, cursor, statement, parameters, context, executemany):
+        self.statements.append(statement)
+
+    def reset(self) -> None:
+        self.statements.clear()
+
+    def __len__(self) -> int:
+        return len(self.statements)
+
+
+class ChatSqlBudgetTest(unittest.IsolatedAsyncioTestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls._tmp = tempfile.TemporaryDirectory()
+        path = os.path.join(cls._tmp.name, "chat.sqlite")
+        cls.engine = create_engine(f"sqlite:///{path}")
+        create_schema(cls.engine)
+        cls.Session = sessionmaker(bind=cls.engine)
+        with cls.Session() as db:
+            cls.chatbot_id = seed_chatbot(db)
+        cls.aengine_url = f"sqlite+aiosqlite:///{path}"
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.engine.dispose()
+        cls._tmp.cleanup()
+
+    async def asyncSetUp(self):
+        chatbot_runtime.clear_chatbot_runtimes()
+        api_key_cache.clear_api_keys()
+        self.aengine = create_async_engine(self.aengine_url)
+        self.ASession = async_sessionmaker(self.aengine, expire_on_commit=False)
+        self.counter = StatementCounter(self.aengine.sync_engine)
+        # retrieval talks to Ollama and the vector store, never the database
+        patches = [
+            mock.patch.object(chatbot_service, "_embed_question", mock.AsyncMock(return_value=None)),
+            mock.patch.object(chatbot_service, "_retrieve_context", mock.AsyncMock(return_value=None)),
+        ]
+        for patch in patches:
+            patch.start()
+            self.addCleanup(patch.stop)
+
+    async def asyncTearDown(self):
+        await self.aengine.dispose()
+
+    def test_load_chatbot_runtime_is_one_query(self):
+        counter = StatementCounter(self.engine)
+        self.addCleanup(counter.close)
+        with self.Session() as db:
+            runtime = chatbot_runtime.load_chatbot_runtime(db, self.chatbot_id)
+        self.assertEqual(runtime.llm_path, "llama3")
+        self.assertEqual(runtime.embedding_model_name, "nomic-embed-text")
+        self.assertEqual(runtime.vector_db_path, "/nonexistent")
+        self.assertLessEqual(len(counter), LOAD_RUNTIME_LIMIT, counter.statements)
+
+    async def test_ask(self):
+        async with self.ASession() as db:
+            api_key = await api_key_cache.aresolve_api_key(db, "token", "ask")
+            turn = await chatbot_service.prepare_singleturn(db, "What is it?", api_key, use_cache=False)
+        self.assertIsNotNone(turn.model)
+        self.assertLessEqual(len(self.counter), ASK_LIMIT, self.counter.statements)
+
+    async def test_chat_turns(self):
+        for question, limit in [("Hi there", FIRST_TURN_LIMIT), ("And then?", NEXT_TURN_LIMIT)]:
+            self.counter.reset()
+            async with self.ASession() as db:
+                api_key = await api_key_cache.aresolve_api_key(db, "token", "chat")
+                turn = await chatbot_service.prepare_multiturn(db, question, api_key, session_id="session-1")
+            self.assertIsNotNone(turn.conversation_id)
+            self.assertLessEqual(len(self.counter), limit, (question, self.counter.statements))
+
+
+if __name__ == "__main__":
+    unittest.main()
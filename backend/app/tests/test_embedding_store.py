@@ -0,0 +1,41 @@
+"""The shared SQLite embedding store evicts least recently used vectors past its size limit."""
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+import tests.support  # noqa: F401  (settings)
+from core.config import settings
+from modules.rag.services import embedding_store
+
+
+class EmbeddingStoreTest(unittest.TestCase):
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self._tmp.cleanup)
+        path = os.path.join(self._tmp.name, "cache", "vectors.sqlite")
+        patches = [
+            mock.patch.object(settings, "QUERY_EMBEDDING_CACHE_PATH", path),
+            # 1 KiB: room for four 64-dimension vectors
+            mock.patch.object(settings, "QUERY_EMBEDDING_CACHE_MAX_MB", 1 / 1024),
+            mock.patch.object(embedding_store, "_stores", []),
+        ]
+        for patch in patches:
+            patch.start()
+            self.addCleanup(patch.stop)
+        self.store = embedding_store.EmbeddingStore("query_embeddings", "QUERY_EMBEDDING_CACHE_PATH", "QUERY_EMBEDDING_CACHE_MAX_MB")
+        self.addCleanup(self.store.close)
+
+    def test_least_recently_used_vectors_are_evicted(self):
+        self.store.put_many("m", {f"h{i}": [float(i)] * 64 for i in range(3)})
+        # reading h0 makes h1 and h2 the least recently used
+        self.assertEqual(self.store.get_many("m", ["h0", "missing"]), {"h0": [0.0] * 64})
+
+        self.store.put_many("m", {"h3": [3.0] * 64, "h4": [4.0] * 64})
+
+        self.assertEqual(set(self.store.get_many("m", [f"h{i}" for i in range(5)])), {"h0", "h3", "h4"})
+        self.assertEqual(self.store.size, 3 * 256)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,51 @@
+"""A failed ingestion batch is raised as itself, without waiting for the batches still running."""
+import threading
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+from unittest import mock
+
+import tests.support  # noqa: F401  (settings)
+from core.config import settings
+from modules.rag.services import ingestion_embedder
+
+
+class FlakyEmbeddings:
+    model = "nomic"
+
+    def __init__(self):
+        self.release = threading.Event()
+        self.finished = []
+
+    def embed_documents(self, texts):
+        if texts == ["slow"]:
+            self.release.wait(5)
+        if texts == ["broken"]:
+            raise RuntimeError("model down")
+        self.finished.extend(texts)
+        return [[1.0] for _ in texts]
+
+
+class ParallelEmbeddingsTest(unittest.TestCase):
+    def setUp(self):
+        executor = ThreadPoolExecutor(max_workers=2)
+        self.addCleanup(executor.shutdown)
+        patches = [
+            mock.patch.object(ingestion_embedder, "_executor", executor),
+            mock.patch.object(settings, "INGEST_EMBED_BATCH_SIZE", 1),
+            mock.patch.object(settings, "INGEST_EMBED_MAX_RETRIES", 0),
+        ]
+        for patch in patches:
+            patch.start()
+            self.addCleanup(patch.stop)
+
+    def test_first_failure_is_raised_right_away(self):
+        embeddings = FlakyEmbeddings()
+        with self.assertRaisesRegex(RuntimeError, "model down"):
+            ingestion_embedder.wrap(embeddings).embed_documents(["slow", "broken", "queued"])
+        # raised while the slow batch was still running
+        self.assertNotIn("slow", embeddings.finished)
+        embeddings.release.set()
+
+
+if __name__ == "__main__":
+    unittest.main()
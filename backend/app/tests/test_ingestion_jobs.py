@@ -0,0 +1,139 @@
+"""
+Ingestion jobs on the thread pool and their advisory locks. SQLite stands in for
+Postgres: the engine reports the postgresql dialect and pg_advisory_* are
+emulated per connection, so the lock statements the app issues really run.
+"""
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+from tests.support import create_schema, seed_chatbot
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import sessionmaker
+from core.config import settings
+from core.enums import DocumentStatus, IngestionJobStatus
+from modules.documents.models.document_model import Document
+from modules.documents.models.ingestion_job_model import IngestionJob
+from modules.documents.services import ingestion_jobs
+from modules.documents.services.document_service import WORKER_LOCK_NAMESPACE
+
+
+class AdvisoryLocks:
+    """Session-level pg_advisory_lock/pg_try_advisory_lock/pg_advisory_unlock for SQLite connections."""
+
+    def __init__(self, engine):
+        self.held = {}  # (namespace, key) -> id of the holding connection
+        self.calls = []
+        event.listen(engine, "connect", self._register)
+
+    def _register(self, dbapi_connection, connection_record):
+        owner = id(dbapi_connection)
+
+        def lock(namespace, key):
+            self.calls.append(("lock", namespace, key))
+            self.held.setdefault((namespace, key), owner)
+            return None
+
+        def try_lock(namespace, key):
+            self.calls.append(("try_lock", namespace, key))
+            return int(self.held.setdefault((namespace, key), owner) == owner)
+
+        def unlock(namespace, key):
+            self.calls.append(("unlock", namespace, key))
+            return int(self.held.pop((namespace, key), None) is not None)
+
+        dbapi_connection.create_function("pg_advisory_lock", 2, lock)
+        dbapi_connection.create_function("pg_try_advisory_lock", 2, try_lock)
+        dbapi_connection.create_function("pg_advisory_unlock", 2, unlock)
+
+
+class IngestionJobLockTest(unittest.TestCase):
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self.engine = create_engine(f"sqlite:///{os.path.join(self._tmp.name, 'jobs.sqlite')}")
+        self.locks = AdvisoryLocks(self.engine)
+        create_schema(self.engine)
+        self.engine.dialect.name = "postgresql"
+        self.Session = sessionmaker(bind=self.engine)
+        with self.Session() as db:
+            self.chatbot_id = seed_chatbot(db)
+
+        self.executor = mock.Mock()
+        patches = [
+            mock.patch.object(ingestion_jobs, "SessionLocal", self.Session),
+            mock.patch.object(ingestion_jobs, "_executor", self.executor),
+            mock.patch.object(ingestion_jobs, "_worker_lock_key", None),
+            mock.patch.object(ingestion_jobs, "_worker_lock_conn", None),
+            mock.patch.object(settings, "INGESTION_USE_CELERY", False),
+        ]
+        for patch in patches:
+            patch.start()
+            self.addCleanup(patch.stop)
+
+    def tearDown(self):
+        if ingestion_jobs._worker_lock_conn is not None:
+            ingestion_jobs._worker_lock_conn.close()
+        self.engine.dispose()
+        self._tmp.cleanup()
+
+    def _document(self, db, title: str) -> Document:
+        document = Document(
+            chatbot_id=self.chatbot_id, title=title, file_path=f"/tmp/{title}", status=DocumentStatus.processing
+        )
+        db.add(document)
+        db.flush()
+        return document
+
+    def _job(self, db, job_id: str, status: IngestionJobStatus, worker_lock) -> IngestionJob:
+        job = IngestionJob(id=job_id, chatbot_id=self.chatbot_id, status=status, worker_lock=worker_lock)
+        self._document(db, job_id).ingestion_job = job
+        db.add(job)
+        db.commit()
+        return job
+
+    def test_start_job_records_the_worker_lock(self):
+        with self.Session() as db:
+            job = ingestion_jobs.start_job(db, self.chatbot_id, [self._document(db, "a.txt")])
+            first = job.worker_lock
+            second = ingestion_jobs.start_job(db, self.chatbot_id, [self._document(db, "b.txt")]).worker_lock
+
+        self.assertIsNotNone(first)
+        self.assertEqual(first, second)
+        self.assertEqual(self.locks.calls, [("lock", WORKER_LOCK_NAMESPACE, first)])
+        self.assertIn((WORKER_LOCK_NAMESPACE, first), self.locks.held)
+        self.assertEqual(self.executor.submit.call_count, 2)
+
+    def test_fail_orphaned_jobs_spares_live_workers(self):
+        with self.Session() as db:
+            own = ingestion_jobs.start_job(db, self.chatbot_id, [self._document(db, "own.txt")]).id
+            self._job(db, "dead-running", IngestionJobStatus.running, 111)
+            self._job(db, "dead-queued", IngestionJobStatus.queued, 222)
+            self._job(db, "alive", IngestionJobStatus.running, 333)
+            self._job(db, "celery", IngestionJobStatus.queued, None)
+
+        # another live process holds its lock
+        other = self.engine.connect()
+        self.addCleanup(other.close)
+        other.exec_driver_sql(f"SELECT pg_advisory_lock({WORKER_LOCK_NAMESPACE}, 333)")
+
+        self.assertEqual(ingestion_jobs.fail_orphaned_jobs(), 2)
+
+        with self.Session() as db:
+            statuses = {job.id: job.status for job in db.query(IngestionJob)}
+            failed_documents = {
+                doc.title: (doc.status, doc.ingestion_stage)
+                for doc in db.query(Document).filter(Document.title.in_(["dead-running", "dead-queued"]))
+            }
+        self.assertEqual(statuses["dead-running"], IngestionJobStatus.failed)
+        self.assertEqual(statuses["dead-queued"], IngestionJobStatus.failed)
+        self.assertEqual(statuses["alive"], IngestionJobStatus.running)
+        self.assertEqual(statuses["celery"], IngestionJobStatus.queued)
+        self.assertEqual(statuses[own], IngestionJobStatus.queued)
+        self.assertEqual(set(failed_documents.values()), {(DocumentStatus.processing_failed, "failed")})
+        # probing a dead worker's lock must not leave it taken
+        self.assertNotIn((WORKER_LOCK_NAMESPACE, 111), self.locks.held)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,28 @@
+"""Startup schema upgrades match the models they bring existing tables up to."""
+import unittest
+
+import tests.support  # noqa: F401  (settings and every model)
+from db.database import Base
+from db.upgrades import UPGRADES
+
+
+class SchemaUpgradesTest(unittest.TestCase):
+    def test_every_upgrade_names_a_model_column_or_index(self):
+        for table_name, name, statement in UPGRADES:
+            with self.subTest(name=name):
+                table = Base.metadata.tables[table_name]
+                indexes = {index.name for index in table.indexes}
+                self.assertTrue(name in table.columns or name in indexes)
+                self.assertIn(f"{table_name} ", statement)
+                self.assertIn(name, statement)
+                self.assertIn("IF NOT EXISTS", statement)
+
+    def test_new_required_columns_have_a_default_for_existing_rows(self):
+        for table_name, name, statement in UPGRADES:
+            column = Base.metadata.tables[table_name].columns.get(name)
+            if column is not None and not column.nullable:
+                self.assertIn("DEFAULT", statement, name)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,92 @@
+"""Revocation checks of signed (ck1.) API keys fail closed until the revocation set has loaded."""
+import asyncio
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+from tests.support import create_schema, seed_chatbot
+from fastapi import HTTPException
+from sqlalchemy import create_engine
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy.orm import sessionmaker
+from core.enums import APIKeyStatus
+from modules.api_keys.models.api_model import APIKey
+from modules.api_keys.services import api_key_cache, signed_keys
+
+
+class SignedKeyRevocationTest(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        path = os.path.join(self._tmp.name, "keys.sqlite")
+        engine = create_engine(f"sqlite:///{path}")
+        create_schema(engine)
+        with sessionmaker(bind=engine)() as db:
+            self.chatbot_id = seed_chatbot(db)
+            key = db.query(APIKey).first()
+            self.vendor_id = key.vendor_id
+            revoked = APIKey(
+                vendor_id=key.vendor_id, chatbot_id=self.chatbot_id, token_hash="revoked",
+                vendor_domain="example.com", status=APIKeyStatus.inactive
+            )
+            db.add(revoked)
+            db.commit()
+            self.active_id, self.revoked_id = key.id, revoked.id
+        engine.dispose()
+
+        self.aengine = create_async_engine(f"sqlite+aiosqlite:///{path}")
+        self.sessions = 0
+        sessionmaker_ = async_sessionmaker(self.aengine, expire_on_commit=False)
+
+        def open_session():
+            self.sessions += 1
+            return sessionmaker_()
+
+        patches = [
+            mock.patch.object(signed_keys, "AsyncSessionLocal", open_session),
+            mock.patch.object(signed_keys, "_revoked", set()),
+            mock.patch.object(signed_keys, "_watermark", None),
+            mock.patch.object(signed_keys, "_loaded", False),
+            mock.patch.object(signed_keys, "_refreshed_at", 0.0),
+            mock.patch.object(signed_keys, "_refresh", None),
+        ]
+        for patch in patches:
+            patch.start()
+            self.addCleanup(patch.stop)
+
+    async def asyncTearDown(self):
+        await self.aengine.dispose()
+        self._tmp.cleanup()
+
+    async def _resolve(self, key_id: int):
+        token = signed_keys.sign_api_key(key_id, self.chatbot_id, self.vendor_id)
+        return await api_key_cache.aresolve_api_key(None, token, "chat")
+
+    async def test_concurrent_first_requests_share_one_load(self):
+        results = await asyncio.gather(
+            *[self._resolve(self.active_id) for _ in range(5)],
+            self._resolve(self.revoked_id),
+            return_exceptions=True
+        )
+        self.assertEqual(self.sessions, 1)
+        self.assertTrue(all(result.id == self.active_id for result in results[:5]))
+        self.assertIsInstance(results[5], HTTPException)
+        self.assertEqual(results[5].status_code, 401)
+
+    async def test_failed_load_rejects_and_is_retried(self):
+        with mock.patch.object(signed_keys, "AsyncSessionLocal", side_effect=RuntimeError("database down")):
+            with self.assertRaises(HTTPException) as raised:
+                await self._resolve(self.revoked_id)
+        self.assertEqual(raised.exception.status_code, 503)
+        self.assertFalse(signed_keys.is_loaded())
+
+        # the next request loads again instead of waiting out the refresh interval
+        with self.assertRaises(HTTPException) as raised:
+            await self._resolve(self.revoked_id)
+        self.assertEqual(raised.exception.status_code, 401)
+        self.assertEqual((await self._resolve(self.active_id)).id, self.active_id)
+        self.assertEqual(self.sessions, 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,35 @@
+"""Vector store handles are reused per index version."""
+import tempfile
+import unittest
+
+import tests.support  # noqa: F401  (settings)
+from modules.rag.services import vectorstore_cache
+
+
+class VectorstoreCacheTest(unittest.TestCase):
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self._tmp.cleanup)
+        vectorstore_cache.clear()
+        self.addCleanup(vectorstore_cache.clear)
+        self.opened = []
+
+    def _open(self, version):
+        def opener():
+            self.opened.append(version)
+            return object()
+        return vectorstore_cache.get_or_open("faiss", self._tmp.name, "nomic", opener, version)
+
+    def test_new_version_reopens_and_drops_the_old_handle(self):
+        first = self._open("1@a")
+        self.assertIs(self._open("1@a"), first)
+
+        second = self._open("1@b")
+        self.assertIsNot(second, first)
+        self.assertEqual(self.opened, ["1@a", "1@b"])
+        self.assertEqual(len(vectorstore_cache._handles), 1)
+        self.assertIs(self._open("1@b"), second)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,48 @@
+"""Ingestion updates reach admins and the owning vendor's connections only."""
+import asyncio
+import json
+import unittest
+from types import SimpleNamespace
+from unittest import mock
+
+from utils import websocket_broadcaster
+
+
+class FakeWebSocket:
+    def __init__(self):
+        self.sent = []
+
+    async def accept(self):
+        pass
+
+    async def send_text(self, text: str):
+        self.sent.append(json.loads(text)["payload"]["id"])
+
+
+def _job(job_id: str):
+    return SimpleNamespace(
+        id=job_id, chatbot_id=1, status="running", stage="embedding", progress=40,
+        processed_documents=0, failed_documents=0, total_documents=1, error=None
+    )
+
+
+class IngestionBroadcastTest(unittest.IsolatedAsyncioTestCase):
+    async def test_updates_are_scoped_to_the_vendor(self):
+        with mock.patch.object(websocket_broadcaster, "active_connections", {}):
+            admin, vendor_1, vendor_2 = FakeWebSocket(), FakeWebSocket(), FakeWebSocket()
+            await websocket_broadcaster.register_ws(admin, None)
+            await websocket_broadcaster.register_ws(vendor_1, 1)
+            await websocket_broadcaster.register_ws(vendor_2, 2)
+
+            # progress is reported from job threads, not the event loop
+            await asyncio.to_thread(websocket_broadcaster.broadcast_ingestion_update, _job("job-1"), 1)
+            await asyncio.to_thread(websocket_broadcaster.broadcast_ingestion_update, _job("job-2"), 2)
+            await asyncio.sleep(0.05)
+
+        self.assertEqual(admin.sent, ["job-1", "job-2"])
+        self.assertEqual(vendor_1.sent, ["job-1"])
+        self.assertEqual(vendor_2.sent, ["job-2"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,9 +1,10 @@
 from fastapi import HTTPException
 from sqlalchemy.orm import Session
-from langchain_ollama import ChatOllama
 from langchain.messages import HumanMessage, SystemMessage
 from modules.chatbots.models.chatbot_model import Chatbot
 from utils.convert_to_txt import convert_to_txt
+from utils import ollama_clients, ollama_scheduler
+from utils.ollama_scheduler import Priority
 
 
 def summarize_documents_generate_tags(db: Session, chatbot_id: int, file_path) -> tuple[str, str]:
@@ -52,11 +53,11 @@ def summarize_documents_generate_tags(db: Session, chatbot_id: int, file_path) -
     - Then, a line labeled `Tags:` followed by the comma-separated hashtags.
     """)
 
-    # 3️⃣ Initialize ChatOllama
-    model = ChatOllama(
-        model=chatbot.llm_path,
+    # 3️⃣ Reuse the shared ChatOllama client for this model
+    model = ollama_clients.get_chat_model(
+        chatbot.llm_path,
         temperature=0.0,
-        max_tokens=chatbot.token_limit
+        num_predict=chatbot.llm.def_token_limit if chatbot.llm else None
     )
 
     messages = [
@@ -64,7 +65,8 @@ def summarize_documents_generate_tags(db: Session, chatbot_id: int, file_path) -
         HumanMessage(content=f"Document:\n\n{text}")
     ]
 
-    result = model.invoke(messages)
+    with ollama_scheduler.admit(chatbot.llm_path, Priority.background, chatbot.vendor_id):
+        result = model.invoke(messages)
 
     content = result.content
 
@@ -3,22 +3,40 @@ import docx
 import mammoth
 from bs4 import BeautifulSoup
 from pathlib import Path
+from typing import Iterator
 
+# size of the pieces yielded by the iter_* extractors for formats that aren't paged
+PIECE_CHARS = 64 * 1024
 
-def pdf_to_text(file_path: str) -> str:
-    """Extract text from PDF file."""
+
+def iter_pdf_text(file_path: str) -> Iterator[str]:
+    """Yield the text of a PDF file page by page."""
     reader = PdfReader(file_path)
-    text = ""
     for page in reader.pages:
         page_text = page.extract_text()
         if page_text:
-            text += page_text + "\n"
-    return text
+            yield page_text + "\n"
+
+def pdf_to_text(file_path: str) -> str:
+    """Extract text from PDF file."""
+    return "".join(iter_pdf_text(file_path))
+
+def iter_docx_text(file_path: str) -> Iterator[str]:
+    """Yield the text of a DOCX file in runs of paragraphs of about PIECE_CHARS."""
+    doc = docx.Document(file_path)
+    section, size, separator = [], 0, ""
+    for para in doc.paragraphs:
+        section.append(para.text)
+        size += len(para.text) + 1
+        if size >= PIECE_CHARS:
+            yield separator + "\n".join(section)
+            section, size, separator = [], 0, "\n"
+    if section:
+        yield separator + "\n".join(section)
 
 def docx_to_text(file_path: str) -> str:
     """Extract text from DOCX file."""
-    doc = docx.Document(file_path)
-    return "\n".join([para.text for para in doc.paragraphs])
+    return "".join(iter_docx_text(file_path))
 
 def doc_to_text(file_path: str) -> str:
     """Extract text from legacy DOC file using Mammoth."""
@@ -26,6 +44,12 @@ def doc_to_text(file_path: str) -> str:
         result = mammoth.extract_raw_text(f)
         return result.value
 
+def iter_txt_text(file_path: str) -> Iterator[str]:
+    """Read a TXT file PIECE_CHARS characters at a time."""
+    with open(file_path, "r", encoding="utf-8", errors="ignore") as f:
+        for piece in iter(lambda: f.read(PIECE_CHARS), ""):
+            yield piece
+
 def txt_to_text(file_path: str) -> str:
     """Read text from TXT file."""
     with open(file_path, "r", encoding="utf-8", errors="ignore") as f:
@@ -53,6 +77,27 @@ FILE_HANDLERS = {
     ".htm": html_to_text,
 }
 
+# .doc and HTML have to be parsed whole; their iterators yield the full text once
+FILE_ITERATORS = {
+    ".pdf": iter_pdf_text,
+    ".docx": iter_docx_text,
+    ".doc": lambda file_path: iter([doc_to_text(file_path)]),
+    ".txt": iter_txt_text,
+    ".html": lambda file_path: iter([html_to_text(file_path)]),
+    ".htm": lambda file_path: iter([html_to_text(file_path)]),
+}
+
+def iter_text(file_path: str) -> Iterator[str]:
+    """
+    Like convert_to_txt, but yields the text in pieces (pages for PDF) so large
+    files never have to be held as one string. Unsupported types raise at once.
+    """
+    ext = Path(file_path).suffix.lower()
+    handler = FILE_ITERATORS.get(ext)
+    if not handler:
+        raise ValueError(f"Unsupported file type: {ext}")
+    return handler(file_path)
+
 def convert_to_txt(file_path: str) -> str:
     """
     Convert PDF, DOCX, DOC, TXT, or HTML files to plain text.
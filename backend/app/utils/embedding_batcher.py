@@ -0,0 +1,119 @@
+import asyncio
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Dict, List, Tuple
+from core.config import settings
+from utils import metrics
+
+# Micro-batching of query embeddings: single-text requests for the same embedding
+# client that arrive within EMBEDDING_BATCH_WINDOW_MS (or until
+# EMBEDDING_BATCH_MAX_ITEMS are collected) go to Ollama as one embed_documents call.
+
+
+class _Batch:
+    def __init__(self, embeddings):
+        self.embeddings = embeddings
+        self.items: List[Tuple[str, Future]] = []
+        self.deadline = time.monotonic() + settings.EMBEDDING_BATCH_WINDOW_MS / 1000
+
+    def full(self) -> bool:
+        return len(self.items) >= settings.EMBEDDING_BATCH_MAX_ITEMS
+
+
+# id(embeddings client) -> batch still collecting
+_open: Dict[int, _Batch] = {}
+_cond = threading.Condition()
+_executor = ThreadPoolExecutor(max_workers=settings.EMBEDDING_BATCH_WORKERS, thread_name_prefix="embed-batch")
+_dispatcher: threading.Thread | None = None
+
+REQUESTS = metrics.Counter(
+    "embedding_batch_requests_total",
+    "Query embedding requests queued for a micro-batch."
+)
+BATCH_ITEMS = metrics.Histogram(
+    "embedding_batch_items",
+    "Texts per dispatched query embedding micro-batch.",
+    buckets=(1, 2, 4, 8, 16, 32, 64, 128)
+)
+
+
+def is_enabled() -> bool:
+    return settings.EMBEDDING_BATCH_WINDOW_MS > 0 and settings.EMBEDDING_BATCH_MAX_ITEMS > 1
+
+
+def _run(batch: _Batch) -> None:
+    # identical texts in one window are embedded once
+    unique = list(dict.fromkeys(text for text, _ in batch.items))
+    try:
+        vectors = dict(zip(unique, batch.embeddings.embed_documents(unique)))
+    except Exception as e:
+        for _, future in batch.items:
+            future.set_exception(e)
+        return
+    for text, future in batch.items:
+        future.set_result(vectors[text])
+
+
+def _dispatch_loop() -> None:
+    while True:
+        with _cond:
+            while not _open:
+                _cond.wait()
+            now = time.monotonic()
+            due = [key for key, batch in _open.items() if batch.full() or batch.deadline <= now]
+            if not due:
+                _cond.wait(min(batch.deadline for batch in _open.values()) - now)
+                continue
+            batches = [_open.pop(key) for key in due]
+        for batch in batches:
+            BATCH_ITEMS.observe(len(batch.items))
+            _executor.submit(_run, batch)
+
+
+def _ensure_dispatcher() -> None:
+    global _dispatcher
+    if _dispatcher is None or not _dispatcher.is_alive():
+        _dispatcher = threading.Thread(target=_dispatch_loop, name="embed-batcher", daemon=True)
+        _dispatcher.start()
+
+
+def submit(embeddings, text: str) -> Future:
+    """Queue one text for the next batch of this embedding client; resolves to its vector."""
+    future = Future()
+    with _cond:
+        _ensure_dispatcher()
+        key = id(embeddings)
+        batch = _open.get(key)
+        if batch is None:
+            batch = _open[key] = _Batch(embeddings)
+        batch.items.append((text, future))
+        if len(batch.items) == 1 or batch.full():
+            _cond.notify()
+    REQUESTS.inc()
+    return future
+
+
+def embed(embeddings, text: str) -> List[float]:
+    if not is_enabled():
+        return embeddings.embed_query(text)
+    return submit(embeddings, text).result()
+
+
+async def aembed(embeddings, text: str) -> List[float]:
+    if not is_enabled():
+        return await embeddings.aembed_query(text)
+    return await asyncio.wrap_future(submit(embeddings, text))
+
+
+def _collecting():
+    with _cond:
+        return [((), sum(len(b.items) for b in _open.values()))]
+
+
+metrics.Gauge(
+    "embedding_batch_collecting",
+    "Query embedding requests waiting in a micro-batch that is still collecting.",
+    [],
+    _collecting
+)
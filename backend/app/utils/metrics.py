@@ -0,0 +1,233 @@
+import bisect
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterable, List, Sequence, Tuple
+
+# In-process metrics rendered in the Prometheus text format (0.0.4) at /metrics.
+# Recording is a dict lookup and a couple of additions under one lock, so it is
+# cheap enough for every request. Values are per worker process.
+
+_lock = threading.Lock()
+_registry: List["_Metric"] = []
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+TOKEN_BUCKETS = (64, 128, 256, 512, 1024, 2048, 4096, 8192, 16384, 32768)
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(names: Sequence[str], values: Sequence[str], extra: Tuple[Tuple[str, str], ...] = ()) -> str:
+    pairs = [*zip(names, values), *extra]
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in pairs) + "}"
+
+
+def _number(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class _Metric:
+    kind = "untyped"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        _registry.append(self)
+
+    def _key(self, labels: dict) -> Tuple[str, ...]:
+        return tuple(str(labels.get(name, "")) for name in self.labelnames)
+
+    def _header(self) -> List[str]:
+        return [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+
+    def collect(self) -> List[str]:
+        raise NotImplementedError
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, documentation, labelnames)
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, amount: float = 1.0, **labels) -> None:
+        key = self._key(labels)
+        with _lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def collect(self) -> List[str]:
+        with _lock:
+            values = list(self._values.items())
+        return self._header() + [
+            f"{self.name}{_labels(self.labelnames, key)} {_number(value)}" for key, value in values
+        ]
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = LATENCY_BUCKETS
+    ):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # label values -> [per-bucket counts (last one is +Inf), sum]
+        self._series: Dict[Tuple[str, ...], list] = {}
+
+    def observe(self, value: float, **labels) -> None:
+        key = self._key(labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with _lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [[0] * (len(self.buckets) + 1), 0.0]
+            series[0][index] += 1
+            series[1] += value
+
+    @contextmanager
+    def time(self, **labels):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started, **labels)
+
+    def collect(self) -> List[str]:
+        with _lock:
+            series = [(key, list(counts), total) for key, (counts, total) in self._series.items()]
+        lines = self._header()
+        for key, counts, total in series:
+            cumulative = 0
+            for bound, count in zip((*self.buckets, float("inf")), counts):
+                cumulative += count
+                le = (("le", _number(float(bound))),)
+                lines.append(f"{self.name}_bucket{_labels(self.labelnames, key, le)} {cumulative}")
+            lines.append(f"{self.name}_sum{_labels(self.labelnames, key)} {_number(total)}")
+            lines.append(f"{self.name}_count{_labels(self.labelnames, key)} {cumulative}")
+        return lines
+
+
+class Gauge(_Metric):
+    """Read at scrape time from `read`, which returns (label values, value) pairs."""
+    kind = "gauge"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str],
+        read: Callable[[], Iterable[Tuple[Sequence[str], float]]]
+    ):
+        super().__init__(name, documentation, labelnames)
+        self.read = read
+
+    def collect(self) -> List[str]:
+        try:
+            values = list(self.read())
+        except Exception as e:
+            print(f"[METRICS ERROR] {self.name}: {e}")
+            values = []
+        return self._header() + [
+            f"{self.name}{_labels(self.labelnames, tuple(map(str, key)))} {_number(value)}"
+            for key, value in values
+        ]
+
+
+def render() -> str:
+    lines = []
+    for metric in list(_registry):
+        lines.extend(metric.collect())
+    return "\n".join(lines) + "\n"
+
+
+def _route_template(scope) -> str:
+    """Route template of a handled request; never the raw path, chat URLs carry API tokens."""
+    route = scope.get("route")
+    template = getattr(route, "path", None)
+    regex = getattr(route, "path_regex", None)
+    if template is None or regex is None:
+        return "unmatched"
+    # newer FastAPI versions match included routers without their prefix on route.path
+    path = scope["path"]
+    start = 0
+    while start != -1:
+        if regex.match(path[start:]):
+            return path[:start] + template
+        start = path.find("/", start + 1)
+    return template
+
+
+class MetricsMiddleware:
+    """ASGI middleware timing every HTTP request by method, route template and status."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        started = time.perf_counter()
+        status = 500
+
+        async def send_with_status(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            HTTP_REQUEST_SECONDS.observe(
+                time.perf_counter() - started,
+                method=scope["method"],
+                route=_route_template(scope),
+                status=status
+            )
+
+
+HTTP_REQUEST_SECONDS = Histogram(
+    "http_request_duration_seconds",
+    "HTTP request duration, including the streamed body.",
+    ["method", "route", "status"]
+)
+CHAT_STAGE_SECONDS = Histogram(
+    "chat_stage_duration_seconds",
+    "Duration of one stage of a chat or ask request.",
+    ["endpoint", "stage"]
+)
+CHAT_REQUESTS = Counter(
+    "chat_requests_total",
+    "Chat and ask requests by chatbot, vendor and model.",
+    ["endpoint", "chatbot_id", "vendor_id", "model"]
+)
+CHAT_PROMPT_TOKENS = Histogram(
+    "chat_prompt_tokens",
+    "Planned prompt size in tokens.",
+    ["model"],
+    buckets=TOKEN_BUCKETS
+)
+LLM_FIRST_TOKEN_SECONDS = Histogram(
+    "llm_time_to_first_token_seconds",
+    "Time from admission to the first streamed token.",
+    ["model"]
+)
+LLM_GENERATION_SECONDS = Histogram(
+    "llm_generation_duration_seconds",
+    "Time from admission to the end of the generation.",
+    ["model"]
+)
@@ -0,0 +1,106 @@
+import threading
+from typing import Dict, Tuple
+import httpx
+from langchain_ollama import ChatOllama, OllamaEmbeddings
+from core.config import settings
+from utils import metrics
+
+# Long-lived clients shared by every request in this process. Each ChatOllama /
+# OllamaEmbeddings owns an httpx client, so reusing the object reuses its
+# keep-alive connections to the Ollama daemon.
+_chat_models: Dict[Tuple, ChatOllama] = {}
+_embedding_models: Dict[Tuple, OllamaEmbeddings] = {}
+_lock = threading.Lock()
+
+CLIENT_LOOKUPS = metrics.Counter(
+    "ollama_client_lookups_total",
+    "Shared Ollama client lookups by kind (chat or embedding) and result (hit reuses a client, miss creates one).",
+    ["kind", "result"]
+)
+
+
+def _client_kwargs() -> dict:
+    return {
+        "limits": httpx.Limits(
+            max_connections=settings.OLLAMA_MAX_CONNECTIONS,
+            max_keepalive_connections=settings.OLLAMA_MAX_KEEPALIVE_CONNECTIONS,
+            keepalive_expiry=settings.OLLAMA_KEEPALIVE_EXPIRY_SECONDS,
+        )
+    }
+
+
+def _key(model: str, options: dict) -> Tuple:
+    return (model.strip(),) + tuple(sorted(options.items()))
+
+
+def get_chat_model(model: str, temperature: float, **options) -> ChatOllama:
+    """Return the shared ChatOllama for (model, temperature, options), creating it once."""
+    key = _key(model, {"temperature": temperature, **options})
+    with _lock:
+        client = _chat_models.get(key)
+        if client is not None:
+            CLIENT_LOOKUPS.inc(kind="chat", result="hit")
+            return client
+        CLIENT_LOOKUPS.inc(kind="chat", result="miss")
+        client = ChatOllama(
+            model=model.strip(),
+            temperature=temperature,
+            base_url=settings.OLLAMA_BASE_URL,
+            client_kwargs=_client_kwargs(),
+            **options
+        )
+        _chat_models[key] = client
+        return client
+
+
+def get_embeddings(model: str, **options) -> OllamaEmbeddings:
+    """Return the shared OllamaEmbeddings for (model, options), creating it once."""
+    key = _key(model, options)
+    with _lock:
+        client = _embedding_models.get(key)
+        if client is not None:
+            CLIENT_LOOKUPS.inc(kind="embedding", result="hit")
+            return client
+        CLIENT_LOOKUPS.inc(kind="embedding", result="miss")
+        client = OllamaEmbeddings(
+            model=model.strip(),
+            base_url=settings.OLLAMA_BASE_URL,
+            client_kwargs=_client_kwargs(),
+            **options
+        )
+        _embedding_models[key] = client
+        return client
+
+
+def _open_connections(model) -> int:
+    """Best-effort count of pooled HTTP connections held by a client (sync + async)."""
+    count = 0
+    for attr in ("_client", "_async_client"):
+        ollama_client = getattr(model, attr, None)
+        http_client = getattr(ollama_client, "_client", None)
+        pool = getattr(getattr(http_client, "_transport", None), "_pool", None)
+        try:
+            count += len(pool.connections)
+        except (AttributeError, TypeError):
+            pass
+    return count
+
+
+
+def _clients():
+    with _lock:
+        return [("chat", list(_chat_models.values())), ("embedding", list(_embedding_models.values()))]
+
+
+metrics.Gauge(
+    "ollama_clients",
+    "Shared Ollama clients by kind.",
+    ["kind"],
+    lambda: [((kind,), len(clients)) for kind, clients in _clients()]
+)
+metrics.Gauge(
+    "ollama_open_connections",
+    "Pooled HTTP connections to the Ollama daemon held by the shared clients.",
+    ["kind"],
+    lambda: [((kind,), sum(_open_connections(c) for c in clients)) for kind, clients in _clients()]
+)
@@ -0,0 +1,210 @@
+import asyncio
+import enum
+import threading
+import time
+from collections import defaultdict, deque
+from contextlib import asynccontextmanager, contextmanager
+from dataclasses import dataclass, field
+from typing import Deque, Dict, Optional
+from fastapi import HTTPException
+from core.config import settings
+from utils import metrics
+
+# Admission control in front of every generation sent to Ollama. Each model gets
+# a bounded number of concurrent generations; the rest wait in a bounded queue and
+# are admitted by priority class, then by weighted fair share across vendors.
+
+
+class Priority(enum.IntEnum):
+    production = 0   # API-key chat traffic
+    test = 1         # vendor test chat
+    background = 2   # summaries and other offline work
+
+
+@dataclass
+class _Waiter:
+    priority: Priority
+    vendor_id: Optional[int]
+    enqueued_at: float = field(default_factory=time.monotonic)
+    granted: bool = False
+    event: Optional[threading.Event] = None
+    loop: Optional[asyncio.AbstractEventLoop] = None
+    future: Optional[asyncio.Future] = None
+
+    def wake(self) -> None:
+        if self.event is not None:
+            self.event.set()
+        else:
+            self.loop.call_soon_threadsafe(_resolve, self.future)
+
+
+def _resolve(future: asyncio.Future) -> None:
+    if not future.done():
+        future.set_result(None)
+
+
+class _ModelGate:
+    def __init__(self, model: str, limit: int):
+        self.model = model
+        self.limit = limit
+        self.active = 0
+        # priority -> vendor -> FIFO of waiters
+        self.queues: Dict[Priority, Dict[Optional[int], Deque[_Waiter]]] = {
+            p: defaultdict(deque) for p in Priority
+        }
+        self.queued = 0
+        # vendor -> admissions divided by weight, the fair-share clock
+        self.served: Dict[Optional[int], float] = defaultdict(float)
+
+    def _next_waiter(self) -> Optional[_Waiter]:
+        for priority in Priority:
+            vendors = {v: q for v, q in self.queues[priority].items() if q}
+            if not vendors:
+                continue
+            vendor = min(vendors, key=lambda v: self.served[v])
+            return vendors[vendor].popleft()
+        return None
+
+    def grant(self, waiter: _Waiter) -> None:
+        self.active += 1
+        waiter.granted = True
+        weight = settings.OLLAMA_VENDOR_WEIGHTS.get(waiter.vendor_id, 1.0) if waiter.vendor_id is not None else 1.0
+        # a vendor returning after a quiet period starts level with the vendors still waiting,
+        # instead of using its low count to jump ahead of them
+        waiting = [v for queues in self.queues.values() for v, q in queues.items() if q]
+        floor = min((self.served[v] for v in waiting), default=0.0)
+        self.served[waiter.vendor_id] = max(self.served[waiter.vendor_id], floor) + 1.0 / weight
+        ADMISSION_WAIT_SECONDS.observe(
+            time.monotonic() - waiter.enqueued_at, model=self.model, priority=waiter.priority.name
+        )
+        ADMISSIONS.inc(model=self.model, priority=waiter.priority.name, result="admitted")
+
+    def release(self) -> None:
+        self.active -= 1
+        while self.active < self.limit:
+            waiter = self._next_waiter()
+            if waiter is None:
+                return
+            self.queued -= 1
+            self.grant(waiter)
+            waiter.wake()
+
+    def remove(self, waiter: _Waiter) -> None:
+        queue = self.queues[waiter.priority].get(waiter.vendor_id)
+        if queue is not None and waiter in queue:
+            queue.remove(waiter)
+            self.queued -= 1
+
+
+_gates: Dict[str, _ModelGate] = {}
+_lock = threading.Lock()
+
+ADMISSION_WAIT_SECONDS = metrics.Histogram(
+    "ollama_admission_wait_seconds",
+    "Time a generation waited for a slot before it was admitted.",
+    ["model", "priority"]
+)
+ADMISSIONS = metrics.Counter(
+    "ollama_admissions_total",
+    "Generation admission outcomes: admitted, rejected (queue full) or abandoned (timed out or cancelled while queued).",
+    ["model", "priority", "result"]
+)
+
+
+def _gate(model: str) -> _ModelGate:
+    model = model.strip()
+    gate = _gates.get(model)
+    if gate is None:
+        limit = settings.OLLAMA_MODEL_CONCURRENCY.get(model, settings.OLLAMA_MAX_CONCURRENCY_PER_MODEL)
+        gate = _gates[model] = _ModelGate(model, max(1, limit))
+    return gate
+
+
+def _enter(model: str, priority: Priority, vendor_id: Optional[int], waiter: _Waiter) -> bool:
+    """Take a slot right away (True) or enqueue the waiter (False). Raises 503 when the queue is full."""
+    with _lock:
+        gate = _gate(model)
+        if gate.active < gate.limit and gate.queued == 0:
+            gate.grant(waiter)
+            return True
+        if gate.queued >= settings.OLLAMA_MAX_QUEUE_PER_MODEL:
+            ADMISSIONS.inc(model=model.strip(), priority=priority.name, result="rejected")
+            raise _busy()
+        gate.queues[priority][vendor_id].append(waiter)
+        gate.queued += 1
+        return False
+
+
+def _abandon(model: str, waiter: _Waiter) -> bool:
+    """Give up waiting. Returns True if the slot was granted meanwhile and must be released."""
+    with _lock:
+        gate = _gate(model)
+        if waiter.granted:
+            return True
+        gate.remove(waiter)
+        ADMISSIONS.inc(model=gate.model, priority=waiter.priority.name, result="abandoned")
+        return False
+
+
+def _release(model: str) -> None:
+    with _lock:
+        _gate(model).release()
+
+
+def _busy() -> HTTPException:
+    return HTTPException(status_code=503, detail="Model is busy, please retry shortly")
+
+
+@contextmanager
+def admit(model: str, priority: Priority, vendor_id: Optional[int] = None):
+    """Hold a generation slot for `model` in a sync caller (threadpool endpoints, worker threads)."""
+    waiter = _Waiter(priority, vendor_id, event=threading.Event())
+    if not _enter(model, priority, vendor_id, waiter):
+        if not waiter.event.wait(settings.OLLAMA_QUEUE_TIMEOUT_SECONDS):
+            if not _abandon(model, waiter):
+                raise _busy()
+    try:
+        yield
+    finally:
+        _release(model)
+
+
+@asynccontextmanager
+async def aadmit(model: str, priority: Priority, vendor_id: Optional[int] = None):
+    """Async counterpart of admit; waiting doesn't block the event loop."""
+    loop = asyncio.get_running_loop()
+    waiter = _Waiter(priority, vendor_id, loop=loop, future=loop.create_future())
+    if not _enter(model, priority, vendor_id, waiter):
+        try:
+            await asyncio.wait_for(asyncio.shield(waiter.future), settings.OLLAMA_QUEUE_TIMEOUT_SECONDS)
+        except (asyncio.TimeoutError, asyncio.CancelledError) as e:
+            if not _abandon(model, waiter):
+                if isinstance(e, asyncio.CancelledError):
+                    raise
+                raise _busy()
+            if isinstance(e, asyncio.CancelledError):
+                _release(model)
+                raise
+    try:
+        yield
+    finally:
+        _release(model)
+
+
+def _gauge_values(field: str):
+    with _lock:
+        return [((model,), getattr(gate, field)) for model, gate in _gates.items()]
+
+
+metrics.Gauge(
+    "ollama_active_generations",
+    "Generations currently admitted per model.",
+    ["model"],
+    lambda: _gauge_values("active")
+)
+metrics.Gauge(
+    "ollama_queued_generations",
+    "Generations waiting for a slot per model.",
+    ["model"],
+    lambda: _gauge_values("queued")
+)
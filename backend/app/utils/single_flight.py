@@ -0,0 +1,39 @@
+import asyncio
+from typing import Any, Awaitable, Callable, Dict, Tuple
+from utils import metrics
+
+# key -> task doing the work for every caller currently waiting on that key
+_in_flight: Dict[str, asyncio.Task] = {}
+
+CALLS = metrics.Counter(
+    "single_flight_calls_total",
+    "Coalesced calls by role: leader (ran the work) or coalesced (joined another caller's work).",
+    ["role"]
+)
+
+
+async def run(key: str, fn: Callable[[], Awaitable[Any]]) -> Tuple[Any, bool]:
+    """
+    Run `fn` once per key among concurrent callers in this event loop.
+    Returns (result, shared); `shared` is True for callers that joined work
+    started by another request. Exceptions reach every waiter. The work runs
+    in its own task, so a caller that disconnects doesn't cancel it for the rest.
+    """
+    task = _in_flight.get(key)
+    shared = task is not None
+    if shared:
+        CALLS.inc(role="coalesced")
+    else:
+        CALLS.inc(role="leader")
+        task = asyncio.ensure_future(fn())
+        _in_flight[key] = task
+        task.add_done_callback(lambda t: _in_flight.pop(key, None) if _in_flight.get(key) is t else None)
+    return await asyncio.shield(task), shared
+
+
+metrics.Gauge(
+    "single_flight_in_flight",
+    "Keys with work currently in flight.",
+    [],
+    lambda: [((), len(_in_flight))]
+)
@@ -0,0 +1,55 @@
+import threading
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+from typing import Awaitable, Dict, Tuple, TypeVar
+
+T = TypeVar("T")
+
+# (endpoint, stage name) -> {"count", "total_ms", "max_ms"} across all requests in this process
+_totals: Dict[Tuple[str, str], Dict[str, float]] = defaultdict(lambda: {"count": 0, "total_ms": 0.0, "max_ms": 0.0})
+_lock = threading.Lock()
+
+
+def record(endpoint: str, stage: str, elapsed_ms: float) -> None:
+    with _lock:
+        totals = _totals[(endpoint, stage)]
+        totals["count"] += 1
+        totals["total_ms"] += elapsed_ms
+        totals["max_ms"] = max(totals["max_ms"], elapsed_ms)
+
+
+class StageTimer:
+    """Wall-clock time of the named stages of one request; stages may overlap."""
+
+    def __init__(self, endpoint: str, histogram=None):
+        self.endpoint = endpoint
+        # optional metrics.Histogram with "endpoint" and "stage" labels, fed alongside the totals above
+        self.histogram = histogram
+        self.timings: Dict[str, float] = {}
+
+    @contextmanager
+    def stage(self, name: str):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed_ms = (time.perf_counter() - started) * 1000
+            self.timings[name] = elapsed_ms
+            record(self.endpoint, name, elapsed_ms)
+            if self.histogram is not None:
+                self.histogram.observe(elapsed_ms / 1000, endpoint=self.endpoint, stage=name)
+
+    async def run(self, name: str, awaitable: Awaitable[T]) -> T:
+        with self.stage(name):
+            return await awaitable
+
+
+def stats() -> dict:
+    """{endpoint: {stage: totals}}"""
+    result: Dict[str, dict] = defaultdict(dict)
+    with _lock:
+        for (endpoint, stage), totals in _totals.items():
+            average = totals["total_ms"] / totals["count"] if totals["count"] else 0.0
+            result[endpoint][stage] = {**totals, "avg_ms": average}
+    return dict(result)
@@ -0,0 +1,50 @@
+import json
+from enum import Enum
+from typing import AsyncIterable, Dict, Optional
+from fastapi.responses import StreamingResponse
+
+
+class StreamFormat(str, Enum):
+    sse = "sse"
+    ndjson = "ndjson"
+
+
+def _sse(event: str, data: dict) -> str:
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+
+def _ndjson(event: str, data: dict) -> str:
+    return json.dumps({"type": event, **data}) + "\n"
+
+
+def stream_chat_response(
+    chunks: AsyncIterable[str],
+    stream_format: StreamFormat = StreamFormat.sse,
+    session_id: Optional[str] = None,
+    headers: Optional[Dict[str, str]] = None
+) -> StreamingResponse:
+    """
+    Wrap an iterator of answer chunks as Server-Sent Events or newline-delimited JSON.
+    Emits one "token" event per chunk, then "done" (or "error" if generation fails).
+    """
+    encode = _sse if stream_format == StreamFormat.sse else _ndjson
+
+    async def body():
+        try:
+            async for chunk in chunks:
+                yield encode("token", {"content": chunk})
+        except Exception as e:
+            yield encode("error", {"detail": str(e)})
+            return
+        yield encode("done", {"session_id": session_id})
+
+    media_type = "text/event-stream" if stream_format == StreamFormat.sse else "application/x-ndjson"
+    return StreamingResponse(
+        body(),
+        media_type=media_type,
+        headers={
+            "Cache-Control": "no-cache",
+            "X-Accel-Buffering": "no",  # keep nginx/cloudflared from buffering the stream
+            **(headers or {}),
+        },
+    )
@@ -1,21 +1,24 @@
 from fastapi.websockets import WebSocket
+import asyncio
 import json
-from typing import List
+from typing import Dict, Optional
 
-# in-memory list of active connections; suitable for single-process dev.
-active_connections: List[WebSocket] = []
+# in-memory map of active connections to the vendor id they may see (None for admins,
+# who see every vendor); suitable for single-process dev.
+active_connections: Dict[WebSocket, Optional[int]] = {}
+# event loop serving the connections, so plain threads (not started by anyio) can send too
+_loop: Optional[asyncio.AbstractEventLoop] = None
 
 
-async def register_ws(ws: WebSocket):
+async def register_ws(ws: WebSocket, vendor_id: Optional[int] = None):
+    global _loop
     await ws.accept()
-    active_connections.append(ws)
+    _loop = asyncio.get_running_loop()
+    active_connections[ws] = vendor_id
 
 
 def unregister_ws(ws: WebSocket):
-    try:
-        active_connections.remove(ws)
-    except ValueError:
-        pass
+    active_connections.pop(ws, None)
 
 
 def _format_llm_message(llm):
@@ -32,6 +35,53 @@ def _format_llm_message(llm):
     })
 
 
+def _format_ingestion_message(job, documents):
+    return json.dumps({
+        "type": "ingestion.update",
+        "payload": {
+            "id": job.id,
+            "chatbot_id": job.chatbot_id,
+            "status": getattr(job.status, "value", job.status),
+            "stage": job.stage,
+            "progress": job.progress,
+            "processed_documents": job.processed_documents,
+            "failed_documents": job.failed_documents,
+            "total_documents": job.total_documents,
+            "error": job.error,
+            "documents": [
+                {"id": doc_id, "stage": stage, "progress": progress}
+                for doc_id, stage, progress in documents
+            ],
+        }
+    })
+
+
+def broadcast_ingestion_update(job, vendor_id: int, documents=()):
+    """
+    Push an ingestion job's progress to admins and to the connections of `vendor_id`,
+    the owner of the job's chatbot; `documents` is (id, stage, progress) per document.
+    Never raises.
+    """
+    loop = _loop
+    if loop is None or loop.is_closed() or not active_connections:
+        return
+    msg = _format_ingestion_message(job, documents)
+
+    def _drop_on_failure(ws):
+        def callback(future):
+            if future.cancelled() or future.exception() is not None:
+                unregister_ws(ws)
+        return callback
+
+    for ws, allowed in list(active_connections.items()):
+        if allowed is not None and allowed != vendor_id:
+            continue
+        try:
+            asyncio.run_coroutine_threadsafe(ws.send_text(msg), loop).add_done_callback(_drop_on_failure(ws))
+        except Exception:
+            unregister_ws(ws)
+
+
 def broadcast_llm_update(llm):
     """
     Synchronously broadcast from background thread/process.
@@ -48,7 +98,4 @@ def broadcast_llm_update(llm):
             anyio.from_thread.run(ws.send_text, msg)
         except Exception:
             # if send fails, remove connection
-            try:
-                active_connections.remove(ws)
-            except Exception:
-                pass
+            unregister_ws(ws)
@@ -0,0 +1,257 @@
+"""
+Stand-in for the Ollama HTTP API, good enough for ChatOllama and OllamaEmbeddings.
+
+Generation speed, first-token latency and failures are configurable so the chat
+path can be load-tested on a machine without a GPU or a model:
+
+    python benchmarks/fake_ollama.py --port 11435 --tokens-per-second 40 --first-token-ms 200
+
+Embeddings are deterministic (hash of the text), so identical texts get identical vectors.
+"""
+import argparse
+import hashlib
+import json
+import math
+import random
+import threading
+import time
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+WORDS = (
+    "the platform answers questions from the uploaded documents using retrieval "
+    "and a local language model so vendors can embed a chatbot on their site"
+).split()
+
+
+@dataclass
+class FakeOllamaConfig:
+    tokens_per_second: float = 50.0
+    response_tokens: int = 64
+    # time to first token: normal(first_token_ms, first_token_jitter_ms), clipped at 0
+    first_token_ms: float = 150.0
+    first_token_jitter_ms: float = 50.0
+    embed_ms: float = 10.0
+    embedding_dim: int = 768
+    # share of requests answered with HTTP 500 before any output
+    failure_rate: float = 0.0
+    # share of streamed generations cut off half way through
+    disconnect_rate: float = 0.0
+    seed: int | None = None
+
+
+def fake_embedding(text: str, dim: int) -> list:
+    values = []
+    counter = 0
+    while len(values) < dim:
+        digest = hashlib.sha256(f"{counter}:{text}".encode()).digest()
+        values.extend(b / 127.5 - 1.0 for b in digest)
+        counter += 1
+    values = values[:dim]
+    norm = math.sqrt(sum(v * v for v in values)) or 1.0
+    return [v / norm for v in values]
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    server: "FakeOllamaServer"
+
+    def log_message(self, format, *args):
+        pass
+
+    def _read_json(self) -> dict:
+        length = int(self.headers.get("Content-Length") or 0)
+        return json.loads(self.rfile.read(length) or b"{}")
+
+    def _send_json(self, payload: dict, status: int = 200) -> None:
+        body = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _write_chunk(self, payload: dict) -> None:
+        data = json.dumps(payload).encode() + b"\n"
+        self.wfile.write(f"{len(data):x}\r\n".encode() + data + b"\r\n")
+        self.wfile.flush()
+
+    def _fail(self) -> bool:
+        if self.server.rng_random() < self.server.config.failure_rate:
+            self.server.count("failures")
+            self._send_json({"error": "injected failure"}, status=500)
+            return True
+        return False
+
+    def do_GET(self):
+        if self.path == "/api/version":
+            self._send_json({"version": "0.0.0-fake"})
+        elif self.path == "/api/tags":
+            self._send_json({"models": []})
+        else:
+            self._send_json({"error": "not found"}, status=404)
+
+    def do_POST(self):
+        payload = self._read_json()
+        if self.path == "/api/chat":
+            self._chat(payload)
+        elif self.path == "/api/embed":
+            self._embed(payload)
+        elif self.path == "/api/embeddings":
+            self._legacy_embed(payload)
+        elif self.path == "/api/show":
+            self._send_json({"modelfile": "", "parameters": "", "template": "", "details": {}})
+        else:
+            self._send_json({"error": "not found"}, status=404)
+
+    def _embed(self, payload: dict):
+        self.server.count("embed_requests")
+        if self._fail():
+            return
+        texts = payload.get("input") or []
+        if isinstance(texts, str):
+            texts = [texts]
+        self.server.count("embedded_texts", len(texts))
+        time.sleep(self.server.config.embed_ms / 1000)
+        dim = self.server.config.embedding_dim
+        self._send_json({"model": payload.get("model"), "embeddings": [fake_embedding(t, dim) for t in texts]})
+
+    def _legacy_embed(self, payload: dict):
+        self.server.count("embed_requests")
+        if self._fail():
+            return
+        time.sleep(self.server.config.embed_ms / 1000)
+        self._send_json({"embedding": fake_embedding(payload.get("prompt", ""), self.server.config.embedding_dim)})
+
+    def _chat(self, payload: dict):
+        self.server.count("chat_requests")
+        if self._fail():
+            return
+        config = self.server.config
+        model = payload.get("model", "fake")
+        prompt_chars = sum(len(m.get("content") or "") for m in payload.get("messages", []))
+        tokens = [WORDS[i % len(WORDS)] + " " for i in range(config.response_tokens)]
+        interval = 1.0 / config.tokens_per_second if config.tokens_per_second > 0 else 0.0
+        started = time.perf_counter()
+        time.sleep(max(0.0, self.server.rng_gauss(config.first_token_ms, config.first_token_jitter_ms)) / 1000)
+
+        final = {
+            "model": model,
+            "created_at": datetime.now(timezone.utc).isoformat(),
+            "done": True,
+            "done_reason": "stop",
+            "prompt_eval_count": prompt_chars // 4,
+            "eval_count": len(tokens),
+        }
+        if not payload.get("stream", True):
+            time.sleep(interval * len(tokens))
+            final["total_duration"] = int((time.perf_counter() - started) * 1e9)
+            self._send_json({**final, "message": {"role": "assistant", "content": "".join(tokens)}})
+            return
+
+        self.send_response(200)
+        self.send_header("Content-Type", "application/x-ndjson")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+        cut_at = len(tokens) // 2 if self.server.rng_random() < config.disconnect_rate else None
+        for i, token in enumerate(tokens):
+            if i == cut_at:
+                self.server.count("disconnects")
+                self.close_connection = True
+                return
+            if i:
+                time.sleep(interval)
+            self._write_chunk({
+                "model": model,
+                "created_at": datetime.now(timezone.utc).isoformat(),
+                "message": {"role": "assistant", "content": token},
+                "done": False,
+            })
+        final["total_duration"] = int((time.perf_counter() - started) * 1e9)
+        self._write_chunk({**final, "message": {"role": "assistant", "content": ""}})
+        self.wfile.write(b"0\r\n\r\n")
+        self.server.count("completed_generations")
+
+
+class FakeOllamaServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 0, config: FakeOllamaConfig | None = None):
+        super().__init__((host, port), _Handler)
+        self.config = config or FakeOllamaConfig()
+        self.counters = {}
+        self._lock = threading.Lock()
+        self._rng = random.Random(self.config.seed)
+        self._thread = None
+
+    @property
+    def base_url(self) -> str:
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def rng_random(self) -> float:
+        with self._lock:
+            return self._rng.random()
+
+    def rng_gauss(self, mu: float, sigma: float) -> float:
+        with self._lock:
+            return self._rng.gauss(mu, sigma) if sigma > 0 else mu
+
+    def count(self, name: str, amount: int = 1) -> None:
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + amount
+
+    def stats(self) -> dict:
+        with self._lock:
+            return dict(self.counters)
+
+    def start(self) -> "FakeOllamaServer":
+        self._thread = threading.Thread(target=self.serve_forever, name="fake-ollama", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self.shutdown()
+        self.server_close()
+
+
+def add_arguments(parser: argparse.ArgumentParser) -> None:
+    defaults = FakeOllamaConfig()
+    parser.add_argument("--tokens-per-second", type=float, default=defaults.tokens_per_second)
+    parser.add_argument("--response-tokens", type=int, default=defaults.response_tokens)
+    parser.add_argument("--first-token-ms", type=float, default=defaults.first_token_ms)
+    parser.add_argument("--first-token-jitter-ms", type=float, default=defaults.first_token_jitter_ms)
+    parser.add_argument("--embed-ms", type=float, default=defaults.embed_ms)
+    parser.add_argument("--embedding-dim", type=int, default=defaults.embedding_dim)
+    parser.add_argument("--failure-rate", type=float, default=defaults.failure_rate)
+    parser.add_argument("--disconnect-rate", type=float, default=defaults.disconnect_rate)
+    parser.add_argument("--seed", type=int, default=None)
+
+
+def config_from_args(args: argparse.Namespace) -> FakeOllamaConfig:
+    return FakeOllamaConfig(
+        tokens_per_second=args.tokens_per_second,
+        response_tokens=args.response_tokens,
+        first_token_ms=args.first_token_ms,
+        first_token_jitter_ms=args.first_token_jitter_ms,
+        embed_ms=args.embed_ms,
+        embedding_dim=args.embedding_dim,
+        failure_rate=args.failure_rate,
+        disconnect_rate=args.disconnect_rate,
+        seed=args.seed,
+    )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Fake Ollama server for benchmarks")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=11435)
+    add_arguments(parser)
+    args = parser.parse_args()
+    server = FakeOllamaServer(args.host, args.port, config_from_args(args))
+    print(f"fake ollama listening on {server.base_url}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        server.server_close()
@@ -0,0 +1,344 @@
+"""
+Load-test /chat, /ask and document upload against a fake Ollama server.
+
+Starts benchmarks/fake_ollama.py in-process, seeds chatbots into the database
+configured by the usual DB_* settings (point DB_NAME at a scratch database),
+drives the app in-process through httpx's ASGI transport and reports latency
+percentiles, throughput and SQL statements per request:
+
+    cd backend/app
+    python ../../benchmarks/run.py --scenarios chat,ask --requests 500 --concurrency 32
+
+--base-url benchmarks a running server instead (it must use the same database);
+SQL statements can only be counted in-process. --ollama-url skips the fake server.
+"""
+import argparse
+import asyncio
+import json
+import os
+import sys
+import tempfile
+import threading
+import time
+import uuid
+from collections import Counter
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Awaitable, Callable, Dict, List
+
+BENCH_DIR = Path(__file__).resolve().parent
+APP_DIR = BENCH_DIR.parent / "backend" / "app"
+sys.path.insert(0, str(BENCH_DIR))
+
+import httpx
+from fake_ollama import FakeOllamaServer, add_arguments, config_from_args
+
+QUESTIONS = [
+    "What does the platform do?",
+    "How do I upload documents?",
+    "Which file types are supported?",
+    "How is my data stored?",
+    "Can I change the system prompt?",
+    "How do API keys work?",
+    "What happens when a key is revoked?",
+    "How long are conversations kept?",
+    "Can the chatbot answer in other languages?",
+    "How do I embed the widget on my site?",
+]
+
+
+class SQLCounter:
+    """Counts statements sent by the app's sync and async engines."""
+
+    def __init__(self, engines: Dict[str, object]):
+        self.counts = Counter()
+        self._lock = threading.Lock()
+        from sqlalchemy import event
+        for name, engine in engines.items():
+            event.listen(engine, "before_cursor_execute", self._listener(name))
+
+    def _listener(self, name: str):
+        def count(*_):
+            with self._lock:
+                self.counts[name] += 1
+        return count
+
+    def snapshot(self) -> Dict[str, int]:
+        with self._lock:
+            return dict(self.counts)
+
+
+@dataclass
+class ScenarioResult:
+    name: str
+    requests: int = 0
+    errors: Counter = field(default_factory=Counter)
+    latencies_ms: List[float] = field(default_factory=list)
+    duration_s: float = 0.0
+    sql: Dict[str, int] = field(default_factory=dict)
+
+    def report(self) -> dict:
+        ok = sorted(self.latencies_ms)
+        result = {
+            "requests": self.requests,
+            "ok": len(ok),
+            "errors": sum(self.errors.values()),
+            "error_kinds": dict(self.errors),
+            "throughput_rps": round(len(ok) / self.duration_s, 2) if self.duration_s else 0.0,
+            "p50_ms": percentile(ok, 50),
+            "p95_ms": percentile(ok, 95),
+            "p99_ms": percentile(ok, 99),
+            "max_ms": round(ok[-1], 1) if ok else None,
+        }
+        if self.sql:
+            result["sql_per_request"] = {
+                engine: round(count / self.requests, 2) for engine, count in self.sql.items()
+            } if self.requests else {}
+        return result
+
+
+def percentile(sorted_values: List[float], pct: float):
+    if not sorted_values:
+        return None
+    # nearest-rank
+    rank = max(1, -(-len(sorted_values) * pct // 100))
+    return round(sorted_values[int(rank) - 1], 1)
+
+
+async def run_scenario(
+    name: str,
+    send: Callable[[int, int], Awaitable[httpx.Response]],
+    requests: int,
+    concurrency: int,
+    warmup: int,
+    sql_counter: SQLCounter | None,
+    check: Callable[[httpx.Response], str | None] | None = None
+) -> ScenarioResult:
+    result = ScenarioResult(name)
+
+    async def one(worker: int, index: int, record: bool):
+        started = time.perf_counter()
+        try:
+            response = await send(worker, index)
+            error = f"HTTP {response.status_code}" if response.status_code >= 400 else None
+            if error is None and check is not None:
+                error = check(response)
+        except Exception as e:
+            error = type(e).__name__
+        if not record:
+            return
+        result.requests += 1
+        if error:
+            result.errors[error] += 1
+        else:
+            result.latencies_ms.append((time.perf_counter() - started) * 1000)
+
+    for i in range(warmup):
+        await one(0, -1 - i, record=False)
+
+    indexes = iter(range(requests))
+
+    async def worker(worker_id: int):
+        for index in indexes:
+            await one(worker_id, index, record=True)
+
+    sql_before = sql_counter.snapshot() if sql_counter else {}
+    started = time.perf_counter()
+    await asyncio.gather(*(worker(w) for w in range(concurrency)))
+    result.duration_s = time.perf_counter() - started
+    if sql_counter:
+        after = sql_counter.snapshot()
+        result.sql = {engine: after.get(engine, 0) - sql_before.get(engine, 0) for engine in after}
+    return result
+
+
+def chat_sender(client: httpx.AsyncClient, tokens: List[str], turns_per_session: int, run_id: str):
+    turns: Counter = Counter()
+
+    async def send(worker: int, index: int) -> httpx.Response:
+        turn = turns[worker]
+        turns[worker] += 1
+        session_id = f"bench-{run_id}-{worker}-{turn // turns_per_session}"
+        return await client.post(
+            f"/chatbots/{tokens[worker % len(tokens)]}/chat",
+            json={"question": QUESTIONS[turn % len(QUESTIONS)], "session_id": session_id}
+        )
+    return send
+
+
+def ask_sender(client: httpx.AsyncClient, tokens: List[str], distinct_questions: int, use_cache: bool):
+    async def send(worker: int, index: int) -> httpx.Response:
+        question_no = index % distinct_questions
+        question = QUESTIONS[question_no % len(QUESTIONS)]
+        if question_no >= len(QUESTIONS):
+            question = f"{question} (variant {question_no})"
+        return await client.post(
+            f"/chatbots/{tokens[worker % len(tokens)]}/ask",
+            params={} if use_cache else {"no_cache": "true"},
+            json={"question": question}
+        )
+    return send
+
+
+def upload_sender(client: httpx.AsyncClient, chatbot_ids: List[int], files: int, kilobytes: int):
+    paragraph = (" ".join(QUESTIONS) + "\n\n").encode()
+    body = paragraph * max(1, kilobytes * 1024 // len(paragraph))
+
+    async def send(worker: int, index: int) -> httpx.Response:
+        upload = [
+            ("files", (f"bench-{index}-{n}.txt", body, "text/plain"))
+            for n in range(files)
+        ]
+        response = await client.post(f"/documents/chatbots/{chatbot_ids[worker % len(chatbot_ids)]}/documents", files=upload)
+        # indexing runs as a background job; the latency is until the job has finished
+        while response.status_code < 400 and response.json().get("status") in ("queued", "running"):
+            await asyncio.sleep(0.05)
+            response = await client.get(f"/documents/jobs/{response.json()['id']}")
+        return response
+    return send
+
+
+def check_upload(response: httpx.Response) -> str | None:
+    # a finished job can still have failed documents; the status is per document
+    job = response.json()
+    statuses = {doc.get("status") for doc in job.get("documents", [])}
+    failed = statuses - {"embedded"}
+    if failed:
+        return f"document {failed.pop()}"
+    return f"job {job.get('status')}" if job.get("status") != "succeeded" else None
+
+
+def print_report(results: Dict[str, dict], ollama_stats: dict) -> None:
+    header = f"{'scenario':<8} {'ok':>6} {'err':>5} {'rps':>8} {'p50':>8} {'p95':>8} {'p99':>8} {'max':>8}  sql/req"
+    print(header)
+    print("-" * len(header))
+    for name, r in results.items():
+        sql = " ".join(f"{engine}={count}" for engine, count in r.get("sql_per_request", {}).items()) or "-"
+        cells = [r["p50_ms"], r["p95_ms"], r["p99_ms"], r["max_ms"]]
+        print(
+            f"{name:<8} {r['ok']:>6} {r['errors']:>5} {r['throughput_rps']:>8} "
+            + " ".join(f"{'-' if c is None else c:>8}" for c in cells)
+            + f"  {sql}"
+        )
+        if r["error_kinds"]:
+            print(f"{'':<8} errors: {r['error_kinds']}")
+    if ollama_stats:
+        print(f"fake ollama: {ollama_stats}")
+
+
+async def main(args: argparse.Namespace) -> dict:
+    fake = None
+    ollama_url = args.ollama_url
+    if not ollama_url:
+        fake = FakeOllamaServer(port=args.ollama_port, config=config_from_args(args)).start()
+        ollama_url = fake.base_url
+    os.environ["OLLAMA_BASE_URL"] = ollama_url
+
+    # settings (.env) are read relative to the working directory, so the app is imported first
+    sys.path.insert(0, str(APP_DIR))
+    import seed as bench_seed
+    from core.config import settings
+    settings.OLLAMA_BASE_URL = ollama_url
+    from db.database import engine, async_engine
+    from modules.messages.services import message_writer
+    from utils import stage_timer
+
+    sql_counter = None
+    if args.base_url:
+        transport = None
+        base_url = args.base_url
+    else:
+        from main import app
+        transport = httpx.ASGITransport(app=app, raise_app_exceptions=False)
+        base_url = "http://bench"
+        sql_counter = SQLCounter({"sync": engine, "async": async_engine.sync_engine})
+
+    # uploaded files and vector stores go under the work dir
+    workdir = args.workdir or tempfile.mkdtemp(prefix="chatbot-bench-")
+    os.makedirs(workdir, exist_ok=True)
+    os.chdir(workdir)
+
+    data = bench_seed.seed(
+        chatbots=args.chatbots,
+        llm_model=args.llm_model,
+        embedding_model=args.embedding_model,
+        vector_store_type=args.vector_store
+    )
+    run_id = uuid.uuid4().hex[:6]
+    results = {}
+    try:
+        async with httpx.AsyncClient(
+            transport=transport,
+            base_url=base_url,
+            timeout=args.timeout,
+            limits=httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+        ) as client:
+            senders = {
+                "upload": lambda: upload_sender(client, data.chatbot_ids, args.upload_files, args.upload_kb),
+                "chat": lambda: chat_sender(client, data.tokens, args.turns_per_session, run_id),
+                "ask": lambda: ask_sender(client, data.tokens, args.distinct_questions, args.use_cache),
+            }
+            for name in args.scenarios.split(","):
+                name = name.strip()
+                if name not in senders:
+                    raise SystemExit(f"unknown scenario {name!r}, expected one of {', '.join(senders)}")
+                concurrency = min(args.concurrency, args.upload_concurrency) if name == "upload" else args.concurrency
+                result = await run_scenario(
+                    name,
+                    senders[name](),
+                    args.requests,
+                    concurrency,
+                    args.warmup,
+                    sql_counter,
+                    check=check_upload if name == "upload" else None
+                )
+                results[name] = result.report()
+                # write-behind rows belong to the scenario that produced them
+                message_writer.flush()
+    finally:
+        if not args.keep_data:
+            bench_seed.cleanup(data)
+        if fake is not None:
+            fake.stop()
+
+    print_report(results, fake.stats() if fake else {})
+    report = {
+        "results": results,
+        "stages": stage_timer.stats() if not args.base_url else {},
+        "fake_ollama": fake.stats() if fake else {},
+        "config": vars(args),
+    }
+    if args.json:
+        Path(args.json).write_text(json.dumps(report, indent=2, default=str))
+    return report
+
+
+def parse_args(argv=None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Benchmark the chat, ask and upload paths")
+    parser.add_argument("--scenarios", default="chat,ask", help="comma separated: upload, chat, ask (run in order)")
+    parser.add_argument("--requests", type=int, default=200, help="measured requests per scenario")
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--warmup", type=int, default=5, help="unmeasured requests before each scenario")
+    parser.add_argument("--chatbots", type=int, default=1)
+    parser.add_argument("--turns-per-session", type=int, default=5, help="chat turns before a worker starts a new session")
+    parser.add_argument("--distinct-questions", type=int, default=len(QUESTIONS))
+    parser.add_argument("--use-cache", action="store_true", help="let /ask use the response cache")
+    parser.add_argument("--upload-files", type=int, default=2, help="files per upload request")
+    parser.add_argument("--upload-kb", type=int, default=20, help="size of each uploaded file")
+    parser.add_argument("--upload-concurrency", type=int, default=4)
+    parser.add_argument("--vector-store", default="chroma", choices=["chroma", "faiss"])
+    parser.add_argument("--llm-model", default="bench-llm")
+    parser.add_argument("--embedding-model", default="bench-embed")
+    parser.add_argument("--timeout", type=float, default=120.0)
+    parser.add_argument("--base-url", default=None, help="benchmark a running server instead of the in-process app")
+    parser.add_argument("--ollama-url", default=None, help="use this Ollama instead of the fake server")
+    parser.add_argument("--ollama-port", type=int, default=0, help="port of the fake server, 0 picks a free one")
+    parser.add_argument("--workdir", default=None)
+    parser.add_argument("--keep-data", action="store_true", help="don't delete the seeded rows afterwards")
+    parser.add_argument("--json", default=None, help="also write the report to this file")
+    add_arguments(parser)
+    return parser.parse_args(argv)
+
+
+if __name__ == "__main__":
+    asyncio.run(main(parse_args()))
@@ -0,0 +1,101 @@
+"""Seed and remove the rows a benchmark run needs: one vendor, its models and chatbots, one API key each."""
+import secrets
+import uuid
+from dataclasses import dataclass, field
+from typing import List
+from core.enums import APIKeyStatus
+from db.database import SessionLocal
+from modules.api_keys.models.api_model import APIKey
+from modules.chatbots.models.chatbot_model import Chatbot
+from modules.embeddings.models.embedding_model import Embedding
+from modules.llms.models.llm_model import LLM
+from modules.vendors.models.vendor_model import Vendor
+
+
+@dataclass
+class SeededData:
+    vendor_id: int
+    embedding_id: int
+    llm_id: int
+    chatbot_ids: List[int] = field(default_factory=list)
+    tokens: List[str] = field(default_factory=list)
+
+
+def seed(
+    chatbots: int = 1,
+    llm_model: str = "bench-llm",
+    embedding_model: str = "bench-embed",
+    vector_store_type: str = "chroma",
+    context_limit: int = 4096,
+    token_limit: int = 512
+) -> SeededData:
+    run_id = uuid.uuid4().hex[:8]
+    db = SessionLocal()
+    try:
+        vendor = Vendor(
+            name=f"bench-{run_id}",
+            email=f"bench-{run_id}@bench.local",
+            hashed_password="!",
+            domain=f"bench-{run_id}.local"
+        )
+        embedding = Embedding(model_name=embedding_model, provider="ollama")
+        db.add_all([vendor, embedding])
+        db.flush()
+
+        llm = LLM(
+            name=llm_model,
+            provider="ollama",
+            embedding_id=embedding.id,
+            def_token_limit=token_limit,
+            def_context_limit=context_limit,
+            path=llm_model
+        )
+        db.add(llm)
+        db.flush()
+
+        data = SeededData(vendor_id=vendor.id, embedding_id=embedding.id, llm_id=llm.id)
+        for i in range(chatbots):
+            chatbot = Chatbot(
+                vendor_id=vendor.id,
+                name=f"bench-{run_id}-{i}",
+                system_prompt="You are a helpful assistant.",
+                llm_id=llm.id,
+                llm_path=llm_model,
+                vector_store_type=vector_store_type
+            )
+            db.add(chatbot)
+            db.flush()
+            token = f"bench_{secrets.token_urlsafe(24)}"
+            db.add(APIKey(
+                vendor_id=vendor.id,
+                chatbot_id=chatbot.id,
+                token_hash=token,
+                vendor_domain=vendor.domain,
+                status=APIKeyStatus.active
+            ))
+            data.chatbot_ids.append(chatbot.id)
+            data.tokens.append(token)
+
+        db.commit()
+        return data
+    finally:
+        db.close()
+
+
+def cleanup(data: SeededData) -> None:
+    """Delete everything seed() created, including conversations and documents of its chatbots."""
+    db = SessionLocal()
+    try:
+        for chatbot in db.query(Chatbot).filter(Chatbot.id.in_(data.chatbot_ids)).all():
+            db.delete(chatbot)
+        db.flush()
+        for model, row_id in ((LLM, data.llm_id), (Embedding, data.embedding_id), (Vendor, data.vendor_id)):
+            row = db.get(model, row_id)
+            if row is not None:
+                db.delete(row)
+        db.commit()
+    except Exception as e:
+        db.rollback()
+        print(f"[BENCH CLEANUP ERROR] {e}")
+    finally:
+        db.close()